@@ -15,12 +15,23 @@ from pathlib import Path
 
 # ── Módulos internos ──
 from modules.file_ops import FileOperations
+from modules.dedup import DEDUP_ACTIONS, HASH_ALGORITHMS
+from modules.scanner import FileScanner
+from modules.transfer import format_rate
 from modules.web_scraper import WebScraperBot
 from modules.excel_ops import ExcelOperations
 from modules.email_ops import EmailOperations
 from modules.pdf_ops import PDFOperations
-from modules.scheduler import TaskScheduler
+from modules.job_store import MISFIRE_POLICIES, JobStore
+from modules.scheduler import LAST_DAY, WEEKDAYS, TaskScheduler
+from modules.scheduler_daemon import SchedulerDaemon
+from modules.scheduler_cluster import ClusterSchedulerDaemon
 from modules.workflow_engine import WorkflowEngine
+from modules.checkpoint import CheckpointStore
+from modules.job_runner import JobRunner
+from modules.dispatcher import PRIORITY_WEIGHTS
+from modules.script_pool import shared_pool
+from modules.profiling import format_profile
 from modules.logger import RPALogger
 
 # ══════════════════════════════════════════════════════════════
@@ -151,15 +162,53 @@ DEFAULTS = {
     "workflows": [],
     "current_workflow_steps": [],
     "execution_history": [],
-    "scheduler_tasks": [],
     "running_task": None,
+    "background_runs": [],
 }
 for k, v in DEFAULTS.items():
     if k not in st.session_state:
         st.session_state[k] = v if not isinstance(v, list) else list(v)
 
 logger = RPALogger()
-engine = WorkflowEngine(logger)
+
+
+@st.cache_resource
+def get_job_runner() -> JobRunner:
+    """Pool de execução compartilhado por todas as sessões do servidor."""
+    shared_pool().warm()
+    return JobRunner(WorkflowEngine(RPALogger(), checkpoints=CheckpointStore()))
+
+
+runner = get_job_runner()
+engine = runner.engine
+
+
+@st.cache_resource
+def get_scheduler_daemon() -> SchedulerDaemon:
+    """Agendador residente do servidor: dispara as tarefas no horário, mesmo sem sessão aberta."""
+    # Um disparo por linha durante toda a vida do servidor: histórico em memória curto, o resto fica no arquivo
+    scheduler_logger = RPALogger(max_entries=200)
+
+    def dispatch(task: dict):
+        priority = task.get("priority", "Média")
+        if task.get("workflow"):
+            run_id = runner.submit(task["workflow"], priority=priority)
+            scheduler_logger.log(f"Tarefa '{task['name']}' enfileirou o workflow (ID {run_id})", "INFO")
+        else:
+            run_id = runner.submit_task(task["name"], simulate_task, priority, task["type"])
+            scheduler_logger.log(f"Tarefa '{task['name']}' ({task['type']}) enfileirada (simulação, ID {run_id})", "INFO")
+
+    store = JobStore(os.environ.get("PYRPA_JOBS_DB", "pyrpa_jobs.db"))
+    if os.environ.get("PYRPA_SCHEDULER_MODE") == "cluster":
+        # Vários servidores no mesmo banco: cada disparo é reservado por lease e roda em um só
+        daemon = ClusterSchedulerDaemon(dispatch, store, logger=scheduler_logger)
+    else:
+        daemon = SchedulerDaemon(dispatch, logger=scheduler_logger, store=store)
+    daemon.start()
+    return daemon
+
+
+scheduler_daemon = get_scheduler_daemon()
 
 # ══════════════════════════════════════════════════════════════
 # Sidebar
@@ -225,12 +274,82 @@ def badge(status):
         "Sucesso": "status-success",
         "Executando": "status-running",
         "Erro": "status-error",
+        "Timeout": "status-error",
         "Pendente": "status-pending",
     }
     cls = m.get(status, "status-pending")
     return f'<span class="status-badge {cls}">{status}</span>'
 
 
+def submit_run(workflow: dict, profile: bool = False, priority: str = "Média") -> str:
+    run_id = runner.submit(workflow, priority=priority, profile=profile)
+    st.session_state.background_runs.append(run_id)
+    add_log(f"Workflow '{workflow.get('name', 'Sem nome')}' enfileirado (ID {run_id})", "INFO")
+    return run_id
+
+
+def simulate_task() -> dict:
+    time.sleep(0.5)  # Simulação
+    return {"status": "Sucesso"}
+
+
+def scanner_inputs(key: str, ext: str | None = None, recursive: bool = False) -> FileScanner:
+    """Filtros avançados de varredura (subpastas, globs, regex, tamanho e idade)."""
+    with st.expander("🔎 Filtros avançados"):
+        c1, c2 = st.columns(2)
+        recursive = c1.checkbox("Incluir subpastas", value=recursive, key=f"{key}_rec")
+        depth = c2.number_input("Profundidade máxima (0 = sem limite)", 0, 100, 0, key=f"{key}_depth",
+                                disabled=not recursive)
+        include = c1.text_input("Incluir (globs, separados por vírgula)", placeholder="*.pdf, notas/*",
+                                key=f"{key}_inc")
+        exclude = c2.text_input("Excluir (globs)", placeholder="*.tmp, lixeira", key=f"{key}_exc")
+        regex = c1.text_input("Regex no caminho", placeholder=r"\d{4}-\d{2}", key=f"{key}_re")
+        min_kb = c2.number_input("Tamanho mínimo (KB)", 0, value=0, key=f"{key}_min")
+        max_kb = c1.number_input("Tamanho máximo (KB, 0 = sem limite)", 0, value=0, key=f"{key}_max")
+        min_days = c2.number_input("Modificado há pelo menos (dias)", 0, value=0, key=f"{key}_age")
+    includes = [p for p in (include or "").split(",") if p.strip()]
+    if ext:
+        includes.append(f"*{ext}")
+    return FileScanner(
+        include=[p.strip() for p in includes] or None,
+        exclude=exclude or None,
+        regex=regex or None,
+        recursive=recursive,
+        max_depth=depth or None,
+        min_size=min_kb * 1024 if min_kb else None,
+        max_size=max_kb * 1024 if max_kb else None,
+        min_age_s=min_days * 86400 if min_days else None,
+    )
+
+
+def sync_background_runs():
+    """Registra no histórico da sessão as execuções em segundo plano já finalizadas."""
+    still_running = []
+    for run_id in st.session_state.background_runs:
+        try:
+            run = runner.status(run_id)
+        except ValueError:
+            continue
+        if run["status"] in ("Pendente", "Executando"):
+            still_running.append(run_id)
+            continue
+        add_execution(run["workflow"], run["status"], run["duration"] or 0, f"Execução {run_id}")
+        for sr in (run["result"] or {}).get("steps_results", []):
+            level = "INFO" if sr["status"] == "Sucesso" else "ERROR"
+            detail = sr.get("result", sr.get("error", ""))
+            if sr.get("profile"):
+                detail = f"{detail} [{format_profile(sr['profile'])}]"
+            add_log(f"Etapa {sr['step_id']} ({sr['type']}): {sr['status']} → {detail}", level)
+        ok = run["status"] == "Sucesso"
+        add_log(
+            f"Workflow '{run['workflow']}' — {run['status']} ({run['duration'] or 0:.1f}s)",
+            "SUCCESS" if ok else "ERROR",
+        )
+    st.session_state.background_runs = still_running
+
+
+sync_background_runs()
+
 # ══════════════════════════════════════════════════════════════
 # PÁGINAS
 # ══════════════════════════════════════════════════════════════
@@ -250,7 +369,7 @@ if page == "📊 Dashboard":
     total   = len(st.session_state.execution_history)
     success = sum(1 for e in st.session_state.execution_history if e["status"] == "Sucesso")
     errors  = sum(1 for e in st.session_state.execution_history if e["status"] == "Erro")
-    pend    = len(st.session_state.scheduler_tasks)
+    pend    = len(scheduler_daemon)
 
     c1, c2, c3, c4 = st.columns(4)
     for col, icon, num, lbl in [
@@ -349,14 +468,10 @@ elif page == "🔧 Construtor de Tarefas":
                 st.markdown(f"**Prioridade:** {t['priority']} · **Timeout:** {t['timeout']}s · **Retentativas:** {t['retry']}")
                 c1, c2 = st.columns(2)
                 if c1.button("▶️ Executar", key=f"run_{t['id']}"):
-                    start = time.time()
-                    add_log(f"Executando tarefa: {t['name']}", "INFO")
-                    time.sleep(0.5)  # Simulação
-                    t["status"] = "Sucesso"
-                    duration = time.time() - start
-                    add_execution(t["name"], "Sucesso", duration, t["description"])
-                    add_log(f"Tarefa concluída: {t['name']} ({duration:.1f}s)", "SUCCESS")
-                    st.success("Tarefa executada com sucesso!")
+                    run_id = runner.submit_task(t["name"], simulate_task, t["priority"], t["category"])
+                    st.session_state.background_runs.append(run_id)
+                    add_log(f"Tarefa enfileirada: {t['name']} (ID {run_id}, prioridade {t['priority']})", "INFO")
+                    st.success(f"Tarefa enfileirada — ID `{run_id}`.")
                 if c2.button("🗑️ Remover", key=f"del_{t['id']}"):
                     st.session_state.tasks = [x for x in st.session_state.tasks if x["id"] != t["id"]]
                     add_log(f"Tarefa removida: {t['name']}", "WARN")
@@ -367,7 +482,7 @@ elif page == "🔧 Construtor de Tarefas":
 # ──────────────────────────────────────────────────────────────
 elif page == "🔗 Workflow Builder":
     st.markdown("## 🔗 Workflow Builder")
-    st.markdown("Monte fluxos de automação encadeando etapas sequenciais.")
+    st.markdown("Monte fluxos de automação encadeando etapas sequenciais ou paralelas.")
 
     wf_name = st.text_input("Nome do Workflow", placeholder="Ex: Processo mensal de relatórios")
 
@@ -398,9 +513,20 @@ elif page == "🔗 Workflow Builder":
         params["origem"] = st.text_input("Pasta de origem", key="wf_src")
         params["destino"] = st.text_input("Pasta de destino", key="wf_dst")
         params["filtro"] = st.text_input("Filtro de extensão (ex: .xlsx)", key="wf_filt")
+        params["paralelismo"] = st.number_input("Arquivos simultâneos", 1, 64, 8, key="wf_iodepth")
+        params["recursivo"] = st.checkbox("Incluir subpastas", key="wf_rec")
+        params["excluir"] = st.text_input("Excluir (globs, separados por vírgula)", key="wf_exc")
+        if "Copiar" in step_type:
+            params["sincronizar"] = st.checkbox(
+                "Sincronizar (copiar só novos ou alterados)", key="wf_sync",
+                help="Mantém um manifesto do que já foi copiado e pula arquivos inalterados.",
+            )
+            if params["sincronizar"]:
+                params["espelhar"] = st.checkbox("Apagar do destino o que sumiu da origem", key="wf_mirror")
     elif "Web" in step_type:
         params["url"] = st.text_input("URL", key="wf_url")
         params["seletor"] = st.text_input("Seletor CSS", key="wf_sel")
+        params["tabelas"] = st.checkbox("Extrair tabelas (DataFrame)", key="wf_tables")
     elif "Excel" in step_type or "CSV" in step_type:
         params["arquivo"] = st.text_input("Caminho do arquivo", key="wf_xl")
         params["operacao"] = st.selectbox("Operação", ["Ler", "Filtrar", "Agregar", "Pivotar"], key="wf_xlop")
@@ -411,6 +537,40 @@ elif page == "🔗 Workflow Builder":
         params["segundos"] = st.number_input("Segundos", 1, 300, 5, key="wf_wait")
     elif "Script" in step_type:
         params["codigo"] = st.text_area("Código Python", height=150, key="wf_code")
+        params["isolado"] = st.checkbox(
+            "Executar em processo isolado", value=True, key="wf_code_isolated",
+            help="Roda num worker pré-aquecido que é encerrado se o tempo limite estourar. "
+            "Desmarque para acessar o ArtifactStore completo em `artifacts`.",
+        )
+
+    previous_ids = [s["id"] for s in st.session_state.current_workflow_steps]
+    depends_on = st.multiselect(
+        "Depende das etapas",
+        previous_ids,
+        default=previous_ids[-1:],
+        help="Etapas sem dependência entre si são executadas em paralelo.",
+        key="wf_deps",
+    )
+    c1, c2 = st.columns(2)
+    step_retry = c1.number_input("Retentativas em caso de erro", 0, 5, 0, key="wf_retry")
+    step_timeout = c2.number_input("Timeout (segundos, 0 = sem limite)", 0, 3600, 0, key="wf_timeout")
+
+    with st.expander("📦 Dados entre etapas"):
+        step_output = st.text_input("Publicar resultado como", placeholder="Ex: tabela_vendas", key="wf_out")
+        available = [s.get("output") or str(s["id"]) for s in st.session_state.current_workflow_steps]
+        step_input = st.multiselect("Consumir artefatos", available, key="wf_in")
+        step_stream = st.checkbox(
+            "Transmitir registros em lotes (streaming)", key="wf_stream",
+            help="A etapa que consumir este resultado começa antes desta terminar, "
+            "lendo lotes por uma fila limitada — a memória não cresce com o volume de dados.",
+        )
+        if step_stream:
+            params["lote"] = st.number_input("Registros por lote", 10, 100_000, 1000, key="wf_batch")
+        if "Excel" in step_type or "CSV" in step_type:
+            params["saida"] = st.text_input(
+                "Gravar em (.csv/.xlsx)", key="wf_xl_out",
+                help="Obrigatório quando a etapa consome um stream.",
+            )
 
     if st.button("➕ Adicionar Etapa"):
         step = {
@@ -418,7 +578,16 @@ elif page == "🔗 Workflow Builder":
             "type": step_type,
             "description": step_desc or step_type,
             "params": params,
+            "depends_on": depends_on,
+            "retry": step_retry,
+            "timeout": step_timeout or None,
         }
+        if step_output:
+            step["output"] = step_output
+        if step_input:
+            step["input"] = step_input
+        if step_stream:
+            step["stream"] = True
         st.session_state.current_workflow_steps.append(step)
         add_log(f"Etapa adicionada ao workflow: {step_type}", "INFO")
         st.success(f"Etapa **{step_type}** adicionada!")
@@ -428,12 +597,21 @@ elif page == "🔗 Workflow Builder":
         for i, s in enumerate(st.session_state.current_workflow_steps):
             st.markdown(
                 f'<div class="step-container">'
-                f"<strong>Etapa {s['id']}</strong> — {s['type']}<br/>"
+                f"<strong>Etapa {s['id']}</strong> — {s['type']}"
+                f"{' · depende de ' + ', '.join(map(str, s['depends_on'])) if s.get('depends_on') else ''}"
+                f"{' · streaming' if s.get('stream') else ''}<br/>"
                 f"<span style='color:#64748b;font-size:0.85rem'>{s['description']}</span>"
                 f"</div>",
                 unsafe_allow_html=True,
             )
 
+        profile_run = st.checkbox(
+            "⏱️ Perfilar etapas", key="wf_profile",
+            help="Registra CPU, memória e E/S de cada etapa nos logs da execução.",
+        )
+        run_priority = st.select_slider(
+            "Prioridade na fila", list(PRIORITY_WEIGHTS), "Média", key="wf_priority",
+        )
         col1, col2, col3 = st.columns(3)
         if col1.button("💾 Salvar Workflow", use_container_width=True):
             if wf_name:
@@ -451,30 +629,11 @@ elif page == "🔗 Workflow Builder":
                 st.warning("Informe o nome do workflow.")
 
         if col2.button("▶️ Executar Pipeline", use_container_width=True):
-            start = time.time()
-            bar = st.progress(0)
-            total = len(st.session_state.current_workflow_steps)
-            all_ok = True
-            for i, step in enumerate(st.session_state.current_workflow_steps):
-                st.info(f"⏳ Executando etapa {step['id']}: {step['type']}…")
-                try:
-                    result = engine._execute_step(step)
-                    add_log(f"Etapa {step['id']} concluída: {step['type']} → {result}", "INFO")
-                    st.success(f"✅ Etapa {step['id']}: {result}")
-                except Exception as e:
-                    all_ok = False
-                    add_log(f"Erro na etapa {step['id']}: {e}", "ERROR")
-                    st.error(f"❌ Etapa {step['id']}: {e}")
-                    break
-                bar.progress((i + 1) / total)
-            duration = time.time() - start
-            status = "Sucesso" if all_ok else "Erro"
-            add_execution(wf_name or "Pipeline Ad-hoc", status, duration)
-            add_log(f"Pipeline concluído em {duration:.1f}s — {status}", "SUCCESS" if all_ok else "ERROR")
-            if all_ok:
-                st.success(f"✅ Pipeline concluído em **{duration:.1f}s**!")
-            else:
-                st.error(f"Pipeline parou com erro após {duration:.1f}s")
+            run_id = submit_run({
+                "name": wf_name or "Pipeline Ad-hoc",
+                "steps": list(st.session_state.current_workflow_steps),
+            }, profile=profile_run, priority=run_priority)
+            st.success(f"Pipeline enfileirado — ID `{run_id}`. Acompanhe abaixo.")
 
         if col3.button("🗑️ Limpar Etapas", use_container_width=True):
             st.session_state.current_workflow_steps = []
@@ -486,20 +645,66 @@ elif page == "🔗 Workflow Builder":
             with st.expander(f"🔗 {wf['name']} ({len(wf['steps'])} etapas)"):
                 for s in wf["steps"]:
                     st.markdown(f"**{s['id']}.** {s['type']} — {s['description']}")
-                if st.button("▶️ Executar", key=f"runwf_{wf['id']}"):
-                    start = time.time()
-                    result = engine.execute_workflow(wf)
-                    duration = time.time() - start
-                    add_execution(wf["name"], result["status"], duration)
-                    for sr in result["steps_results"]:
-                        level = "INFO" if sr["status"] == "Sucesso" else "ERROR"
-                        detail = sr.get("result", sr.get("error", ""))
-                        add_log(f"Etapa {sr['step_id']} ({sr['type']}): {sr['status']} → {detail}", level)
-                    add_log(f"Workflow '{wf['name']}' — {result['status']} ({duration:.1f}s)", "SUCCESS" if result["status"] == "Sucesso" else "ERROR")
-                    if result["status"] == "Sucesso":
-                        st.success(f"Workflow executado em {duration:.1f}s!")
+                c1, c2 = st.columns(2)
+                if c1.button("▶️ Executar", key=f"runwf_{wf['id']}"):
+                    run_id = submit_run(wf)
+                    st.success(f"Workflow enfileirado — ID `{run_id}`.")
+                if c2.button("🐍 Exportar Script", key=f"exportwf_{wf['id']}"):
+                    try:
+                        code = engine.generate_script(wf)
+                    except ValueError as e:
+                        st.error(str(e))
                     else:
-                        st.error(f"Workflow falhou após {duration:.1f}s. Verifique os logs.")
+                        st.code(code, language="python")
+                        filename = f"workflow_{wf['name'].lower().replace(' ', '_')}.py"
+                        st.download_button(
+                            "⬇️ Baixar Script", code, filename, "text/x-python", key=f"dlwf_{wf['id']}"
+                        )
+                        add_log(f"Script do workflow '{wf['name']}' gerado", "INFO")
+
+    failed_runs = engine.checkpoints.list_runs(status="Erro", limit=10)
+    if failed_runs:
+        st.markdown("### ♻️ Execuções com Falha")
+        for run in failed_runs:
+            c1, c2 = st.columns([4, 1])
+            c1.markdown(f"**{run['workflow']}** · ID: `{run['run_id']}` · {run['updated_at']}")
+            if c2.button("▶️ Retomar", key=f"resume_{run['run_id']}"):
+                runner.submit_resume(run["run_id"], run["workflow"])
+                st.session_state.background_runs.append(run["run_id"])
+                add_log(f"Retomada da execução {run['run_id']} enfileirada", "INFO")
+                st.rerun()
+
+    bg_runs = runner.list_runs(limit=10)
+    if bg_runs:
+        st.markdown("### ⏳ Execuções em Segundo Plano")
+        if st.button("🔄 Atualizar", key="bg_refresh"):
+            st.rerun()
+        load = runner.dispatcher.stats()
+        if load["running_by_category"] or load["queued"]:
+            st.caption(
+                "Em execução: " + (", ".join(
+                    f"{c} {n}/{load['limits'].get(c, '∞')}" for c, n in load["running_by_category"].items()
+                ) or "—")
+                + " · Na fila: " + (", ".join(f"{p} {n}" for p, n in load["queued"].items() if n) or "—")
+            )
+        for run in bg_runs:
+            c1, c2 = st.columns([4, 1])
+            c1.markdown(
+                f"**{run['workflow']}** {badge(run['status'])} · {run.get('priority', 'Média')} · ID: `{run['run_id']}` · "
+                f"enviado {run['submitted_at']}"
+                + (f" · {run['duration']:.1f}s" if run["duration"] is not None else ""),
+                unsafe_allow_html=True,
+            )
+            if run["status"] == "Executando" and run.get("steps_total"):
+                current = ", ".join(str(s) for s in run["current_steps"])
+                c1.progress(
+                    run["steps_done"] / run["steps_total"],
+                    text=f"{run['steps_done']}/{run['steps_total']} etapas"
+                    + (f" · em andamento: {current}" if current else ""),
+                )
+            if run["status"] == "Pendente" and c2.button("✖️ Cancelar", key=f"bg_cancel_{run['run_id']}"):
+                runner.cancel(run["run_id"])
+                st.rerun()
 
 # ──────────────────────────────────────────────────────────────
 # 📁 Operações de Arquivo
@@ -508,18 +713,45 @@ elif page == "📁 Operações de Arquivo":
     st.markdown("## 📁 Operações de Arquivo")
     fops = FileOperations()
 
-    tab1, tab2, tab3, tab4 = st.tabs(["Copiar / Mover", "Renomear em Lote", "Organizar por Extensão", "Monitorar Pasta"])
+    tab1, tab2, tab3, tab4, tab5 = st.tabs(
+        ["Copiar / Mover", "Renomear em Lote", "Organizar por Extensão", "Monitorar Pasta", "Duplicados"]
+    )
 
     with tab1:
         st.markdown("#### Copiar ou Mover Arquivos")
-        op = st.radio("Operação", ["Copiar", "Mover"], horizontal=True, key="fop_op")
+        op = st.radio("Operação", ["Copiar", "Mover", "Sincronizar"], horizontal=True, key="fop_op")
         src = st.text_input("Pasta de Origem", key="fop_src")
         dst = st.text_input("Pasta de Destino", key="fop_dst")
         ext = st.text_input("Filtrar extensão (ex: .pdf)", key="fop_ext")
+        io_depth = st.slider(
+            "Arquivos simultâneos", 1, 64, 8, key="fop_iodepth",
+            help="Mais transferências em paralelo aproveitam melhor discos rápidos e volumes de rede.",
+        )
+        fop_scanner = scanner_inputs("fop", ext or None)
+        if op == "Sincronizar":
+            st.caption("Copia só arquivos novos ou alterados desde a última sincronização deste par de pastas.")
+            cs1, cs2 = st.columns(2)
+            mirror = cs1.checkbox("Apagar do destino o que sumiu da origem", key="fop_mirror")
+            verify = cs2.checkbox("Comparar conteúdo (hash) quando só a data mudar", key="fop_hash")
         if st.button("▶️ Executar", key="fop_run"):
             if src and dst:
                 start = time.time()
-                result = fops.copy_or_move(src, dst, ext or None, op.lower())
+                progress = st.empty()
+
+                def show_progress(stats):
+                    progress.info(f"⏳ {format_rate(stats)}")
+
+                if op == "Sincronizar":
+                    result = fops.sync(
+                        src, dst, ext or None, mirror_deletes=mirror, verify_hash=verify,
+                        io_depth=io_depth, on_progress=show_progress, scanner=fop_scanner,
+                    )
+                else:
+                    result = fops.copy_or_move(
+                        src, dst, ext or None, op.lower(), io_depth=io_depth, on_progress=show_progress,
+                        scanner=fop_scanner,
+                    )
+                progress.empty()
                 duration = time.time() - start
                 add_execution(f"{op} arquivos", result["status"], duration, result["message"])
                 add_log(result["message"], "SUCCESS" if result["status"] == "Sucesso" else "ERROR")
@@ -534,10 +766,11 @@ elif page == "📁 Operações de Arquivo":
         pattern = st.text_input("Prefixo", placeholder="relatorio_", key="ren_pat")
         add_date = st.checkbox("Adicionar data ao nome", key="ren_date")
         add_seq = st.checkbox("Adicionar sequencial", value=True, key="ren_seq")
+        ren_scanner = scanner_inputs("ren")
         if st.button("▶️ Renomear", key="ren_run"):
             if folder:
                 start = time.time()
-                result = fops.batch_rename(folder, pattern, add_date, add_seq)
+                result = fops.batch_rename(folder, pattern, add_date, add_seq, ren_scanner)
                 duration = time.time() - start
                 add_execution("Renomear em lote", result["status"], duration, result["message"])
                 add_log(result["message"], "SUCCESS" if result["status"] == "Sucesso" else "ERROR")
@@ -546,10 +779,11 @@ elif page == "📁 Operações de Arquivo":
     with tab3:
         st.markdown("#### Organizar Pasta por Extensão")
         folder = st.text_input("Pasta para organizar", key="org_dir")
+        org_scanner = scanner_inputs("org")
         if st.button("▶️ Organizar", key="org_run"):
             if folder:
                 start = time.time()
-                result = fops.organize_by_extension(folder)
+                result = fops.organize_by_extension(folder, org_scanner)
                 duration = time.time() - start
                 add_execution("Organizar por extensão", result["status"], duration, result["message"])
                 add_log(result["message"], "SUCCESS" if result["status"] == "Sucesso" else "ERROR")
@@ -566,6 +800,64 @@ elif page == "📁 Operações de Arquivo":
             st.code(code, language="python")
             add_log("Script de monitoramento gerado", "INFO")
 
+    with tab5:
+        st.markdown("#### Encontrar Arquivos Duplicados")
+        st.caption(
+            "Compara tamanho, depois um hash parcial e só então o hash completo: arquivos de tamanho único "
+            "nunca são lidos. Os hashes ficam num índice, então uma nova análise só lê o que mudou."
+        )
+        dup_folder = st.text_input("Pasta a analisar", key="dup_dir")
+        cd1, cd2 = st.columns(2)
+        dup_action = cd1.selectbox(
+            "Ação", list(DEDUP_ACTIONS), format_func=DEDUP_ACTIONS.get, key="dup_action"
+        )
+        dup_algo = cd2.selectbox("Hash", HASH_ALGORITHMS, key="dup_algo")
+        dup_target = None
+        if dup_action == "move":
+            dup_target = st.text_input("Mover duplicados para", key="dup_target")
+        elif dup_action == "hardlink":
+            st.warning("Os duplicados passam a apontar para o mesmo arquivo: editar um altera todos.")
+        dup_scanner = scanner_inputs("dup", recursive=True)
+        if st.button("🔍 Analisar", key="dup_run"):
+            if dup_folder:
+                start = time.time()
+                progress = st.empty()
+
+                def show_dup_progress(stats):
+                    progress.info(
+                        f"⏳ {stats['stage']} · {stats['files']:,} arquivo(s) · {stats['candidates']:,} candidato(s) · "
+                        f"{stats['bytes_read'] / 1024 / 1024:.1f} MB lidos · "
+                        f"{stats['bytes_per_s'] / 1024 / 1024:.1f} MB/s"
+                    )
+
+                result = fops.find_duplicates(
+                    dup_folder, dup_action, dup_target or None, dup_scanner, algo=dup_algo,
+                    on_progress=show_dup_progress,
+                )
+                progress.empty()
+                duration = time.time() - start
+                add_execution("Duplicados", result["status"], duration, result["message"])
+                add_log(result["message"], "SUCCESS" if result["status"] == "Sucesso" else "ERROR")
+                if result["status"] == "Sucesso":
+                    st.success(result["message"])
+                else:
+                    st.error(result["message"])
+                groups = result.get("data", {}).get("groups", [])
+                if groups:
+                    st.dataframe(
+                        [
+                            {
+                                "Tamanho (KB)": round(g["size"] / 1024, 1),
+                                "Manter": g["keep"]["rel"],
+                                "Duplicados": len(g["duplicates"]),
+                                "Arquivos": ", ".join(d["rel"] for d in g["duplicates"][:5])
+                                + (" …" if len(g["duplicates"]) > 5 else ""),
+                            }
+                            for g in groups[:500]
+                        ],
+                        use_container_width=True,
+                    )
+
 # ──────────────────────────────────────────────────────────────
 # 🌐 Web Scraping
 # ──────────────────────────────────────────────────────────────
@@ -810,12 +1102,33 @@ elif page == "⏰ Agendador":
         s_name = st.text_input("Nome", key="sch_name")
         s_type = st.selectbox("Tipo", ["Workflow", "Operação de Arquivo", "Web Scraping", "Script Python"], key="sch_type")
         c1, c2 = st.columns(2)
-        s_freq = c1.selectbox("Frequência", ["Uma vez", "A cada X minutos", "Diário", "Semanal", "Mensal"], key="sch_freq")
+        s_freq = c1.selectbox("Frequência", ["Uma vez", "A cada X minutos", "Diário", "Semanal", "Mensal", "Cron"], key="sch_freq")
         s_time = c2.time_input("Horário", key="sch_time")
+        s_interval = s_weekday = s_day = s_cron = None
         if s_freq == "A cada X minutos":
             s_interval = st.number_input("Intervalo (min)", 1, 1440, 30, key="sch_int")
-        else:
-            s_interval = None
+        elif s_freq == "Semanal":
+            s_weekday = WEEKDAYS.index(st.selectbox("Dia da semana", WEEKDAYS, key="sch_weekday"))
+        elif s_freq == "Mensal":
+            s_day = st.selectbox("Dia do mês", list(range(1, 32)) + [LAST_DAY], key="sch_day")
+        elif s_freq == "Cron":
+            s_cron = st.text_input(
+                "Expressão cron", "0 8 * * MON-FRI", key="sch_cron",
+                help="5 campos (min hora dia mês dia-da-semana) ou 6 com segundos. Aceita L, W e #, ex.: 0 18 L * *",
+            )
+        wf_names = [wf["name"] for wf in st.session_state.workflows]
+        s_workflow = st.selectbox(
+            "Workflow a executar (tipo Workflow)", ["—"] + wf_names, key="sch_wf",
+        )
+        s_misfire = st.selectbox(
+            "Disparos perdidos (servidor parado)", list(MISFIRE_POLICIES),
+            format_func=MISFIRE_POLICIES.get, key="sch_misfire",
+        )
+        s_priority = st.select_slider("Prioridade", list(PRIORITY_WEIGHTS), "Média", key="sch_priority")
+        s_jitter = st.number_input(
+            "Tolerância de horário (min)", 0, 120, 0, key="sch_jitter",
+            help="Permite disparar até N minutos depois do horário, para não coincidir com outras tarefas.",
+        )
         s_active = st.checkbox("Ativa", value=True, key="sch_active")
 
         if st.form_submit_button("💾 Agendar", use_container_width=True):
@@ -827,38 +1140,89 @@ elif page == "⏰ Agendador":
                     "frequency": s_freq,
                     "time": str(s_time),
                     "interval": s_interval,
+                    "weekday": s_weekday,
+                    "day": s_day,
+                    "cron": s_cron,
+                    "misfire": s_misfire,
+                    "priority": s_priority,
+                    "jitter": int(s_jitter) * 60,
                     "active": s_active,
                     "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
                     "last_run": None,
-                    "next_run": scheduler.calc_next_run(s_freq, s_time, s_interval),
                 }
-                st.session_state.scheduler_tasks.append(task)
-                add_log(f"Tarefa agendada: {s_name} ({s_freq})", "INFO")
-                st.success(f"✅ Tarefa **{s_name}** agendada!")
+                if s_type == "Workflow" and s_workflow != "—":
+                    task["workflow"] = next(wf for wf in st.session_state.workflows if wf["name"] == s_workflow)
+                try:
+                    scheduler_daemon.add(task)
+                except ValueError as e:
+                    st.error(f"❌ {e}")
+                else:
+                    add_log(f"Tarefa agendada: {s_name} ({s_freq})", "INFO")
+                    st.success(f"✅ Tarefa **{s_name}** agendada!")
 
-    if st.session_state.scheduler_tasks:
+    scheduled_tasks = sorted(scheduler_daemon.tasks(), key=lambda t: t["created_at"])
+    if scheduled_tasks:
         st.markdown("### 📅 Tarefas Agendadas")
-        for t in st.session_state.scheduler_tasks:
+        for t in scheduled_tasks:
             status = "🟢" if t["active"] else "🔴"
+            when = f"**Expressão:** `{t['cron']}`" if t.get("cron") else f"**Horário:** {t['time']}"
             with st.expander(f"{status} {t['name']} — {t['frequency']}"):
                 st.markdown(
                     f"**Tipo:** {t['type']}  \n"
-                    f"**Horário:** {t['time']}  \n"
+                    f"{when}  \n"
                     f"**Próxima execução:** {t['next_run']}  \n"
                     f"**Última execução:** {t['last_run'] or 'Nunca'}"
                 )
                 c1, c2 = st.columns(2)
                 if c1.button("⏸️ Desativar" if t["active"] else "▶️ Ativar", key=f"sch_toggle_{t['id']}"):
-                    t["active"] = not t["active"]
+                    scheduler_daemon.set_active(t["id"], not t["active"])
                     st.rerun()
                 if c2.button("🗑️ Remover", key=f"sch_del_{t['id']}"):
-                    st.session_state.scheduler_tasks = [x for x in st.session_state.scheduler_tasks if x["id"] != t["id"]]
+                    scheduler_daemon.remove(t["id"])
                     st.rerun()
 
+        st.markdown("#### 📆 Calendário (próximos 30 dias)")
+        fires = scheduler.calendar(scheduled_tasks)
+        names = {t["id"]: t["name"] for t in scheduled_tasks}
+        rows = [
+            {
+                "Tarefa": names[task_id],
+                "Disparos": len(dates),
+                "Próximos": ", ".join(d.strftime("%d/%m %H:%M") for d in dates[:5]),
+            }
+            for task_id, dates in fires.items()
+        ]
+        if rows:
+            st.dataframe(rows, use_container_width=True, hide_index=True)
+
+        st.markdown("#### 📈 Planejador de Carga (próximas 24h)")
+        profile = scheduler.load_profile(scheduled_tasks)
+        busiest = max(profile, key=lambda p: p["running"])
+        offsets = scheduler.spread(scheduled_tasks)
+        spread_tasks = [{**t, "offset": offsets[t["id"]]} if t["id"] in offsets else t for t in scheduled_tasks]
+        spread_peak = max(p["running"] for p in scheduler.load_profile(spread_tasks))
+        c1, c2, c3 = st.columns(3)
+        c1.metric("Pico de execuções simultâneas", busiest["running"])
+        c2.metric("Horário do pico", busiest["minute"].strftime("%H:%M"))
+        c3.metric("Pico após distribuir", spread_peak, spread_peak - busiest["running"], delta_color="inverse")
+        st.bar_chart(
+            {
+                "Horário": [p["minute"].strftime("%H:%M") for p in profile],
+                "Execuções simultâneas": [p["running"] for p in profile],
+            },
+            x="Horário", y="Execuções simultâneas",
+        )
+        if offsets and st.button("⚖️ Distribuir horários dentro da tolerância", key="sch_spread"):
+            scheduler_daemon.add_many([t for t in spread_tasks if t["id"] in offsets])
+            add_log(f"Horários de {len(offsets)} tarefa(s) redistribuídos (pico {busiest['running']} → {spread_peak})", "INFO")
+            st.rerun()
+        elif not offsets:
+            st.caption("Defina uma tolerância de horário nas tarefas para o agendador poder espalhá-las.")
+
     st.markdown("---")
     st.markdown("#### 🐍 Gerar Script de Agendamento (cron / schedule)")
     if st.button("Gerar Script", key="sch_gen"):
-        code = scheduler.generate_cron_script(st.session_state.scheduler_tasks)
+        code = scheduler.generate_cron_script(scheduled_tasks)
         st.code(code, language="python")
 
 # ──────────────────────────────────────────────────────────────
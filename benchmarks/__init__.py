@@ -0,0 +1 @@
+# PyRPA Benchmarks
@@ -0,0 +1,278 @@
+"""Benchmark do WorkflowEngine com pipelines sintéticos.
+
+Monta workflows com etapas reais (web contra um servidor HTTP local, cópia
+de arquivos, consolidação de CSVs e scripts) sobre fixtures geradas numa
+pasta temporária, variando número de etapas, fan-out e tamanho do payload.
+Reporta vazão, latência p50/p95 por etapa e pico de memória, e compara com
+um baseline gravado anteriormente.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_workflows [--steps 20 100] [--fanout 1 8]
+        [--payload 1 256] [--repeat 3] [--save-baseline]
+"""
+
+import argparse
+import json
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from modules.workflow_engine import WorkflowEngine
+
+BASELINE = Path(__file__).with_name("baseline.json")
+KINDS = ("web", "copy", "csv", "script")
+
+# Métrica -> True se maior é melhor
+METRICS = {
+    "steps_per_s": True,
+    "p50_ms": False,
+    "p95_ms": False,
+    "mem_peak_mb": False,
+}
+
+
+class FixtureServer:
+    """Servidor HTTP local que devolve páginas HTML com tabela do tamanho pedido."""
+
+    def __init__(self):
+        pages: dict[int, bytes] = {}
+        lock = threading.Lock()
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                size = int(self.path.rsplit("=", 1)[-1]) if "size=" in self.path else 1024
+                with lock:
+                    body = pages.get(size)
+                    if body is None:
+                        body = pages[size] = _html_page(size)
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def _html_page(size: int) -> bytes:
+    rows, total = [], 0
+    while total < size:
+        row = f"<tr><td>{len(rows)}</td><td>item-{len(rows)}</td><td>{len(rows) * 1.5:.2f}</td></tr>"
+        rows.append(row)
+        total += len(row)
+    html = (
+        "<html><body><h1>Fixture</h1><table>"
+        "<tr><th>id</th><th>nome</th><th>valor</th></tr>" + "".join(rows) + "</table></body></html>"
+    )
+    return html.encode("utf-8")
+
+
+def build_fixtures(root: Path, payload: int, files: int = 4) -> dict:
+    """Gera CSVs e PDFs somando ``payload`` bytes por tipo."""
+    csv_dir, pdf_dir = root / "csv", root / "pdf"
+    csv_dir.mkdir(parents=True)
+    pdf_dir.mkdir(parents=True)
+    per_file = max(1, payload // files)
+    for i in range(files):
+        lines = ["id,nome,valor"]
+        size = len(lines[0])
+        while size < per_file:
+            line = f"{len(lines)},item-{len(lines)},{len(lines) * 1.5:.2f}"
+            lines.append(line)
+            size += len(line) + 1
+        (csv_dir / f"dados_{i}.csv").write_text("\n".join(lines) + "\n", encoding="utf-8")
+        (pdf_dir / f"doc_{i}.pdf").write_bytes(_pdf_bytes(per_file))
+    return {"csv": csv_dir, "pdf": pdf_dir}
+
+
+def _pdf_bytes(size: int) -> bytes:
+    """PDF mínimo de uma página, com o stream de conteúdo preenchido até ``size``."""
+    text = b"BT /F1 12 Tf 72 720 Td (PyRPA benchmark) Tj ET\n"
+    content = text + b"%" + b"0" * max(0, size - len(text) - 400) + b"\n"
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R >>",
+        b"<< /Length %d >>\nstream\n" % len(content) + content + b"endstream",
+    ]
+    out, offsets = bytearray(b"%PDF-1.4\n"), []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def build_workflow(n_steps: int, fanout: int, payload: int, fixtures: dict, out_dir: Path,
+                   base_url: str, kinds=KINDS) -> dict:
+    """Camadas de ``fanout`` etapas; cada camada depende de toda a anterior."""
+    steps, previous = [], []
+    for layer_start in range(0, n_steps, fanout):
+        layer = []
+        for i in range(layer_start, min(n_steps, layer_start + fanout)):
+            step = _synthetic_step(i, kinds[i % len(kinds)], payload, fixtures, out_dir, base_url)
+            step["depends_on"] = list(previous)
+            steps.append(step)
+            layer.append(i)
+        previous = layer
+    return {"name": f"bench-{n_steps}x{fanout}", "steps": steps}
+
+
+def _synthetic_step(i: int, kind: str, payload: int, fixtures: dict, out_dir: Path, base_url: str) -> dict:
+    if kind == "web":
+        return {"id": i, "type": "🌐 Extrair Dados Web", "params": {"url": f"{base_url}/page?size={payload}"}}
+    if kind == "copy":
+        source = fixtures["pdf"] if i % 2 else fixtures["csv"]
+        return {
+            "id": i,
+            "type": "📁 Copiar Arquivos",
+            "params": {"origem": str(source), "destino": str(out_dir / str(i)), "filtro": ""},
+        }
+    if kind == "csv":
+        return {
+            "id": i,
+            "type": "📊 Consolidar CSVs",
+            "params": {"arquivo": str(fixtures["csv"] / "*.csv")},
+        }
+    code = f"dados = bytes({payload})\nresultado = sum(dados[::64])"
+    return {"id": i, "type": "🐍 Script Python Custom", "params": {"codigo": code}}
+
+
+def run_scenario(engine: WorkflowEngine, workflow: dict, repeat: int) -> dict:
+    latencies, walls, errors = [], [], 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for event in engine.iter_workflow(workflow):
+            if event["event"] == "step_finished":
+                latencies.append(event["duration_s"])
+            elif event["event"] == "step_failed" and not event["will_retry"]:
+                errors += 1
+        walls.append(time.perf_counter() - start)
+
+    # Memória medida numa execução à parte para o tracemalloc não distorcer os tempos
+    tracemalloc.start()
+    try:
+        engine.execute_workflow(workflow)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    latencies.sort()
+    n_steps = len(workflow["steps"])
+    return {
+        "steps": n_steps,
+        "runs": repeat,
+        "errors": errors,
+        "steps_per_s": n_steps * repeat / sum(walls),
+        "p50_ms": _percentile(latencies, 50) * 1000,
+        "p95_ms": _percentile(latencies, 95) * 1000,
+        "mem_peak_mb": peak / 1024 / 1024,
+    }
+
+
+def _percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """Devolve as regressões acima de ``threshold`` (fração) em relação ao baseline."""
+    regressions = []
+    for name, metrics in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            old, new = base.get(metric), metrics[metric]
+            if not old:
+                continue
+            change = (new - old) / old
+            worse = -change if higher_is_better else change
+            if worse > threshold:
+                regressions.append(f"{name}: {metric} {old:.2f} → {new:.2f} ({change:+.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--steps", type=int, nargs="+", default=[20, 100])
+    parser.add_argument("--fanout", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--payload", type=int, nargs="+", default=[1, 256], help="KB por fixture")
+    parser.add_argument("--kinds", nargs="+", default=list(KINDS), choices=KINDS)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--threshold", type=float, default=0.10, help="regressão tolerada (fração)")
+    args = parser.parse_args()
+
+    engine = WorkflowEngine(max_workers=args.workers)
+    results = {}
+    root = Path(tempfile.mkdtemp(prefix="pyrpa_bench_"))
+    try:
+        with FixtureServer() as server:
+            for payload_kb in args.payload:
+                fixtures = build_fixtures(root / f"fixtures_{payload_kb}", payload_kb * 1024)
+                for n_steps in args.steps:
+                    for fanout in args.fanout:
+                        name = f"{n_steps}x{fanout}-{payload_kb}KB"
+                        workflow = build_workflow(
+                            n_steps, fanout, payload_kb * 1024, fixtures,
+                            root / "out" / name, server.url, tuple(args.kinds),
+                        )
+                        engine.execute_workflow(workflow)  # aquecimento
+                        results[name] = metrics = run_scenario(engine, workflow, args.repeat)
+                        print(
+                            f"{name:>16}: {metrics['steps_per_s']:8.1f} etapas/s · "
+                            f"p50 {metrics['p50_ms']:7.1f} ms · p95 {metrics['p95_ms']:7.1f} ms · "
+                            f"pico {metrics['mem_peak_mb']:6.1f} MB"
+                            + (f" · {metrics['errors']} erro(s)" if metrics["errors"] else "")
+                        )
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(results, indent=2), encoding="utf-8")
+        print(f"Baseline gravado em {args.baseline}")
+        return
+    if args.baseline.exists():
+        regressions = compare(results, json.loads(args.baseline.read_text(encoding="utf-8")), args.threshold)
+        if regressions:
+            print(f"\nRegressões acima de {args.threshold:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"\nSem regressões acima de {args.threshold:.0%} em relação a {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
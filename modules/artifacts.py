@@ -0,0 +1,150 @@
+"""Armazenamento de artefatos entre etapas de workflow para o PyRPA."""
+
+import mmap
+import pickle
+import shutil
+import sys
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+try:
+    import pandas as pd
+    HAS_PANDAS = True
+except ImportError:
+    HAS_PANDAS = False
+
+try:
+    import pyarrow  # noqa: F401
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+
+class ArtifactStore:
+    """Artefatos de uma execução (DataFrames, bytes, texto) indexados por nome.
+
+    ``get`` devolve o próprio objeto publicado, sem cópia. Quando a memória
+    ocupada passa de ``memory_budget`` bytes, os artefatos menos usados vão
+    para disco: DataFrames em Parquet (ou pickle sem pyarrow) e bytes em
+    arquivo lido de volta via ``mmap``.
+    """
+
+    def __init__(self, memory_budget: int = 256 * 1024 * 1024, spill_dir: str | None = None):
+        self.memory_budget = memory_budget
+        self._spill_root = spill_dir
+        self._spill_dir: Path | None = None
+        self._memory: OrderedDict[str, tuple[object, int]] = OrderedDict()
+        self._spilled: dict[str, tuple[str, Path]] = {}
+        self._used = 0
+        self._lock = threading.RLock()
+
+    def put(self, name: str, value):
+        name = str(name)
+        size = _estimate_size(value)
+        with self._lock:
+            self.discard(name)
+            if size > self.memory_budget:
+                self._spill(name, value)
+                return
+            self._memory[name] = (value, size)
+            self._used += size
+            while self._used > self.memory_budget and len(self._memory) > 1:
+                old_name, (old_value, old_size) = self._memory.popitem(last=False)
+                self._used -= old_size
+                self._spill(old_name, old_value)
+
+    def get(self, name: str):
+        name = str(name)
+        with self._lock:
+            if name in self._memory:
+                self._memory.move_to_end(name)
+                return self._memory[name][0]
+            if name in self._spilled:
+                kind, path = self._spilled[name]
+                return _load(kind, path)
+        raise KeyError(f"Artefato não encontrado: {name}")
+
+    def discard(self, name: str):
+        name = str(name)
+        with self._lock:
+            if name in self._memory:
+                self._used -= self._memory.pop(name)[1]
+            spilled = self._spilled.pop(name, None)
+            if spilled:
+                spilled[1].unlink(missing_ok=True)
+
+    def names(self) -> list[str]:
+        with self._lock:
+            return list(self._memory) + list(self._spilled)
+
+    def is_spilled(self, name: str) -> bool:
+        return str(name) in self._spilled
+
+    @property
+    def memory_used(self) -> int:
+        return self._used
+
+    def close(self):
+        with self._lock:
+            self._memory.clear()
+            self._spilled.clear()
+            self._used = 0
+            if self._spill_dir is not None:
+                shutil.rmtree(self._spill_dir, ignore_errors=True)
+                self._spill_dir = None
+
+    def __contains__(self, name) -> bool:
+        name = str(name)
+        return name in self._memory or name in self._spilled
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _spill(self, name: str, value):
+        if self._spill_dir is None:
+            self._spill_dir = Path(tempfile.mkdtemp(prefix="pyrpa_artifacts_", dir=self._spill_root))
+        base = self._spill_dir / f"{len(self._spilled)}_{abs(hash(name))}"
+
+        if HAS_PANDAS and isinstance(value, pd.DataFrame) and HAS_PYARROW:
+            kind, path = "parquet", base.with_suffix(".parquet")
+            value.to_parquet(path)
+        elif isinstance(value, (bytes, bytearray, memoryview)):
+            kind, path = "bytes", base.with_suffix(".bin")
+            path.write_bytes(value)
+        elif isinstance(value, str):
+            kind, path = "text", base.with_suffix(".txt")
+            path.write_text(value, encoding="utf-8")
+        else:
+            kind, path = "pickle", base.with_suffix(".pkl")
+            with open(path, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        self._spilled[name] = (kind, path)
+
+
+def _estimate_size(value) -> int:
+    if HAS_PANDAS and isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, memoryview):
+        return value.nbytes
+    return sys.getsizeof(value)
+
+
+def _load(kind: str, path: Path):
+    if kind == "parquet":
+        return pd.read_parquet(path)
+    if kind == "bytes":
+        with open(path, "rb") as f:
+            if path.stat().st_size == 0:
+                return b""
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if kind == "text":
+        return path.read_text(encoding="utf-8")
+    with open(path, "rb") as f:
+        return pickle.load(f)
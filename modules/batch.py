@@ -0,0 +1,135 @@
+"""Execução de um workflow sobre muitas entradas (map) para o PyRPA."""
+
+import copy
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+class WorkflowBatch:
+    """Execução em lote de um workflow, iterável conforme os itens terminam.
+
+    Cada item gera um dict ``{"index", "item", "status", "result"/"error"}``
+    assim que sua execução termina (fora de ordem). Falhas de um item não
+    interrompem o lote; ficam em ``failures``. ``throughput`` informa itens
+    por segundo desde o início.
+
+    Os handlers do engine são compartilhados entre os itens, de modo que
+    sessões HTTP e conexões SMTP abertas por uma thread são reaproveitadas
+    pelos itens seguintes que ela executar.
+    """
+
+    def __init__(self, engine, workflow: dict, inputs, workers: int = 8, placeholder: str = "item"):
+        self.engine = engine
+        self.workflow = workflow
+        self.inputs = inputs
+        self.workers = workers
+        self.placeholder = placeholder
+        self.completed = 0
+        self.succeeded = 0
+        self.failures: list[dict] = []
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+        self._lock = threading.Lock()
+
+    def __iter__(self):
+        self.started_at = time.time()
+        items = iter(enumerate(self.inputs))
+        # Mantém no máximo 2x workers itens em voo: a entrada é consumida sob demanda
+        max_in_flight = self.workers * 2
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="pyrpa-map") as pool:
+            in_flight = {}
+            exhausted = False
+            while True:
+                while not exhausted and len(in_flight) < max_in_flight:
+                    try:
+                        index, item = next(items)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    in_flight[pool.submit(self._run_item, index, item)] = index
+                if not in_flight:
+                    break
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    del in_flight[future]
+                    yield self._record(future.result())
+        self.finished_at = time.time()
+        if self.engine.logger:
+            self.engine.logger.log(
+                f"Lote '{self.workflow.get('name', 'Sem nome')}': {self.completed} item(ns), "
+                f"{len(self.failures)} falha(s), {self.throughput:.1f} itens/s",
+                "INFO" if not self.failures else "WARN",
+            )
+
+    def run(self) -> list[dict]:
+        """Executa o lote inteiro e devolve os resultados na ordem da entrada."""
+        return sorted(self, key=lambda r: r["index"])
+
+    @property
+    def elapsed(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+    @property
+    def throughput(self) -> float:
+        elapsed = self.elapsed
+        return self.completed / elapsed if elapsed > 0 else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "completed": self.completed,
+            "succeeded": self.succeeded,
+            "failed": len(self.failures),
+            "elapsed_s": self.elapsed,
+            "items_per_s": self.throughput,
+        }
+
+    def _run_item(self, index: int, item) -> dict:
+        try:
+            workflow = bind_item(self.workflow, item, self.placeholder)
+            result = self.engine.execute_workflow(workflow)
+        except Exception as e:
+            return {"index": index, "item": item, "status": "Erro", "error": str(e)}
+        entry = {"index": index, "item": item, "status": result["status"], "result": result}
+        if result["status"] != "Sucesso":
+            failed = [r for r in result["steps_results"] if r["status"] != "Sucesso"]
+            entry["error"] = failed[-1].get("error", "") if failed else ""
+        return entry
+
+    def _record(self, entry: dict) -> dict:
+        with self._lock:
+            self.completed += 1
+            if entry["status"] == "Sucesso":
+                self.succeeded += 1
+            else:
+                self.failures.append(
+                    {"index": entry["index"], "item": entry["item"], "error": entry.get("error", "")}
+                )
+        return entry
+
+
+def bind_item(workflow: dict, item, placeholder: str = "item") -> dict:
+    """Copia o workflow substituindo ``{item}`` (e ``{campo}`` se o item for dict) nos parâmetros."""
+    replacements = {"{" + placeholder + "}": str(item)}
+    if isinstance(item, dict):
+        replacements.update({"{" + str(k) + "}": str(v) for k, v in item.items()})
+
+    bound = copy.deepcopy(workflow)
+    for step in bound.get("steps", []):
+        step["params"] = _substitute(step.get("params", {}), replacements)
+    return bound
+
+
+def _substitute(value, replacements: dict):
+    if isinstance(value, str):
+        for token, text in replacements.items():
+            if token in value:
+                value = value.replace(token, text)
+        return value
+    if isinstance(value, dict):
+        return {k: _substitute(v, replacements) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_substitute(v, replacements) for v in value]
+    return value
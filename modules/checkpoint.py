@@ -0,0 +1,160 @@
+"""Checkpoints de execução de workflows para o PyRPA."""
+
+import json
+import pickle
+import sqlite3
+import uuid
+from datetime import datetime
+
+
+class CheckpointStore:
+    """Journal SQLite com o progresso de cada execução de workflow.
+
+    Cada etapa concluída é gravada assim que termina, junto com seu
+    resultado, permitindo retomar uma execução interrompida a partir da
+    etapa que falhou.
+
+    Os artefatos só servem para a retomada: são apagados quando a execução
+    termina com sucesso. Ao fim de cada execução, só as ``max_runs`` mais
+    recentes ficam no banco (``None`` = sem limite).
+    """
+
+    def __init__(self, db_path: str = "pyrpa_runs.db", max_runs: int | None = 500):
+        self.db_path = db_path
+        self.max_runs = max_runs
+        with self._connect() as conn:
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS runs (
+                    run_id     TEXT PRIMARY KEY,
+                    workflow   TEXT NOT NULL,
+                    status     TEXT NOT NULL,
+                    started_at TEXT NOT NULL,
+                    updated_at TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS run_steps (
+                    run_id  TEXT NOT NULL,
+                    step_id TEXT NOT NULL,
+                    status  TEXT NOT NULL,
+                    result  TEXT NOT NULL,
+                    PRIMARY KEY (run_id, step_id)
+                );
+                CREATE TABLE IF NOT EXISTS run_artifacts (
+                    run_id TEXT NOT NULL,
+                    name   TEXT NOT NULL,
+                    data   BLOB NOT NULL,
+                    PRIMARY KEY (run_id, name)
+                );
+                """
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def start_run(self, workflow: dict, run_id: str | None = None) -> str:
+        run_id = run_id or str(uuid.uuid4())[:8]
+        now = _now()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?, ?)",
+                (run_id, json.dumps(workflow, default=str), "Executando", now, now),
+            )
+        return run_id
+
+    def save_step(self, run_id: str, step_result: dict):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO run_steps VALUES (?, ?, ?, ?)",
+                (
+                    run_id,
+                    json.dumps(step_result["step_id"]),
+                    step_result["status"],
+                    json.dumps(step_result, default=str),
+                ),
+            )
+            conn.execute("UPDATE runs SET updated_at = ? WHERE run_id = ?", (_now(), run_id))
+
+    def save_artifact(self, run_id: str, name: str, value):
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO run_artifacts VALUES (?, ?, ?)", (run_id, name, data)
+            )
+
+    def load_artifacts(self, run_id: str) -> dict:
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT name, data FROM run_artifacts WHERE run_id = ?", (run_id,)
+            ).fetchall()
+        return {name: pickle.loads(data) for name, data in rows}
+
+    def finish_run(self, run_id: str, status: str):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE runs SET status = ?, updated_at = ? WHERE run_id = ?",
+                (status, _now(), run_id),
+            )
+            if status == "Sucesso":
+                conn.execute("DELETE FROM run_artifacts WHERE run_id = ?", (run_id,))
+            if self.max_runs is not None:
+                self._prune(conn, self.max_runs)
+
+    @staticmethod
+    def _prune(conn, keep: int):
+        """Remove as execuções encerradas mais antigas além das ``keep`` mais recentes."""
+        stale = [
+            (run_id,)
+            for run_id, in conn.execute(
+                """
+                SELECT run_id FROM runs WHERE status != 'Executando'
+                ORDER BY updated_at DESC, rowid DESC LIMIT -1 OFFSET ?
+                """,
+                (keep,),
+            )
+        ]
+        for table in ("run_artifacts", "run_steps", "runs"):
+            conn.executemany(f"DELETE FROM {table} WHERE run_id = ?", stale)
+
+    def load_run(self, run_id: str) -> dict:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT workflow, status, started_at, updated_at FROM runs WHERE run_id = ?",
+                (run_id,),
+            ).fetchone()
+            if row is None:
+                raise ValueError(f"Execução não encontrada: {run_id}")
+            steps = conn.execute(
+                "SELECT step_id, result FROM run_steps WHERE run_id = ?", (run_id,)
+            ).fetchall()
+        return {
+            "run_id": run_id,
+            "workflow": json.loads(row[0]),
+            "status": row[1],
+            "started_at": row[2],
+            "updated_at": row[3],
+            "steps": {json.loads(sid): json.loads(result) for sid, result in steps},
+        }
+
+    def list_runs(self, status: str | None = None, limit: int = 100) -> list[dict]:
+        query = "SELECT run_id, workflow, status, started_at, updated_at FROM runs"
+        args: tuple = ()
+        if status:
+            query += " WHERE status = ?"
+            args = (status,)
+        query += " ORDER BY updated_at DESC LIMIT ?"
+        with self._connect() as conn:
+            rows = conn.execute(query, args + (limit,)).fetchall()
+        return [
+            {
+                "run_id": run_id,
+                "workflow": json.loads(workflow).get("name", "Sem nome"),
+                "status": st,
+                "started_at": started_at,
+                "updated_at": updated_at,
+            }
+            for run_id, workflow, st, started_at, updated_at in rows
+        ]
+
+
+def _now() -> str:
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -0,0 +1,381 @@
+"""Expressões cron para o agendador do PyRPA."""
+
+import calendar
+import functools
+from bisect import bisect_left
+from datetime import date, datetime, timedelta
+
+# Procura no máximo este número de anos à frente: expressões que nunca
+# casam (ex.: "0 0 30 2 *") devolvem None em vez de girar para sempre
+MAX_YEARS = 28
+
+MACROS = {
+    "@yearly": "0 0 1 1 *",
+    "@annually": "0 0 1 1 *",
+    "@monthly": "0 0 1 * *",
+    "@weekly": "0 0 * * 0",
+    "@daily": "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@hourly": "0 * * * *",
+}
+
+MONTH_NAMES = {name: i for i, name in enumerate(
+    ("JAN", "FEB", "MAR", "APR", "MAY", "JUN", "JUL", "AUG", "SEP", "OCT", "NOV", "DEC"), start=1
+)}
+DAY_NAMES = {name: i for i, name in enumerate(("SUN", "MON", "TUE", "WED", "THU", "FRI", "SAT"))}
+FIELD_NAMES = {(1, 12): MONTH_NAMES, (0, 7): DAY_NAMES}
+
+
+class CronExpression:
+    """Expressão cron pré-compilada em bitsets.
+
+    Aceita 5 campos (minuto hora dia mês dia-da-semana) ou 6 (com segundos
+    na frente), além das macros ``@daily``, ``@hourly`` etc. Cada campo
+    aceita ``*``, ``?``, listas, intervalos, passos (``*/15``, ``8-18/2``)
+    e nomes (``JAN``, ``MON``). No dia do mês: ``L`` (último dia), ``LW``
+    (último dia útil) e ``15W`` (dia útil mais próximo do dia 15). No dia
+    da semana: ``5L`` (última sexta do mês) e ``1#2`` (segunda segunda).
+    Domingo é 0 ou 7. Como no cron tradicional, se dia do mês e dia da
+    semana forem ambos restritos, basta um dos dois casar.
+
+    Os horários são ``datetime`` ingênuos, no fuso local do processo.
+    """
+
+    def __init__(self, expr: str):
+        self.expr = expr
+        fields = MACROS.get(expr.strip().lower(), expr).split()
+        if len(fields) == 5:
+            fields = ["0"] + fields
+        if len(fields) != 6:
+            raise ValueError(f"Expressão cron inválida '{expr}': esperados 5 ou 6 campos, recebidos {len(fields)}")
+        second, minute, hour, dom, month, dow = fields
+        try:
+            self.seconds = _parse_field(second, 0, 59)
+            self.minutes = _parse_field(minute, 0, 59)
+            self.hours = _parse_field(hour, 0, 23)
+            self.months = _parse_field(month, 1, 12)
+            self._days = _day_rule(dom, dow)
+        except ValueError as e:
+            raise ValueError(f"Expressão cron inválida '{expr}': {e}") from None
+        self._times: list | None = None
+
+    def __repr__(self):
+        return f"CronExpression({self.expr!r})"
+
+    def day_mask(self, year: int, month: int) -> int:
+        """Bitset dos dias (bit 1 = dia 1) do mês em que a expressão dispara."""
+        return self._days.mask(year, month)
+
+    def next_fire(self, after: datetime | None = None) -> datetime | None:
+        """Primeiro disparo estritamente depois de ``after`` (agora, por padrão)."""
+        start = (after or datetime.now()).replace(microsecond=0) + timedelta(seconds=1)
+        year, month, day = start.year, start.month, start.day
+        hour, minute, second = start.hour, start.minute, start.second
+        last_year = start.year + MAX_YEARS
+
+        # Desce campo a campo; ao estourar um campo, avança o de cima e zera os de baixo
+        while year <= last_year:
+            found = _next_bit(self.months, month)
+            if found < 0:
+                year, month, day, hour, minute, second = year + 1, 1, 1, 0, 0, 0
+                continue
+            if found != month:
+                month, day, hour, minute, second = found, 1, 0, 0, 0
+            found = _next_bit(self.day_mask(year, month), day)
+            if found < 0:
+                month, day, hour, minute, second = month + 1, 1, 0, 0, 0
+                continue
+            if found != day:
+                day, hour, minute, second = found, 0, 0, 0
+            found = _next_bit(self.hours, hour)
+            if found < 0:
+                day, hour, minute, second = day + 1, 0, 0, 0
+                continue
+            if found != hour:
+                hour, minute, second = found, 0, 0
+            found = _next_bit(self.minutes, minute)
+            if found < 0:
+                hour, minute, second = hour + 1, 0, 0
+                continue
+            if found != minute:
+                minute, second = found, 0
+            found = _next_bit(self.seconds, second)
+            if found < 0:
+                minute, second = minute + 1, 0
+                continue
+            return datetime(year, month, day, hour, minute, found)
+        return None
+
+    def next_fires(self, count: int, after: datetime | None = None) -> list[datetime]:
+        """Os próximos ``count`` disparos depois de ``after``."""
+        fires = []
+        if count <= 0:
+            return fires
+        for fire in self.iter_fires(after):
+            fires.append(fire)
+            if len(fires) >= count:
+                break
+        return fires
+
+    def iter_fires(self, after: datetime | None = None, until: datetime | None = None):
+        """Disparos em ordem, depois de ``after`` e antes de ``until`` (exclusivos).
+
+        Percorre só os dias que casam (pelos bitsets) e, em cada um, a lista
+        pré-calculada de horários do dia, sem reavaliar a expressão a cada
+        disparo.
+        """
+        start = (after or datetime.now()).replace(microsecond=0) + timedelta(seconds=1)
+        last_day = date(start.year + MAX_YEARS, 12, 31)
+        if until is not None:
+            last_day = min(last_day, until.date())
+        return self._fires(self._iter_days(start.date(), last_day), start, until)
+
+    def _fires(self, days, start: datetime, until: datetime | None):
+        times = self._times_of_day()
+        start_day = start.date()
+        start_offset = bisect_left(times, (_seconds(start),))
+        end_day = end_offset = None
+        if until is not None:
+            end_day = until.date()
+            end_offset = bisect_left(times, (_seconds(until) + (1 if until.microsecond else 0),))
+        for day in days:
+            low = start_offset if day == start_day else 0
+            high = end_offset if day == end_day else None
+            year, month, dom = day.year, day.month, day.day
+            for _, hour, minute, second in times[low:high]:
+                yield datetime(year, month, dom, hour, minute, second)
+
+    def _iter_days(self, start: date, end: date):
+        year, month, day = start.year, start.month, start.day
+        while (year, month) <= (end.year, end.month):
+            if self.months >> month & 1:
+                mask = self.day_mask(year, month) >> day
+                while mask:
+                    low = mask & -mask
+                    day += low.bit_length() - 1
+                    current = date(year, month, day)
+                    if current > end:
+                        return
+                    yield current
+                    mask = (mask ^ low) >> (low.bit_length() - 1)
+            month, day = month + 1, 1
+            if month > 12:
+                year, month = year + 1, 1
+
+    def _times_of_day(self) -> list[tuple]:
+        # (segundos desde 0h, hora, minuto, segundo), ordenado
+        if self._times is None:
+            self._times = [
+                (h * 3600 + m * 60 + s, h, m, s)
+                for h in _bits(self.hours) for m in _bits(self.minutes) for s in _bits(self.seconds)
+            ]
+        return self._times
+
+
+class _DayRule:
+    """Campos de dia do mês e dia da semana, com os bitsets por mês em cache.
+
+    Compartilhada (via ``_day_rule``) entre expressões com os mesmos campos
+    de dia, de modo que o calendário de um catálogo calcula cada mês uma vez.
+    """
+
+    def __init__(self, dom: str, dow: str):
+        self._parse_dom(dom)
+        self._parse_dow(dow)
+        self._masks: dict[tuple[int, int], int] = {}
+
+    def _parse_dom(self, field: str):
+        self.dom_any = field in ("*", "?")
+        self.dom = 0
+        self._dom_last = False
+        self._dom_last_weekday = False
+        self._dom_nearest: list[int] = []
+        plain = []
+        for part in field.split(","):
+            upper = part.upper()
+            if upper == "L":
+                self._dom_last = True
+            elif upper == "LW":
+                self._dom_last_weekday = True
+            elif upper.endswith("W"):
+                day = _parse_int(upper[:-1], 1, 31)
+                self._dom_nearest.append(day)
+            else:
+                plain.append(part)
+        if plain:
+            self.dom = _parse_field(",".join(plain), 1, 31)
+
+    def _parse_dow(self, field: str):
+        self.dow_any = field in ("*", "?")
+        self.dow = 0
+        self._dow_last: list[int] = []  # dias da semana (0=domingo) com "última ocorrência"
+        self._dow_nth: list[tuple[int, int]] = []  # (dia da semana, ocorrência 1-5)
+        plain = []
+        for part in field.split(","):
+            upper = part.upper()
+            if "#" in upper:
+                day, nth = upper.split("#", 1)
+                self._dow_nth.append((_parse_int(day, 0, 7, DAY_NAMES) % 7, _parse_int(nth, 1, 5)))
+            elif upper.endswith("L") and len(upper) > 1:
+                self._dow_last.append(_parse_int(upper[:-1], 0, 7, DAY_NAMES) % 7)
+            else:
+                plain.append(part)
+        if plain:
+            mask = _parse_field(",".join(plain), 0, 7)
+            # 7 também é domingo
+            self.dow = (mask | (mask >> 7)) & 0x7F
+
+    def mask(self, year: int, month: int) -> int:
+        key = (year, month)
+        mask = self._masks.get(key)
+        if mask is not None:
+            return mask
+        first_weekday, n_days = calendar.monthrange(year, month)
+        valid = (1 << (n_days + 1)) - 2
+
+        dom = self.dom & valid
+        if self._dom_last:
+            dom |= 1 << n_days
+        if self._dom_last_weekday:
+            dom |= 1 << _nearest_weekday(year, month, n_days, n_days)
+        for day in self._dom_nearest:
+            if day <= n_days:
+                dom |= 1 << _nearest_weekday(year, month, day, n_days)
+
+        dow = 0
+        # Dia da semana do dia 1 no padrão cron (0=domingo)
+        first = (first_weekday + 1) % 7
+        if self.dow:
+            for day in range(1, n_days + 1):
+                if self.dow >> ((first + day - 1) % 7) & 1:
+                    dow |= 1 << day
+        for weekday in self._dow_last:
+            last_weekday = (first + n_days - 1) % 7
+            dow |= 1 << (n_days - (last_weekday - weekday) % 7)
+        for weekday, nth in self._dow_nth:
+            day = 1 + (weekday - first) % 7 + 7 * (nth - 1)
+            if day <= n_days:
+                dow |= 1 << day
+
+        # Ambos restritos: casa qualquer um (semântica do Vixie cron)
+        if self.dom_any and self.dow_any:
+            mask = valid
+        elif self.dom_any:
+            mask = dow
+        elif self.dow_any:
+            mask = dom
+        else:
+            mask = dom | dow
+
+        if len(self._masks) >= 1024:
+            self._masks.clear()
+        self._masks[key] = mask
+        return mask
+
+
+@functools.lru_cache(maxsize=1024)
+def _day_rule(dom: str, dow: str) -> _DayRule:
+    return _DayRule(dom, dow)
+
+
+@functools.lru_cache(maxsize=16384)
+def parse_cron(expr: str) -> CronExpression:
+    """``CronExpression`` compilada e compartilhada por texto da expressão."""
+    return CronExpression(expr)
+
+
+def fire_calendar(jobs: dict, start: datetime | None = None, end: datetime | None = None,
+                  days: int = 30) -> dict:
+    """Disparos de vários jobs numa janela: ``{chave: [datetime, ...]}``.
+
+    ``jobs`` mapeia uma chave qualquer (ex.: id da tarefa) para a expressão
+    cron. A janela vai de ``start`` (agora, por padrão) até ``end`` (ou
+    ``days`` dias depois), exclusivos. Expressões repetidas no catálogo são
+    calculadas uma vez, e os dias que casam são compartilhados entre
+    expressões com os mesmos campos de mês e dia.
+    """
+    start = (start or datetime.now()).replace(microsecond=0)
+    end = end or start + timedelta(days=days)
+    first = start + timedelta(seconds=1)
+    computed: dict[str, list] = {}
+    matching_days: dict[tuple, list] = {}
+    result = {}
+    for key, expr in jobs.items():
+        cron = expr if isinstance(expr, CronExpression) else parse_cron(expr)
+        fires = computed.get(cron.expr)
+        if fires is None:
+            day_key = (cron.months, cron._days)
+            day_list = matching_days.get(day_key)
+            if day_list is None:
+                day_list = matching_days[day_key] = list(cron._iter_days(first.date(), end.date()))
+            fires = computed[cron.expr] = list(cron._fires(day_list, first, end))
+        result[key] = list(fires)
+    return result
+
+
+@functools.lru_cache(maxsize=4096)
+def _parse_field(field: str, low: int, high: int) -> int:
+    """Bitset dos valores de um campo (bit ``n`` ligado = valor ``n``)."""
+    names = FIELD_NAMES.get((low, high))
+    mask = 0
+    for part in field.split(","):
+        if not part:
+            raise ValueError(f"item vazio em '{field}'")
+        value, _, step_text = part.partition("/")
+        step = _parse_int(step_text, 1, high - low + 1) if step_text else 1
+        if value in ("*", "?"):
+            start, stop = low, high
+        elif "-" in value:
+            first, last = value.split("-", 1)
+            start, stop = _parse_int(first, low, high, names), _parse_int(last, low, high, names)
+            if start > stop:
+                raise ValueError(f"intervalo decrescente '{value}'")
+        else:
+            start = _parse_int(value, low, high, names)
+            stop = high if step_text else start
+        for bit in range(start, stop + 1, step):
+            mask |= 1 << bit
+    return mask
+
+
+def _parse_int(text: str, low: int, high: int, names: dict | None = None) -> int:
+    text = text.strip().upper()
+    if names and text in names:
+        return names[text]
+    if not text.isdigit():
+        raise ValueError(f"valor inválido '{text}'")
+    value = int(text)
+    if not low <= value <= high:
+        raise ValueError(f"valor {value} fora do intervalo {low}-{high}")
+    return value
+
+
+def _seconds(moment: datetime) -> int:
+    return moment.hour * 3600 + moment.minute * 60 + moment.second
+
+
+def _next_bit(mask: int, start: int) -> int:
+    """Menor bit ligado em ``mask`` com índice >= ``start`` (ou -1)."""
+    rest = mask >> start
+    if not rest:
+        return -1
+    return start + (rest & -rest).bit_length() - 1
+
+
+def _bits(mask: int) -> list[int]:
+    bits = []
+    while mask:
+        low = mask & -mask
+        bits.append(low.bit_length() - 1)
+        mask ^= low
+    return bits
+
+
+def _nearest_weekday(year: int, month: int, day: int, n_days: int) -> int:
+    """Dia útil (seg-sex) mais próximo de ``day`` sem sair do mês."""
+    weekday = calendar.weekday(year, month, day)
+    if weekday == 5:  # sábado
+        return day - 1 if day > 1 else day + 2
+    if weekday == 6:  # domingo
+        return day + 1 if day < n_days else day - 2
+    return day
@@ -0,0 +1,345 @@
+"""Detecção de arquivos duplicados por conteúdo para o PyRPA."""
+
+import hashlib
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+
+from modules.scanner import FileScanner
+
+try:
+    import xxhash
+    HAS_XXHASH = True
+except ImportError:
+    HAS_XXHASH = False
+
+# Algoritmos de hash do conteúdo (xxh3 só com ``pip install xxhash``)
+HASH_ALGORITHMS = ["blake2b"] + (["xxh3"] if HAS_XXHASH else [])
+
+DEDUP_ACTIONS = {
+    "report": "Só relatório",
+    "hardlink": "Substituir por hardlink",
+    "move": "Mover duplicados para outra pasta",
+}
+
+# Arquivos lidos por lote no pool (e linhas por consulta ao SQLite)
+_BATCH = 2000
+
+
+class HashIndex:
+    """Índice SQLite de hashes já calculados, por caminho.
+
+    Cada linha vale enquanto o arquivo tiver o mesmo tamanho e mtime; numa
+    nova varredura, só arquivos novos ou alterados são lidos de novo. O
+    hash parcial (início + fim do arquivo) e o completo são guardados
+    separadamente, já que o completo só é calculado quando o parcial empata.
+    """
+
+    def __init__(self, db_path: str = "pyrpa_hashes.db"):
+        self.db_path = db_path
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS hashes (
+                    path       TEXT PRIMARY KEY,
+                    size       INTEGER NOT NULL,
+                    mtime_ns   INTEGER NOT NULL,
+                    algo       TEXT NOT NULL,
+                    partial    TEXT,
+                    full       TEXT,
+                    checked_at TEXT NOT NULL
+                ) WITHOUT ROWID;
+                """
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def count(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM hashes").fetchone()[0]
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM hashes")
+
+
+class DuplicateFinder:
+    """Encontra arquivos de conteúdo idêntico em três etapas, da mais barata à mais cara.
+
+    1. Agrupa por tamanho: arquivo de tamanho único não pode ter duplicata
+       e nunca é lido.
+    2. Nos tamanhos repetidos, calcula um hash parcial (``partial_bytes``
+       do início e do fim). Arquivos pequenos já são lidos inteiros aqui.
+    3. Só onde tamanho e hash parcial empatam, calcula o hash completo,
+       lendo o arquivo em blocos.
+
+    A varredura e os agrupamentos ficam em tabelas temporárias do SQLite
+    (memória constante para milhões de arquivos); os hashes são calculados
+    num pool de processos (``processes=False`` usa threads) e gravados no
+    ``HashIndex``. Hardlinks do mesmo arquivo contam como um só.
+    """
+
+    def __init__(self, index: HashIndex | None = None, workers: int | None = None, processes: bool = True,
+                 partial_bytes: int = 64 * 1024, algo: str = "blake2b", on_progress=None):
+        if algo not in HASH_ALGORITHMS:
+            raise ValueError(f"Algoritmo de hash indisponível: {algo}")
+        self.index = index or HashIndex()
+        self.workers = workers or os.cpu_count() or 4
+        self.processes = processes
+        self.partial_bytes = partial_bytes
+        self.algo = algo
+        self.on_progress = on_progress
+
+    def find(self, folder: str, scanner: FileScanner | None = None, prune=()) -> dict:
+        """Devolve as estatísticas da busca e os grupos de duplicados.
+
+        Cada grupo é ``{"size", "hash", "keep", "duplicates"}``: ``keep`` é o
+        arquivo mais antigo (mtime, depois caminho) e ``duplicates`` os demais.
+        """
+        scanner = scanner or FileScanner(recursive=True)
+        stats = {
+            "files": 0, "candidates": 0, "cached": 0, "hashed_partial": 0, "hashed_full": 0,
+            "bytes_read": 0, "errors": 0, "groups": [], "duplicates": 0, "wasted_bytes": 0,
+        }
+        start = time.perf_counter()
+        conn = self.index._connect()
+        try:
+            conn.executescript(
+                """
+                CREATE TEMP TABLE scan (
+                    path TEXT PRIMARY KEY, rel TEXT NOT NULL, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL,
+                    dev INTEGER, ino INTEGER, partial TEXT, full TEXT, UNIQUE (dev, ino)
+                );
+                """
+            )
+            self._scan(conn, folder, scanner, prune, stats)
+            self._progress("Agrupando por tamanho", stats, start)
+            conn.executescript(
+                """
+                CREATE INDEX temp.scan_size ON scan (size, partial);
+                CREATE TEMP TABLE sizes AS SELECT size FROM scan GROUP BY size HAVING COUNT(*) > 1;
+                """
+            )
+            stats["candidates"] = conn.execute(
+                "SELECT COUNT(*) FROM scan WHERE size IN (SELECT size FROM sizes)"
+            ).fetchone()[0]
+            stats["cached"] = self._reuse_index(conn)
+
+            with self._pool() as pool:
+                self._hash_stage(conn, pool, stats, start, full=False)
+                self._hash_stage(conn, pool, stats, start, full=True)
+
+            self._save_index(conn)
+            self._collect(conn, stats)
+        finally:
+            conn.close()
+        stats["elapsed_s"] = round(time.perf_counter() - start, 3)
+        self._progress("Concluído", stats, start)
+        return stats
+
+    def apply(self, groups: list[dict], action: str, target: str | None = None) -> dict:
+        """Aplica ``action`` aos duplicados de ``groups`` (resultado de ``find``).
+
+        ``hardlink`` troca cada duplicado por um hardlink para o arquivo
+        mantido (mesmo volume); ``move`` leva os duplicados para ``target``,
+        preservando o caminho relativo à pasta analisada. Arquivos alterados
+        desde a busca são ignorados.
+        """
+        if action not in DEDUP_ACTIONS:
+            raise ValueError(f"Ação inválida: {action}")
+        result = {"done": 0, "freed_bytes": 0, "errors": []}
+        if action == "report":
+            return result
+        if action == "move" and not target:
+            raise ValueError("Informe a pasta de destino dos duplicados")
+        for group in groups:
+            keep = group["keep"]
+            if not _unchanged(keep):
+                result["errors"].append(f"{keep['path']}: alterado desde a busca")
+                continue
+            for dup in group["duplicates"]:
+                try:
+                    if not _unchanged(dup):
+                        raise RuntimeError("alterado desde a busca")
+                    if action == "hardlink":
+                        _replace_with_link(keep["path"], dup["path"])
+                    else:
+                        dest = os.path.join(target, dup["rel"])
+                        if os.path.exists(dest):
+                            raise RuntimeError(f"já existe {dest}")
+                        os.makedirs(os.path.dirname(dest), exist_ok=True)
+                        shutil.move(dup["path"], dest)
+                except Exception as e:
+                    result["errors"].append(f"{dup['path']}: {e}")
+                    continue
+                result["done"] += 1
+                result["freed_bytes"] += group["size"]
+        return result
+
+    def _pool(self):
+        if self.processes:
+            # "spawn": fork de um processo com threads (Streamlit, agendador) pode herdar locks travados
+            return ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="pyrpa-hash")
+
+    def _scan(self, conn, folder: str, scanner: FileScanner, prune, stats: dict):
+        rows = []
+        for entry in scanner.scan(folder, prune=prune):
+            st = entry.stat()
+            if st.st_size == 0:
+                continue
+            # st_ino vem zerado do scandir no Windows: sem inode, não há como juntar hardlinks
+            ino = st.st_ino or None
+            rows.append((entry.path, entry.rel, st.st_size, st.st_mtime_ns, st.st_dev if ino else None, ino))
+            if len(rows) >= _BATCH:
+                stats["files"] += _insert_scan(conn, rows)
+                rows = []
+        stats["files"] += _insert_scan(conn, rows)
+
+    def _reuse_index(self, conn) -> int:
+        conn.execute(
+            """
+            UPDATE scan SET (partial, full) = (
+                SELECT h.partial, h.full FROM hashes h
+                WHERE h.path = scan.path AND h.size = scan.size AND h.mtime_ns = scan.mtime_ns AND h.algo = ?
+            )
+            WHERE size IN (SELECT size FROM sizes)
+            """,
+            (self.algo,),
+        )
+        return conn.execute("SELECT COUNT(*) FROM scan WHERE partial IS NOT NULL").fetchone()[0]
+
+    def _hash_stage(self, conn, pool, stats: dict, start: float, full: bool):
+        if full:
+            stage, counter = "Hash completo", "hashed_full"
+            query = """
+                SELECT s.path, s.size FROM scan s
+                WHERE s.full IS NULL AND s.partial IS NOT NULL AND s.path > ? AND EXISTS (
+                    SELECT 1 FROM scan t WHERE t.size = s.size AND t.partial = s.partial AND t.path <> s.path
+                )
+                ORDER BY s.path LIMIT ?
+            """
+        else:
+            stage, counter = "Hash parcial", "hashed_partial"
+            query = """
+                SELECT path, size FROM scan
+                WHERE partial IS NULL AND size IN (SELECT size FROM sizes) AND path > ?
+                ORDER BY path LIMIT ?
+            """
+        last = ""
+        while True:
+            rows = conn.execute(query, (last, _BATCH)).fetchall()
+            if not rows:
+                return
+            last = rows[-1][0]
+            small = 2 * self.partial_bytes
+            jobs = [(path, size, full or size <= small, self.partial_bytes, self.algo) for path, size in rows]
+            chunksize = max(1, len(jobs) // (self.workers * 4))
+            updates = []
+            for (path, size), (_, _, whole, _, _), digest in zip(
+                rows, jobs, pool.map(_hash_file, jobs, chunksize=chunksize)
+            ):
+                if digest is None:
+                    stats["errors"] += 1
+                    continue
+                stats[counter] += 1
+                stats["bytes_read"] += size if whole else small
+                updates.append((digest if not full else None, digest if whole else None, path))
+            conn.executemany(
+                "UPDATE scan SET partial = COALESCE(?, partial), full = COALESCE(?, full) WHERE path = ?",
+                updates,
+            )
+            conn.commit()
+            self._progress(stage, stats, start)
+
+    def _save_index(self, conn):
+        conn.execute(
+            """
+            INSERT INTO hashes (path, size, mtime_ns, algo, partial, full, checked_at)
+            SELECT path, size, mtime_ns, ?, partial, full, ? FROM scan WHERE partial IS NOT NULL
+            ON CONFLICT (path) DO UPDATE SET size = excluded.size, mtime_ns = excluded.mtime_ns,
+                algo = excluded.algo, partial = excluded.partial, full = excluded.full,
+                checked_at = excluded.checked_at
+            """,
+            (self.algo, datetime.now().strftime("%Y-%m-%d %H:%M:%S")),
+        )
+        conn.commit()
+
+    def _collect(self, conn, stats: dict):
+        rows = conn.execute(
+            """
+            SELECT size, full, path, rel, mtime_ns FROM scan
+            WHERE full IS NOT NULL AND (size, full) IN (
+                SELECT size, full FROM scan WHERE full IS NOT NULL GROUP BY size, full HAVING COUNT(*) > 1
+            )
+            ORDER BY size DESC, full, mtime_ns, path
+            """
+        )
+        group = None
+        for size, digest, path, rel, mtime_ns in rows:
+            item = {"path": path, "rel": rel, "size": size, "mtime_ns": mtime_ns}
+            if group is None or (group["size"], group["hash"]) != (size, digest):
+                group = {"size": size, "hash": digest, "keep": item, "duplicates": []}
+                stats["groups"].append(group)
+                continue
+            group["duplicates"].append(item)
+            stats["duplicates"] += 1
+            stats["wasted_bytes"] += size
+
+    def _progress(self, stage: str, stats: dict, start: float):
+        if self.on_progress:
+            elapsed = time.perf_counter() - start
+            self.on_progress({
+                **{k: v for k, v in stats.items() if k != "groups"},
+                "stage": stage,
+                "elapsed_s": round(elapsed, 3),
+                "bytes_per_s": stats["bytes_read"] / elapsed if elapsed > 0 else 0.0,
+            })
+
+
+def _hash_file(job: tuple) -> str | None:
+    """Hash do arquivo inteiro ou só do início + fim (roda nos processos do pool)."""
+    path, size, whole, partial_bytes, algo = job
+    digest = xxhash.xxh3_128() if algo == "xxh3" else hashlib.blake2b(digest_size=20)
+    try:
+        with open(path, "rb") as f:
+            if whole:
+                while chunk := f.read(1024 * 1024):
+                    digest.update(chunk)
+            else:
+                digest.update(f.read(partial_bytes))
+                f.seek(size - partial_bytes)
+                digest.update(f.read(partial_bytes))
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+
+def _insert_scan(conn, rows: list) -> int:
+    before = conn.total_changes
+    conn.executemany("INSERT OR IGNORE INTO scan (path, rel, size, mtime_ns, dev, ino) VALUES (?, ?, ?, ?, ?, ?)", rows)
+    return conn.total_changes - before
+
+
+def _unchanged(item: dict) -> bool:
+    try:
+        st = os.stat(item["path"])
+    except OSError:
+        return False
+    return st.st_size == item["size"] and st.st_mtime_ns == item["mtime_ns"]
+
+
+def _replace_with_link(keep: str, dup: str):
+    tmp = f"{dup}.pyrpa-link"
+    os.link(keep, tmp)
+    try:
+        os.replace(tmp, dup)
+    except BaseException:
+        os.unlink(tmp)
+        raise
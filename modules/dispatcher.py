@@ -0,0 +1,133 @@
+"""Despacho de tarefas por prioridade e capacidade para o PyRPA."""
+
+import itertools
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+# Peso de cada prioridade: define a ordem de saída da fila
+PRIORITY_WEIGHTS = {"Baixa": 1, "Média": 2, "Alta": 4, "Crítica": 8}
+
+# Execuções simultâneas por categoria (categorias ausentes não têm limite além do pool)
+DEFAULT_LIMITS = {"Web Scraping": 4, "E-mail": 1}
+
+
+class PriorityDispatcher:
+    """Pool de threads que escolhe o próximo trabalho por prioridade e capacidade.
+
+    Cada trabalho tem uma prioridade (``PRIORITY_WEIGHTS``) e zero ou mais
+    categorias; só começa quando todas as suas categorias estão abaixo do
+    limite (``limits``). Entre os trabalhos que podem começar, sai o de
+    maior pontuação: peso da prioridade + tempo de espera / ``aging_s``.
+    Assim, numa rajada as críticas passam na frente, mas uma tarefa de
+    prioridade baixa esperando há tempo suficiente acaba passando também.
+
+    As filas são separadas por (prioridade, categorias); dentro de cada
+    uma a ordem é FIFO, então cada decisão só compara as cabeças das filas.
+    """
+
+    def __init__(self, max_workers: int = 4, limits: dict | None = None, aging_s: float = 30.0):
+        self.max_workers = max_workers
+        self.limits = dict(DEFAULT_LIMITS if limits is None else limits)
+        self.aging_s = aging_s
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pyrpa-dispatch")
+        self._queues: dict[tuple, deque] = {}
+        self._running: Counter = Counter()
+        self._active = 0
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def submit(self, fn, priority: str = "Média", categories=()) -> Future:
+        """Enfileira ``fn()``; o ``Future`` devolvido pode ser cancelado enquanto pendente."""
+        if priority not in PRIORITY_WEIGHTS:
+            raise ValueError(f"Prioridade inválida: {priority}")
+        if isinstance(categories, str):
+            categories = (categories,)
+        future: Future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Dispatcher encerrado")
+            key = (priority, tuple(sorted(set(categories))))
+            self._queues.setdefault(key, deque()).append((time.monotonic(), next(self._seq), future, fn))
+            self._pump()
+        return future
+
+    def set_limit(self, category: str, limit: int | None):
+        with self._lock:
+            if limit is None:
+                self.limits.pop(category, None)
+            else:
+                self.limits[category] = limit
+            self._pump()
+
+    def stats(self) -> dict:
+        """Fila por prioridade e execuções em andamento por categoria."""
+        with self._lock:
+            queued: Counter = Counter()
+            for (priority, _), queue in self._queues.items():
+                queued[priority] += sum(1 for item in queue if not item[2].cancelled())
+            return {
+                "queued": dict(queued),
+                "running": self._active,
+                "running_by_category": {c: n for c, n in self._running.items() if n},
+                "limits": dict(self.limits),
+            }
+
+    def shutdown(self, wait: bool = True):
+        """Cancela o que ainda está na fila e encerra o pool (esperando os em andamento)."""
+        with self._lock:
+            self._closed = True
+            for queue in self._queues.values():
+                for item in queue:
+                    item[2].cancel()
+            self._queues.clear()
+        self._pool.shutdown(wait=wait)
+
+    def _pump(self):
+        # Chamado com o lock: ocupa as vagas livres com os melhores candidatos
+        while self._active < self.max_workers:
+            key = self._pick()
+            if key is None:
+                return
+            _, _, future, fn = self._queues[key].popleft()
+            if not future.set_running_or_notify_cancel():
+                continue
+            categories = key[1]
+            self._active += 1
+            for category in categories:
+                self._running[category] += 1
+            self._pool.submit(self._work, future, fn, categories)
+
+    def _pick(self) -> tuple | None:
+        now = time.monotonic()
+        best, best_rank = None, None
+        for key, queue in self._queues.items():
+            while queue and queue[0][2].cancelled():
+                queue.popleft()
+            if not queue:
+                continue
+            if any(self._running[c] >= self.limits[c] for c in key[1] if c in self.limits):
+                continue
+            enqueued, seq = queue[0][0], queue[0][1]
+            score = PRIORITY_WEIGHTS[key[0]] + (now - enqueued) / self.aging_s
+            rank = (-score, seq)
+            if best_rank is None or rank < best_rank:
+                best, best_rank = key, rank
+        return best
+
+    def _work(self, future: Future, fn, categories: tuple):
+        try:
+            result = fn()
+        except Exception as e:
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+        finally:
+            with self._lock:
+                self._active -= 1
+                for category in categories:
+                    self._running[category] -= 1
+                if not self._closed:
+                    self._pump()
@@ -1,15 +1,33 @@
 """Módulo de operações de e-mail para o PyRPA."""
 
 import smtplib
+import threading
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.base import MIMEBase
 from email import encoders
 
 
+def _smtp_timeout() -> float:
+    """Timeout das operações SMTP limitado ao prazo restante da etapa (30 s sem prazo)."""
+    # Import tardio: step_handlers importa este módulo
+    from modules.step_handlers import current_deadline
+
+    remaining = current_deadline().remaining()
+    return 30 if remaining is None else max(0.1, min(30, remaining))
+
+
 class EmailOperations:
 
-    def send_email(self, host, port, user, password, recipients, subject, body, attachment=None) -> dict:
+    def __init__(self):
+        self._idle: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def send_email(
+        self, host, port, user, password, recipients, subject, body, attachment=None, keep_alive=False
+    ) -> dict:
+        """Envia um e-mail. Com ``keep_alive`` a conexão SMTP autenticada é devolvida
+        a um pool desta instância e reaproveitada nos envios seguintes."""
         try:
             msg = MIMEMultipart()
             msg["From"] = user
@@ -24,15 +42,58 @@ class EmailOperations:
                 part.add_header("Content-Disposition", f"attachment; filename={attachment.name}")
                 msg.attach(part)
 
-            with smtplib.SMTP(host, port) as server:
-                server.starttls()
-                server.login(user, password)
-                server.sendmail(user, recipients, msg.as_string())
+            if keep_alive:
+                self._send_pooled(host, port, user, password, recipients, msg.as_string())
+            else:
+                with smtplib.SMTP(host, port, timeout=_smtp_timeout()) as server:
+                    server.starttls()
+                    server.login(user, password)
+                    server.sendmail(user, recipients, msg.as_string())
 
             return {"status": "Sucesso", "message": f"E-mail enviado para {', '.join(recipients)}"}
         except Exception as e:
             return {"status": "Erro", "message": str(e)}
 
+    def close_connections(self):
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for servers in idle.values():
+            for server in servers:
+                try:
+                    server.quit()
+                except (smtplib.SMTPException, OSError):
+                    server.close()
+
+    def _send_pooled(self, host, port, user, password, recipients, message: str):
+        key = (host, port, user)
+        with self._lock:
+            servers = self._idle.get(key)
+            server = servers.pop() if servers else None
+        timeout = _smtp_timeout()
+        if server is not None:
+            try:
+                server.timeout = timeout
+                server.sock.settimeout(timeout)
+                server.sendmail(user, recipients, message)
+            except smtplib.SMTPServerDisconnected:
+                server.close()
+                server = None  # conexão expirou no servidor: reconecta abaixo
+            except BaseException:
+                # Estado da sessão incerto (destinatário recusado, timeout...): não volta ao pool
+                server.close()
+                raise
+        if server is None:
+            server = smtplib.SMTP(host, port, timeout=timeout)
+            try:
+                server.starttls()
+                server.login(user, password)
+                server.sendmail(user, recipients, message)
+            except BaseException:
+                server.close()
+                raise
+        with self._lock:
+            self._idle.setdefault(key, []).append(server)
+
     def generate_script(self, use_tls: bool = True, use_template: bool = False) -> str:
         if use_template:
             return '''"""
@@ -6,10 +6,25 @@ import glob
 from datetime import datetime
 from pathlib import Path
 
+from modules.dedup import DEDUP_ACTIONS, DuplicateFinder, HashIndex
+from modules.scanner import FileScanner
+from modules.sync_manifest import SyncManifest
+from modules.transfer import TransferEngine, format_rate
+
 
 class FileOperations:
 
-    def copy_or_move(self, src: str, dst: str, ext: str | None, operation: str) -> dict:
+    def copy_or_move(self, src: str, dst: str, ext: str | None, operation: str,
+                     io_depth: int = 8, on_progress=None, scanner: FileScanner | None = None) -> dict:
+        """Copia ou move os arquivos de ``src`` (filtro ``*{ext}``) para ``dst``.
+
+        Com ``scanner``, os filtros dele substituem ``ext`` (e, se recursivo,
+        as subpastas são recriadas no destino). A pasta é lida aos poucos e
+        até ``io_depth`` arquivos são transferidos ao mesmo tempo
+        (``TransferEngine``).
+        ``on_progress(stats)`` recebe arquivos, bytes, bytes/s e arquivos/s
+        durante a transferência. As estatísticas finais vão em ``data``.
+        """
         try:
             src_path = Path(src)
             dst_path = Path(dst)
@@ -19,68 +34,189 @@ class FileOperations:
 
             dst_path.mkdir(parents=True, exist_ok=True)
 
-            pattern = f"*{ext}" if ext else "*"
-            files = list(src_path.glob(pattern))
-            files = [f for f in files if f.is_file()]
+            scanner = scanner or FileScanner.from_ext(ext)
+            engine = TransferEngine(io_depth=io_depth, on_progress=on_progress)
+            stats = engine.run(_scan_files(scanner, str(src_path), str(dst_path)), move=operation != "copiar")
 
-            if not files:
+            if not stats["files"] and not stats["failed"]:
                 return {"status": "Sucesso", "message": "Nenhum arquivo encontrado com o filtro informado."}
 
-            count = 0
-            for f in files:
-                dest_file = dst_path / f.name
-                if operation == "copiar":
-                    shutil.copy2(f, dest_file)
-                else:
-                    shutil.move(str(f), str(dest_file))
-                count += 1
-
             verb = "copiado(s)" if operation == "copiar" else "movido(s)"
-            return {"status": "Sucesso", "message": f"{count} arquivo(s) {verb} para {dst}"}
+            message = f"{stats['files']} arquivo(s) {verb} para {dst} ({format_rate(stats)})"
+            if stats["failed"]:
+                message += f" — {stats['failed']} falha(s): {'; '.join(stats['errors'][:3])}"
+                return {"status": "Erro", "message": message, "data": stats}
+            return {"status": "Sucesso", "message": message, "data": stats}
         except Exception as e:
             return {"status": "Erro", "message": str(e)}
 
-    def batch_rename(self, folder: str, prefix: str, add_date: bool, add_seq: bool) -> dict:
+    def sync(self, src: str, dst: str, ext: str | None = None, mirror_deletes: bool = False,
+             verify_hash: bool = False, io_depth: int = 8, on_progress=None,
+             manifest: SyncManifest | None = None, scanner: FileScanner | None = None) -> dict:
+        """Sincroniza ``src`` → ``dst`` copiando só arquivos novos ou alterados.
+
+        O que já foi copiado fica no ``SyncManifest`` (tamanho, mtime e,
+        com ``verify_hash``, o hash do conteúdo). Com ``mirror_deletes``,
+        arquivos que sumiram da origem desde a última sincronização são
+        apagados do destino (respeitando as regras de caminho do ``scanner``).
+        """
+        try:
+            src_path = Path(src)
+            dst_path = Path(dst)
+
+            if not src_path.exists():
+                return {"status": "Erro", "message": f"Pasta de origem não encontrada: {src}"}
+
+            dst_path.mkdir(parents=True, exist_ok=True)
+
+            scanner = scanner or FileScanner.from_ext(ext)
+            manifest = manifest or SyncManifest(os.environ.get("PYRPA_SYNC_DB", "pyrpa_sync.db"))
+            engine = TransferEngine(io_depth=io_depth, on_progress=on_progress)
+            with manifest.open(str(src_path), str(dst_path)) as run:
+                entries = scanner.scan(str(src_path), prune=[str(dst_path)])
+                files = run.plan(entries, verify_hash)
+                stats = engine.run(files, on_file=run.record)
+                stats["skipped"] = run.skipped
+                stats["deleted"] = 0
+                if mirror_deletes:
+                    removed = []
+                    for name in run.stale(scanner.matches_path):
+                        if (src_path / name).exists():
+                            continue  # ainda na origem, só ficou fora do filtro (tamanho/idade)
+                        try:
+                            os.unlink(dst_path / name)
+                        except FileNotFoundError:
+                            pass
+                        except OSError as e:
+                            stats["failed"] += 1
+                            stats["errors"].append(f"{dst_path / name}: {e}")
+                            continue
+                        removed.append(name)
+                    run.drop(removed)
+                    stats["deleted"] = len(removed)
+
+            message = (
+                f"{stats['files']} arquivo(s) sincronizado(s) para {dst}, {stats['skipped']} inalterado(s)"
+                + (f", {stats['deleted']} removido(s) do destino" if mirror_deletes else "")
+                + (f" ({format_rate(stats)})" if stats["files"] else "")
+            )
+            if stats["failed"]:
+                message += f" — {stats['failed']} falha(s): {'; '.join(stats['errors'][:3])}"
+                return {"status": "Erro", "message": message, "data": stats}
+            return {"status": "Sucesso", "message": message, "data": stats}
+        except Exception as e:
+            return {"status": "Erro", "message": str(e)}
+
+    def find_duplicates(self, folder: str, action: str = "report", target: str | None = None,
+                        scanner: FileScanner | None = None, workers: int | None = None,
+                        algo: str = "blake2b", on_progress=None, index: HashIndex | None = None,
+                        processes: bool = False) -> dict:
+        """Procura arquivos de conteúdo idêntico em ``folder`` e aplica ``action``.
+
+        ``action`` é uma das chaves de ``DEDUP_ACTIONS``: ``report`` só lista,
+        ``hardlink`` troca os duplicados por hardlinks e ``move`` os leva para
+        ``target``. Os grupos encontrados vão em ``data["groups"]``.
+        Os hashes são calculados em threads (o hashlib libera o GIL em blocos
+        grandes); ``processes=True`` usa processos, que exigem um script
+        principal protegido por ``if __name__ == "__main__"``.
+        """
+        try:
+            folder_path = Path(folder)
+            if not folder_path.exists():
+                return {"status": "Erro", "message": f"Pasta não encontrada: {folder}"}
+            if action not in DEDUP_ACTIONS:
+                return {"status": "Erro", "message": f"Ação inválida: {action}"}
+            if action == "move" and not target:
+                return {"status": "Erro", "message": "Informe a pasta para onde mover os duplicados."}
+
+            index = index or HashIndex(os.environ.get("PYRPA_HASH_DB", "pyrpa_hashes.db"))
+            finder = DuplicateFinder(index, workers=workers, processes=processes, algo=algo,
+                                     on_progress=on_progress)
+            stats = finder.find(str(folder_path), scanner, prune=[target] if target else ())
+
+            wasted = stats["wasted_bytes"] / 1024 / 1024
+            message = (
+                f"{stats['duplicates']} duplicado(s) em {len(stats['groups'])} grupo(s), "
+                f"{wasted:.1f} MB repetidos ({stats['files']} arquivo(s) analisados, "
+                f"{stats['bytes_read'] / 1024 / 1024:.1f} MB lidos)"
+            )
+            if action != "report" and stats["groups"]:
+                applied = finder.apply(stats["groups"], action, target)
+                stats["applied"] = applied
+                verb = "substituído(s) por hardlink" if action == "hardlink" else f"movido(s) para {target}"
+                message += f". {applied['done']} {verb}"
+                if applied["errors"]:
+                    message += f" — {len(applied['errors'])} falha(s): {'; '.join(applied['errors'][:3])}"
+                    return {"status": "Erro", "message": message, "data": stats}
+            return {"status": "Sucesso", "message": message, "data": stats}
+        except Exception as e:
+            return {"status": "Erro", "message": str(e)}
+
+    def batch_rename(self, folder: str, prefix: str, add_date: bool, add_seq: bool,
+                     scanner: FileScanner | None = None) -> dict:
+        """Renomeia os arquivos de ``folder`` (ou os filtrados por ``scanner``).
+
+        Os caminhos são coletados antes de renomear: a numeração segue a
+        ordem alfabética e renomear durante a leitura da pasta poderia
+        devolver o mesmo arquivo duas vezes. Cada arquivo fica na sua pasta.
+        """
         try:
             folder_path = Path(folder)
             if not folder_path.exists():
                 return {"status": "Erro", "message": f"Pasta não encontrada: {folder}"}
 
-            files = sorted([f for f in folder_path.iterdir() if f.is_file()])
+            scanner = scanner or FileScanner()
+            files = sorted(entry.rel for entry in scanner.scan(str(folder_path)))
             if not files:
                 return {"status": "Sucesso", "message": "Nenhum arquivo encontrado na pasta."}
 
             count = 0
-            for i, f in enumerate(files, 1):
+            stamp = datetime.now().strftime("%Y%m%d_")
+            for i, rel in enumerate(files, 1):
+                f = folder_path / rel
                 new_name = prefix or ""
                 if add_date:
-                    new_name += datetime.now().strftime("%Y%m%d_")
+                    new_name += stamp
                 if add_seq:
                     new_name += f"{i:03d}"
                 new_name += f.suffix
-                f.rename(folder_path / new_name)
+                f.rename(f.parent / new_name)
                 count += 1
 
             return {"status": "Sucesso", "message": f"{count} arquivo(s) renomeado(s)."}
         except Exception as e:
             return {"status": "Erro", "message": str(e)}
 
-    def organize_by_extension(self, folder: str) -> dict:
+    def organize_by_extension(self, folder: str, scanner: FileScanner | None = None) -> dict:
+        """Move cada arquivo para ``folder/<extensão>``, lendo a pasta aos poucos."""
         try:
             folder_path = Path(folder)
             if not folder_path.exists():
                 return {"status": "Erro", "message": f"Pasta não encontrada: {folder}"}
 
-            files = [f for f in folder_path.iterdir() if f.is_file()]
-            moved = 0
-            for f in files:
-                ext = f.suffix.lstrip(".").lower() or "sem_extensao"
+            scanner = scanner or FileScanner()
+            moved = skipped = 0
+            made = set()
+            for entry in scanner.scan(str(folder_path)):
+                ext = os.path.splitext(entry.name)[1].lstrip(".").lower() or "sem_extensao"
                 dest_dir = folder_path / ext
-                dest_dir.mkdir(exist_ok=True)
-                shutil.move(str(f), str(dest_dir / f.name))
+                dest = dest_dir / entry.name
+                if str(dest) == entry.path:
+                    continue
+                if dest.exists():
+                    # Mesmo nome vindo de outra subpasta: não sobrescreve
+                    skipped += 1
+                    continue
+                if ext not in made:
+                    dest_dir.mkdir(exist_ok=True)
+                    made.add(ext)
+                shutil.move(entry.path, str(dest))
                 moved += 1
 
-            return {"status": "Sucesso", "message": f"{moved} arquivo(s) organizados por extensão."}
+            message = f"{moved} arquivo(s) organizados por extensão."
+            if skipped:
+                message += f" {skipped} ignorado(s): já existe arquivo com o mesmo nome no destino."
+            return {"status": "Sucesso", "message": message}
         except Exception as e:
             return {"status": "Erro", "message": str(e)}
 
@@ -132,3 +268,9 @@ if __name__ == "__main__":
         observer.stop()
     observer.join()
 '''
+
+
+def _scan_files(scanner: FileScanner, src: str, dst: str):
+    """Gera ``(origem, destino, tamanho)`` dos arquivos de ``src`` sem montar a lista toda."""
+    for entry in scanner.scan(src, prune=[dst]):
+        yield entry.path, os.path.join(dst, entry.rel), entry.stat().st_size
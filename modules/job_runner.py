@@ -0,0 +1,199 @@
+"""Execução de workflows em segundo plano para o PyRPA."""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+
+from modules.dispatcher import PriorityDispatcher
+
+# Categoria (mesmos nomes do Construtor de Tarefas) pelo ícone do tipo de etapa
+STEP_CATEGORIES = {
+    "📁": "Operação de Arquivo",
+    "🌐": "Web Scraping",
+    "📊": "Excel/CSV",
+    "📧": "E-mail",
+    "📄": "PDF",
+    "🐍": "Custom Script",
+}
+
+
+class JobRunner:
+    """Fila de execuções de workflow atendida por um pool de threads persistente.
+
+    Pensado para ser criado uma única vez por processo (ex.: via
+    ``st.cache_resource``) e compartilhado entre sessões: ``submit`` devolve
+    imediatamente um ``run_id`` e a interface consulta ``status`` depois.
+    O progresso (``steps_done``/``steps_total`` e etapas em andamento) é
+    atualizado a cada evento do engine, sem esperar o fim da execução.
+
+    A fila respeita prioridade e limites por categoria (``PriorityDispatcher``);
+    as categorias de um workflow são as de suas etapas, de modo que um
+    workflow com etapas web ocupa uma vaga de "Web Scraping".
+    """
+
+    def __init__(self, engine, max_concurrent_runs: int = 4, history: int = 500,
+                 limits: dict | None = None, aging_s: float = 30.0):
+        self.engine = engine
+        self.history = history
+        self.dispatcher = PriorityDispatcher(max_concurrent_runs, limits, aging_s)
+        self._runs: OrderedDict[str, dict] = OrderedDict()
+        self._futures: dict = {}
+        self._lock = threading.Lock()
+
+    def submit(self, workflow: dict, priority: str = "Média", **kwargs) -> str:
+        run_id = str(uuid.uuid4())[:8]
+        return self._enqueue(
+            run_id,
+            workflow.get("name", "Sem nome"),
+            lambda on_event: self.engine.execute_workflow(
+                workflow, run_id=run_id, on_event=on_event, **kwargs
+            ),
+            priority,
+            workflow_categories(workflow),
+        )
+
+    def submit_resume(self, run_id: str, workflow_name: str = "Sem nome", priority: str = "Média") -> str:
+        """Enfileira a retomada de uma execução gravada em checkpoint."""
+        try:
+            workflow = self.engine.checkpoints.load_run(run_id)["workflow"]
+        except (AttributeError, ValueError):
+            workflow = {}
+        return self._enqueue(
+            run_id,
+            workflow_name,
+            lambda on_event: self.engine.resume(run_id, on_event=on_event),
+            priority,
+            workflow_categories(workflow),
+        )
+
+    def submit_task(self, name: str, fn, priority: str = "Média", category: str | None = None) -> str:
+        """Enfileira uma tarefa avulsa: ``fn()`` devolve um dict com ``status``."""
+        return self._enqueue(
+            str(uuid.uuid4())[:8], name, lambda on_event: fn(), priority, [category] if category else []
+        )
+
+    def _enqueue(self, run_id: str, workflow_name: str, job, priority: str, categories: list) -> str:
+        record = {
+            "run_id": run_id,
+            "workflow": workflow_name,
+            "priority": priority,
+            "categories": categories,
+            "status": "Pendente",
+            "submitted_at": _now(),
+            "started_at": None,
+            "finished_at": None,
+            "duration": None,
+            "result": None,
+            "error": None,
+            "steps_total": None,
+            "steps_done": 0,
+            "current_steps": [],
+        }
+        with self._lock:
+            self._runs[run_id] = record
+            self._trim()
+            self._futures[run_id] = self.dispatcher.submit(
+                lambda: self._run(run_id, job), priority, categories
+            )
+        return run_id
+
+    def status(self, run_id: str) -> dict:
+        with self._lock:
+            if run_id not in self._runs:
+                raise ValueError(f"Execução não encontrada: {run_id}")
+            return dict(self._runs[run_id])
+
+    def list_runs(self, limit: int = 50) -> list[dict]:
+        with self._lock:
+            runs = list(self._runs.values())[-limit:]
+            return [dict(r) for r in reversed(runs)]
+
+    def cancel(self, run_id: str) -> bool:
+        """Cancela uma execução ainda na fila. Execuções em andamento não são interrompidas."""
+        with self._lock:
+            future = self._futures.get(run_id)
+            if future is None or not future.cancel():
+                return False
+            self._runs[run_id]["status"] = "Cancelado"
+            self._runs[run_id]["finished_at"] = _now()
+            self._futures.pop(run_id, None)
+            return True
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return sum(1 for r in self._runs.values() if r["status"] in ("Pendente", "Executando"))
+
+    def shutdown(self, wait: bool = True):
+        self.dispatcher.shutdown(wait=wait)
+
+    def _run(self, run_id: str, job):
+        self._update(run_id, status="Executando", started_at=_now())
+        start = time.time()
+        try:
+            result = job(lambda event: self._progress(run_id, event))
+        except Exception as e:
+            self._update(
+                run_id,
+                status="Erro",
+                error=str(e),
+                finished_at=_now(),
+                duration=time.time() - start,
+            )
+        else:
+            self._update(
+                run_id,
+                status=result["status"],
+                result=result,
+                finished_at=_now(),
+                duration=time.time() - start,
+            )
+        finally:
+            with self._lock:
+                self._futures.pop(run_id, None)
+
+    def _progress(self, run_id: str, event: dict):
+        with self._lock:
+            record = self._runs.get(run_id)
+            if record is None:
+                return
+            kind = event["event"]
+            if kind in ("workflow_started", "workflow_finished"):
+                record["steps_total"] = event["steps_total"]
+                record["steps_done"] = event["steps_done"]
+            elif kind == "step_started":
+                record["current_steps"] = record["current_steps"] + [event["step_id"]]
+            elif kind in ("step_finished", "step_failed"):
+                record["current_steps"] = [s for s in record["current_steps"] if s != event["step_id"]]
+                if kind == "step_finished":
+                    record["steps_done"] += 1
+
+    def _update(self, run_id: str, **fields):
+        with self._lock:
+            if run_id in self._runs:
+                self._runs[run_id].update(fields)
+
+    def _trim(self):
+        # Descarta as execuções finalizadas mais antigas além do limite de histórico
+        excess = len(self._runs) - self.history
+        for run_id in list(self._runs):
+            if excess <= 0:
+                break
+            if self._runs[run_id]["status"] not in ("Pendente", "Executando"):
+                del self._runs[run_id]
+                excess -= 1
+
+
+def _now() -> str:
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def workflow_categories(workflow: dict) -> list[str]:
+    """Categorias das etapas do workflow, sem repetição."""
+    categories = []
+    for step in workflow.get("steps", []):
+        category = STEP_CATEGORIES.get(step.get("type", "")[:1])
+        if category and category not in categories:
+            categories.append(category)
+    return categories
@@ -0,0 +1,216 @@
+"""Armazenamento persistente das tarefas agendadas do PyRPA."""
+
+import json
+import sqlite3
+import time
+from datetime import datetime
+
+# Políticas para disparos perdidos (ex.: servidor parado no horário)
+MISFIRE_POLICIES = {
+    "coalesce": "Agrupar em uma execução",
+    "all": "Executar todas",
+    "skip": "Pular",
+}
+
+
+class JobStore:
+    """Tabela SQLite com as tarefas do agendador e o próximo disparo de cada uma.
+
+    O próximo disparo fica numa coluna própria (timestamp, indexada), de
+    modo que retomar o agendador é uma única leitura sequencial e consultas
+    por prazo (``due``) não precisam abrir o JSON das tarefas.
+
+    Vários processos (ou hosts, com o arquivo num disco compartilhado) podem
+    usar o mesmo banco: ``claim_due`` reserva cada disparo com um lease
+    (dono + validade) por compare-and-set, ``renew`` estende os leases do nó
+    e ``complete`` grava o próximo disparo só se o lease ainda for do nó.
+    ``version`` aumenta a cada gravação da tarefa, para ``complete`` não
+    sobrescrever uma edição feita durante a execução.
+    As instruções são SQL simples, sem recursos exclusivos do SQLite além
+    do modo WAL.
+    """
+
+    def __init__(self, db_path: str = "pyrpa_jobs.db"):
+        self.db_path = db_path
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id      TEXT PRIMARY KEY,
+                    task        TEXT NOT NULL,
+                    next_fire   REAL,
+                    updated_at  TEXT NOT NULL,
+                    owner       TEXT,
+                    lease_until REAL,
+                    version     INTEGER NOT NULL DEFAULT 0
+                );
+                CREATE INDEX IF NOT EXISTS jobs_next_fire ON jobs (next_fire);
+                """
+            )
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column, kind in (("owner", "TEXT"), ("lease_until", "REAL"), ("version", "INTEGER NOT NULL DEFAULT 0")):
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def save(self, task: dict, next_fire: float | None):
+        self.save_many([(task, next_fire)])
+
+    def save_many(self, jobs: list):
+        """Grava vários pares ``(tarefa, próximo disparo)`` numa única transação.
+
+        Um lease em andamento é preservado: quem o detém grava o resultado
+        em ``complete``.
+        """
+        now = _now()
+        with self._connect() as conn:
+            conn.executemany(
+                """
+                INSERT INTO jobs (job_id, task, next_fire, updated_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT (job_id) DO UPDATE SET
+                    task = excluded.task, next_fire = excluded.next_fire, updated_at = excluded.updated_at,
+                    version = jobs.version + 1
+                """,
+                [(task["id"], json.dumps(task, default=str), fire, now) for task, fire in jobs],
+            )
+
+    def get(self, job_id: str) -> tuple[dict, float | None]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT task, next_fire FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if row is None:
+            raise ValueError(f"Tarefa não encontrada: {job_id}")
+        return json.loads(row[0]), row[1]
+
+    def remove(self, job_id: str):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+
+    def load(self) -> list[tuple[dict, float | None]]:
+        """Todas as tarefas com o próximo disparo gravado (``None`` se inativa)."""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT task, next_fire FROM jobs").fetchall()
+        return [(json.loads(task), fire) for task, fire in rows]
+
+    def count(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+
+    def due(self, until: float) -> list[str]:
+        """Ids das tarefas com disparo até ``until``, do mais antigo ao mais novo."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT job_id FROM jobs WHERE next_fire <= ? ORDER BY next_fire", (until,)
+            ).fetchall()
+        return [job_id for job_id, in rows]
+
+    def next_due(self) -> float | None:
+        """Instante do próximo disparo que algum nó poderá reservar."""
+        with self._connect() as conn:
+            row = conn.execute(
+                """
+                SELECT MIN(CASE WHEN lease_until IS NULL OR lease_until < next_fire
+                                THEN next_fire ELSE lease_until END)
+                FROM jobs WHERE next_fire IS NOT NULL
+                """
+            ).fetchone()
+        return row[0]
+
+    def claim_due(self, node_id: str, now: float, lease_s: float, limit: int = 100) -> list[tuple[dict, float, int]]:
+        """Reserva até ``limit`` disparos vencidos para ``node_id``.
+
+        Cada reserva é um UPDATE condicional ao disparo e ao lease lidos:
+        se outro nó reservou antes, o UPDATE não afeta linha e o disparo é
+        ignorado aqui. Leases vencidos (nó que caiu) voltam a ser reservados.
+        Devolve ``(tarefa, disparo agendado, versão)``; a versão vai para
+        ``complete``.
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                """
+                SELECT job_id, task, next_fire, version FROM jobs
+                WHERE next_fire <= ? AND (lease_until IS NULL OR lease_until < ?)
+                ORDER BY next_fire LIMIT ?
+                """,
+                (now, now, limit),
+            ).fetchall()
+            # Uma transação para o lote; cada UPDATE continua condicional
+            claimed = []
+            for job_id, task, fire, version in rows:
+                cursor = conn.execute(
+                    """
+                    UPDATE jobs SET owner = ?, lease_until = ?
+                    WHERE job_id = ? AND next_fire = ? AND version = ?
+                      AND (lease_until IS NULL OR lease_until < ?)
+                    """,
+                    (node_id, now + lease_s, job_id, fire, version, now),
+                )
+                if cursor.rowcount == 1:
+                    claimed.append((json.loads(task), fire, version))
+        return claimed
+
+    def renew(self, node_id: str, job_ids: list[str], lease_s: float) -> int:
+        """Estende os leases do nó (heartbeat). Devolve quantos ainda eram dele."""
+        if not job_ids:
+            return 0
+        until = time.time() + lease_s
+        with self._connect() as conn:
+            cursor = conn.executemany(
+                "UPDATE jobs SET lease_until = ? WHERE job_id = ? AND owner = ?",
+                [(until, job_id, node_id) for job_id in job_ids],
+            )
+        return cursor.rowcount
+
+    def complete(self, node_id: str, job_id: str, version: int, next_fire: float | None, **changes) -> bool:
+        """Libera o lease gravando o próximo disparo e ``changes`` na tarefa.
+
+        ``version`` é a devolvida por ``claim_due``. Devolve False se o
+        lease já não era do nó (expirou e outro nó assumiu, ou a tarefa foi
+        removida); nada é gravado nesse caso. Se a tarefa foi regravada
+        durante a execução (versão diferente), a edição vence: agenda,
+        estado e próximo disparo gravados ficam como estão e só
+        ``last_run`` é registrado.
+        """
+        with self._connect() as conn:
+            # Compare-and-set pela versão lida: se a tarefa for regravada entre a leitura
+            # e o UPDATE, nada é gravado e a nova versão é relida
+            while True:
+                row = conn.execute(
+                    "SELECT task, next_fire, version FROM jobs WHERE job_id = ? AND owner = ?", (job_id, node_id)
+                ).fetchone()
+                if row is None:
+                    return False
+                task, fire, current = json.loads(row[0]), row[1], row[2]
+                if current == version:
+                    task.update(changes)
+                    fire = next_fire if task.get("active", True) else None
+                    task["next_run"] = _format_fire(fire)
+                elif "last_run" in changes:
+                    task["last_run"] = changes["last_run"]
+                cursor = conn.execute(
+                    """
+                    UPDATE jobs SET task = ?, next_fire = ?, updated_at = ?, owner = NULL, lease_until = NULL
+                    WHERE job_id = ? AND owner = ? AND version = ?
+                    """,
+                    (json.dumps(task, default=str), fire, _now(), job_id, node_id, current),
+                )
+                if cursor.rowcount == 1:
+                    return True
+
+    def release(self, node_id: str, job_ids: list[str]):
+        """Devolve leases sem executar (ex.: nó encerrando), para outro nó assumir já."""
+        with self._connect() as conn:
+            conn.executemany(
+                "UPDATE jobs SET owner = NULL, lease_until = NULL WHERE job_id = ? AND owner = ?",
+                [(job_id, node_id) for job_id in job_ids],
+            )
+
+
+def _format_fire(fire: float | None) -> str:
+    return datetime.fromtimestamp(fire).strftime("%Y-%m-%d %H:%M") if fire else "N/A"
+
+
+def _now() -> str:
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
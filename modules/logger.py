@@ -1,15 +1,22 @@
 """Módulo de logging centralizado para o PyRPA."""
 
 import logging
+from collections import deque
 from datetime import datetime
+from itertools import islice
 from pathlib import Path
 
 
 class RPALogger:
-    """Logger centralizado que grava em arquivo e mantém histórico em memória."""
+    """Logger centralizado que grava em arquivo e mantém histórico em memória.
 
-    def __init__(self, log_file: str = "pyrpa.log"):
-        self.entries: list[dict] = []
+    O histórico guarda só as ``max_entries`` linhas mais recentes (o
+    arquivo fica com tudo), então loggers de vida longa, como o do
+    servidor, não crescem sem limite.
+    """
+
+    def __init__(self, log_file: str = "pyrpa.log", max_entries: int = 1000):
+        self.entries: deque[dict] = deque(maxlen=max_entries)
         self.log_file = log_file
 
         self._logger = logging.getLogger("PyRPA")
@@ -25,16 +32,16 @@ class RPALogger:
             "level": level.upper(),
             "message": message,
         }
-        self.entries.insert(0, entry)
+        self.entries.appendleft(entry)
 
         lvl = getattr(logging, level.upper(), logging.INFO)
         self._logger.log(lvl, message)
 
     def get_entries(self, level: str | None = None, limit: int = 100) -> list[dict]:
-        entries = self.entries
+        entries = iter(self.entries)
         if level:
-            entries = [e for e in entries if e["level"] == level.upper()]
-        return entries[:limit]
+            entries = (e for e in entries if e["level"] == level.upper())
+        return list(islice(entries, limit))
 
     def clear(self):
         self.entries.clear()
@@ -25,6 +25,14 @@ class PDFOperations:
         except Exception as e:
             return {"status": "Erro", "message": str(e)}
 
+    def iter_pages(self, pdf_file):
+        """Gera ``(número da página, texto)`` extraindo uma página por vez."""
+        if not HAS_PYPDF2:
+            raise RuntimeError("Instale: pip install PyPDF2")
+        reader = PyPDF2.PdfReader(pdf_file)
+        for i, page in enumerate(reader.pages, 1):
+            yield i, page.extract_text() or ""
+
     def merge_pdfs(self, pdf_files: list) -> dict:
         if not HAS_PYPDF2:
             return {"status": "Erro", "message": "Instale: pip install PyPDF2"}
@@ -0,0 +1,160 @@
+"""Medição de recursos por etapa de workflow para o PyRPA."""
+
+import cProfile
+import os
+import threading
+import time
+import tracemalloc
+
+try:
+    import resource
+    HAS_RESOURCE = True
+except ImportError:
+    HAS_RESOURCE = False
+
+try:
+    import psutil
+    HAS_PSUTIL = True
+except ImportError:
+    HAS_PSUTIL = False
+
+# Profilers ativos (aninhados ou em threads paralelas) e se fomos nós que ligamos o tracemalloc
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+_tracing_owned = False
+
+
+class StepProfiler:
+    """Mede uma etapa executada na thread atual.
+
+    Ao sair do bloco ``with``, ``stats`` traz (sempre números):
+    ``wall_s`` e ``cpu_s`` (CPU da thread), ``mem_delta_bytes`` e
+    ``mem_peak_bytes`` (tracemalloc), ``rss_peak_bytes`` do processo e
+    ``read_bytes``/``write_bytes`` da thread (arquivos e sockets). Métricas
+    indisponíveis na plataforma ficam ``None``.
+
+    O tracemalloc é ligado pelo primeiro profiler ativo e desligado pelo
+    último (se já estava ligado por outro código, fica como estava), então
+    execuções sem profiling não pagam o rastreamento. Ele é global ao
+    processo: com etapas em paralelo, ``mem_delta_bytes`` inclui as
+    alocações das vizinhas e ``mem_peak_bytes`` é aproximado (o pico só é
+    zerado quando a etapa começa sozinha).
+
+    Com ``dump_path``, grava também o cProfile da etapa nesse arquivo.
+    """
+
+    def __init__(self, dump_path: str | None = None):
+        self.dump_path = dump_path
+        self.stats: dict = {}
+        self._profiler = None
+
+    def __enter__(self):
+        global _tracing_users, _tracing_owned
+        with _tracing_lock:
+            if _tracing_users == 0:
+                if not tracemalloc.is_tracing():
+                    tracemalloc.start()
+                    _tracing_owned = True
+                # Zerar o pico com outras etapas medindo apagaria o pico delas
+                tracemalloc.reset_peak()
+            _tracing_users += 1
+            self._mem_start = tracemalloc.get_traced_memory()[0]
+        self._io_start = _thread_io()
+        self._cpu_start = time.thread_time()
+        self._wall_start = time.perf_counter()
+        if self.dump_path:
+            self._profiler = cProfile.Profile()
+            try:
+                self._profiler.enable()
+            except ValueError:
+                # Outro profiler já ativo (ex.: etapas paralelas no Python 3.12+)
+                self._profiler = None
+        return self
+
+    def __exit__(self, *exc):
+        if self._profiler is not None:
+            self._profiler.disable()
+        wall = time.perf_counter() - self._wall_start
+        cpu = time.thread_time() - self._cpu_start
+        current, peak = _stop_tracing()
+        io_end = _thread_io()
+
+        self.stats = {
+            "wall_s": round(wall, 6),
+            "cpu_s": round(cpu, 6),
+            "mem_delta_bytes": current - self._mem_start,
+            "mem_peak_bytes": max(0, peak - self._mem_start),
+            "rss_peak_bytes": _rss_peak(),
+            "read_bytes": None,
+            "write_bytes": None,
+            "profile_path": None,
+        }
+        if self._io_start is not None and io_end is not None:
+            self.stats["read_bytes"] = io_end[0] - self._io_start[0]
+            self.stats["write_bytes"] = io_end[1] - self._io_start[1]
+        if self._profiler is not None:
+            os.makedirs(os.path.dirname(self.dump_path) or ".", exist_ok=True)
+            self._profiler.dump_stats(self.dump_path)
+            self.stats["profile_path"] = self.dump_path
+        return False
+
+
+def _stop_tracing() -> tuple[int, int]:
+    """Lê a memória rastreada e desliga o tracemalloc se este era o último profiler que o ligou."""
+    global _tracing_users, _tracing_owned
+    with _tracing_lock:
+        current, peak = tracemalloc.get_traced_memory()
+        _tracing_users -= 1
+        if _tracing_users == 0 and _tracing_owned:
+            tracemalloc.stop()
+            _tracing_owned = False
+    return current, peak
+
+
+def _thread_io() -> tuple[int, int] | None:
+    """Bytes lidos/escritos pela thread atual (``/proc`` no Linux, psutil no resto)."""
+    try:
+        with open(f"/proc/self/task/{threading.get_native_id()}/io") as f:
+            fields = dict(line.split(": ") for line in f.read().splitlines())
+        return int(fields["rchar"]), int(fields["wchar"])
+    except (OSError, KeyError, ValueError):
+        pass
+    if HAS_PSUTIL:
+        try:
+            counters = psutil.Process().io_counters()
+        except (AttributeError, psutil.Error):
+            return None
+        # Fora do Linux o psutil só conta o processo inteiro
+        return (
+            getattr(counters, "read_chars", counters.read_bytes),
+            getattr(counters, "write_chars", counters.write_bytes),
+        )
+    return None
+
+
+def _rss_peak() -> int | None:
+    if HAS_RESOURCE:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss vem em KB no Linux e em bytes no macOS
+        return peak if os.uname().sysname == "Darwin" else peak * 1024
+    if HAS_PSUTIL:
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss)
+    return None
+
+
+def format_profile(stats: dict) -> str:
+    """Resumo curto para logs: ``cpu 0.12s · mem +1.5MB · E/S 10.0KB/2.0KB``."""
+    parts = [f"cpu {stats['cpu_s']:.2f}s", f"mem {_format_bytes(stats['mem_delta_bytes'], sign=True)}"]
+    if stats.get("read_bytes") is not None:
+        parts.append(f"E/S {_format_bytes(stats['read_bytes'])}/{_format_bytes(stats['write_bytes'])}")
+    return " · ".join(parts)
+
+
+def _format_bytes(value: int, sign: bool = False) -> str:
+    prefix = "+" if sign and value >= 0 else ""
+    size = float(value)
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(size) < 1024 or unit == "GB":
+            return f"{prefix}{size:.1f}{unit}" if unit != "B" else f"{prefix}{int(size)}B"
+        size /= 1024
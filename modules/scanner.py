@@ -0,0 +1,192 @@
+"""Varredura de pastas sob demanda (os.scandir) para o PyRPA."""
+
+import fnmatch
+import os
+import re
+import time
+from operator import attrgetter
+
+
+class ScanEntry:
+    """Arquivo encontrado pela varredura.
+
+    ``rel`` é o caminho relativo à raiz (com ``/`` como separador). ``stat()``
+    reaproveita o resultado guardado pelo ``os.DirEntry``: os filtros de
+    tamanho/idade e quem consome a entrada compartilham uma única chamada.
+    """
+
+    __slots__ = ("rel", "path", "name", "_entry")
+
+    def __init__(self, rel: str, entry: os.DirEntry):
+        self.rel = rel
+        self.path = entry.path
+        self.name = entry.name
+        self._entry = entry
+
+    def stat(self) -> os.stat_result:
+        return self._entry.stat()
+
+    def __repr__(self) -> str:
+        return f"ScanEntry({self.rel!r})"
+
+
+class FileScanner:
+    """Filtros de arquivos aplicados durante a leitura das pastas.
+
+    Os arquivos são gerados um a um (memória constante, independentemente
+    do tamanho da árvore). A ordem dos testes é do mais barato ao mais
+    caro: nome/caminho (globs e regex compilados numa única expressão),
+    tipo (``d_type`` do ``scandir``, sem stat) e só então tamanho e idade,
+    que fazem no máximo um stat por arquivo.
+
+    - ``include``/``exclude``: globs; sem ``/`` valem para o nome, com ``/``
+      para o caminho relativo. ``exclude`` também poda subpastas inteiras.
+    - ``regex``/``exclude_regex``: expressões aplicadas ao caminho relativo.
+    - ``recursive`` e ``max_depth`` (0 = só a raiz; ``None`` = sem limite).
+    - ``min_size``/``max_size`` em bytes; ``min_age_s``/``max_age_s`` pela
+      data de modificação.
+    - Links simbólicos para arquivos entram como arquivos (como em
+      ``Path.is_file()``); ``follow_symlinks`` decide se links para pastas
+      são percorridos (desligado por padrão, evitando ciclos).
+    """
+
+    def __init__(self, include=None, exclude=None, regex: str | None = None,
+                 exclude_regex: str | None = None, recursive: bool = False, max_depth: int | None = None,
+                 min_size: int | None = None, max_size: int | None = None,
+                 min_age_s: float | None = None, max_age_s: float | None = None,
+                 follow_symlinks: bool = False):
+        self.include = _compile_globs(include)
+        self.exclude = _compile_globs(exclude)
+        self.regex = re.compile(regex) if regex else None
+        self.exclude_regex = re.compile(exclude_regex) if exclude_regex else None
+        self.max_depth = max_depth if recursive else 0
+        self.min_size = min_size
+        self.max_size = max_size
+        self.min_age_s = min_age_s
+        self.max_age_s = max_age_s
+        self.follow_symlinks = follow_symlinks
+        self._needs_stat = any(v is not None for v in (min_size, max_size, min_age_s, max_age_s))
+
+    @classmethod
+    def from_ext(cls, ext: str | None, **options) -> "FileScanner":
+        """Equivalente ao antigo filtro ``*{ext}``."""
+        return cls(include=[f"*{ext}"] if ext else None, **options)
+
+    def scan(self, root: str, on_error=None, prune=(), ordered: bool = False):
+        """Gera ``ScanEntry`` dos arquivos de ``root`` que passam nos filtros.
+
+        Erros ao abrir subpastas (ex.: sem permissão) vão para
+        ``on_error(caminho, exc)`` e a varredura continua; na raiz, sobem.
+        Subpastas em ``prune`` (caminhos absolutos, ex.: um destino dentro
+        da origem) não são percorridas. Com ``ordered``, a ordem é
+        determinística (cada pasta é ordenada por nome ao ser lida, sem
+        montar a lista da árvore toda).
+        """
+        now = time.time()
+        prune = {os.path.abspath(p) for p in prune}
+        stack = [(root, "", 0)]
+        while stack:
+            folder, prefix, depth = stack.pop()
+            try:
+                entries = os.scandir(folder)
+            except OSError as e:
+                if not prefix:
+                    raise
+                if on_error:
+                    on_error(folder, e)
+                continue
+            subdirs = []
+            with entries:
+                if ordered:
+                    entries = sorted(entries, key=attrgetter("name"))
+                for entry in entries:
+                    rel = prefix + entry.name
+                    try:
+                        if entry.is_dir(follow_symlinks=self.follow_symlinks):
+                            if ((self.max_depth is None or depth < self.max_depth)
+                                    and not self._excluded(entry.name, rel)
+                                    and not (prune and os.path.abspath(entry.path) in prune)):
+                                subdirs.append((entry.path, rel + "/", depth + 1))
+                            continue
+                        if not self._match_name(entry.name, rel):
+                            continue
+                        if not entry.is_file():
+                            continue
+                        if self._needs_stat and not self._match_stat(entry.stat(), now):
+                            continue
+                    except OSError as e:
+                        if on_error:
+                            on_error(entry.path, e)
+                        continue
+                    yield ScanEntry(rel, entry)
+            # Invertidas na pilha: as subpastas saem na ordem em que foram lidas
+            stack.extend(reversed(subdirs))
+
+    def matches_path(self, rel: str) -> bool:
+        """Aplica só as regras de caminho (nome, globs, regex, profundidade) a ``rel``.
+
+        Útil para arquivos que não existem mais (ex.: espelhar exclusões),
+        em que tamanho e idade não podem ser avaliados.
+        """
+        parts = rel.split("/")
+        if self.max_depth is not None and len(parts) - 1 > self.max_depth:
+            return False
+        for i, part in enumerate(parts[:-1]):
+            if self._excluded(part, "/".join(parts[:i + 1])):
+                return False
+        return self._match_name(parts[-1], rel)
+
+    def _excluded(self, name: str, rel: str) -> bool:
+        return bool(self.exclude and (self.exclude[0].match(name) or self.exclude[1].match(rel)))
+
+    def _match_name(self, name: str, rel: str) -> bool:
+        if self.include and not (self.include[0].match(name) or self.include[1].match(rel)):
+            return False
+        if self._excluded(name, rel):
+            return False
+        if self.regex and not self.regex.search(rel):
+            return False
+        if self.exclude_regex and self.exclude_regex.search(rel):
+            return False
+        return True
+
+    def _match_stat(self, st: os.stat_result, now: float) -> bool:
+        if self.min_size is not None and st.st_size < self.min_size:
+            return False
+        if self.max_size is not None and st.st_size > self.max_size:
+            return False
+        age = now - st.st_mtime
+        if self.min_age_s is not None and age < self.min_age_s:
+            return False
+        if self.max_age_s is not None and age > self.max_age_s:
+            return False
+        return True
+
+
+def scanner_for_step(params: dict) -> FileScanner:
+    """Scanner dos parâmetros de uma etapa de arquivos do workflow (``filtro``, ``recursivo``, ``excluir``)."""
+    return FileScanner.from_ext(
+        params.get("filtro") or None,
+        exclude=params.get("excluir") or None,
+        recursive=bool(params.get("recursivo")),
+    )
+
+
+_NEVER = re.compile(r"(?!)")
+
+
+def _compile_globs(patterns) -> tuple | None:
+    """Une os globs em duas regex: uma para nomes e outra para caminhos relativos."""
+    if not patterns:
+        return None
+    if isinstance(patterns, str):
+        patterns = [p.strip() for p in patterns.split(",")]
+    patterns = [p for p in patterns if p]
+    if not patterns:
+        return None
+    by_name = [fnmatch.translate(p) for p in patterns if "/" not in p]
+    by_path = [fnmatch.translate(p) for p in patterns if "/" in p]
+    return (
+        re.compile("|".join(by_name)) if by_name else _NEVER,
+        re.compile("|".join(by_path)) if by_path else _NEVER,
+    )
@@ -1,55 +1,184 @@
 """Módulo de agendamento de tarefas para o PyRPA."""
 
+import hashlib
+from collections import defaultdict
 from datetime import datetime, timedelta
 
+from modules.cron import fire_calendar, parse_cron
+
+
+WEEKDAYS = ["Segunda", "Terça", "Quarta", "Quinta", "Sexta", "Sábado", "Domingo"]
+LAST_DAY = "Último dia"
+
 
 class TaskScheduler:
 
-    def calc_next_run(self, frequency: str, run_time, interval: int | None = None) -> str:
-        now = datetime.now()
-        time_str = str(run_time)
+    def calc_next_run(self, frequency: str, run_time, interval: int | None = None, **options) -> str:
+        target = self.next_fire(frequency, run_time, interval, **options)
+        if target is None:
+            return "N/A"
+        return target.strftime("%Y-%m-%d %H:%M")
 
-        if frequency == "Uma vez":
-            target = now.replace(
-                hour=int(time_str.split(":")[0]),
-                minute=int(time_str.split(":")[1]),
-                second=0,
-            )
-            if target <= now:
-                target += timedelta(days=1)
-            return target.strftime("%Y-%m-%d %H:%M")
+    def next_fire(
+        self, frequency: str, run_time, interval: int | None = None, after: datetime | None = None,
+        weekday: int | None = None, day=None, cron: str | None = None, offset: float = 0,
+    ) -> datetime | None:
+        """Próximo disparo estritamente depois de ``after`` (agora, por padrão).
+
+        ``weekday`` (0=segunda) vale para "Semanal"; ``day`` (1-31 ou
+        "Último dia") para "Mensal"; ``cron`` para a frequência "Cron".
+        ``offset`` (segundos, ver ``fire_offset``) atrasa cada disparo dentro
+        da janela de tolerância da tarefa.
+        """
+        now = after or datetime.now()
 
         if frequency == "A cada X minutos":
-            target = now + timedelta(minutes=interval or 30)
-            return target.strftime("%Y-%m-%d %H:%M")
+            return now + timedelta(minutes=interval or 30)
 
-        if frequency == "Diário":
-            target = now.replace(
-                hour=int(time_str.split(":")[0]),
-                minute=int(time_str.split(":")[1]),
-                second=0,
+        if offset:
+            base = self.next_fire(
+                frequency, run_time, interval, now - timedelta(seconds=offset), weekday, day, cron
             )
+            return base + timedelta(seconds=offset) if base else None
+
+        if frequency == "Uma vez":
+            hour, minute = _hour_minute(run_time)
+            target = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
             if target <= now:
                 target += timedelta(days=1)
-            return target.strftime("%Y-%m-%d %H:%M")
+            return target
 
-        if frequency == "Semanal":
-            target = now + timedelta(days=(7 - now.weekday()) % 7 or 7)
-            return target.strftime("%Y-%m-%d") + f" {time_str[:5]}"
+        expr = self.cron_expression(frequency, run_time, weekday, day, cron)
+        if expr is None:
+            return None
+        return parse_cron(expr).next_fire(now)
 
+    def cron_expression(self, frequency: str, run_time, weekday: int | None = None, day=None,
+                        cron: str | None = None) -> str | None:
+        """Expressão cron equivalente à frequência (None para "Uma vez" e intervalos)."""
+        if frequency == "Cron":
+            return cron
+        hour, minute = _hour_minute(run_time)
+        if frequency == "Diário":
+            return f"{minute} {hour} * * *"
+        if frequency == "Semanal":
+            # Cron conta a partir do domingo; weekday segue o datetime (0=segunda)
+            return f"{minute} {hour} * * {((weekday or 0) + 1) % 7}"
         if frequency == "Mensal":
-            month = now.month % 12 + 1
-            year = now.year + (1 if month == 1 else 0)
-            return f"{year}-{month:02d}-01 {time_str[:5]}"
+            return f"{minute} {hour} {'L' if day == LAST_DAY else day or 1} * *"
+        return None
+
+    def calendar(self, tasks: list, start: datetime | None = None, days: float = 30) -> dict:
+        """Disparos das tarefas ativas nos próximos ``days`` dias: ``{id: [datetime, ...]}``."""
+        start = start or datetime.now()
+        end = start + timedelta(days=days)
+        result, cron_jobs, offsets = {}, {}, {}
+        for task in tasks:
+            if not task.get("active", True):
+                continue
+            frequency = task["frequency"]
+            if frequency == "A cada X minutos":
+                step = timedelta(minutes=task.get("interval") or 30)
+                fires, fire = [], start + step
+                while fire < end:
+                    fires.append(fire)
+                    fire += step
+                result[task["id"]] = fires
+            elif frequency == "Uma vez":
+                fire = self.next_fire(frequency, task.get("time", "00:00"), after=start, offset=fire_offset(task))
+                result[task["id"]] = [fire] if fire < end else []
+            else:
+                expr = self.cron_expression(
+                    frequency, task.get("time", "00:00"), task.get("weekday"), task.get("day"), task.get("cron")
+                )
+                if expr:
+                    cron_jobs[task["id"]] = expr
+                    offsets[task["id"]] = timedelta(seconds=fire_offset(task))
+
+        # Janela recuada pelo maior deslocamento para não perder disparos empurrados para dentro dela
+        lead = max(offsets.values(), default=timedelta(0))
+        for task_id, fires in fire_calendar(cron_jobs, start - lead, end).items():
+            shift = offsets[task_id]
+            result[task_id] = [fire + shift for fire in fires if start < fire + shift < end]
+        return result
 
-        return "N/A"
+    def spread(self, tasks: list, start: datetime | None = None, hours: int = 24, bin_s: int = 10) -> dict:
+        """Deslocamentos que espalham as tarefas dentro de suas janelas: ``{id: segundos}``.
+
+        Só mexe em tarefas com ``jitter`` (tolerância em segundos); as demais
+        entram como carga fixa. Das menos flexíveis para as mais flexíveis,
+        cada tarefa recebe o deslocamento cujos disparos nas próximas
+        ``hours`` horas caem nas faixas de ``bin_s`` segundos menos ocupadas.
+        """
+        start = start or datetime.now()
+        base = self.calendar([{**t, "offset": 0} for t in tasks], start, hours / 24)
+        load: defaultdict = defaultdict(int)
+
+        def slot(fire: datetime, shift: int = 0) -> int:
+            return int(((fire - start).total_seconds() + shift) // bin_s)
+
+        flexible = []
+        for task in tasks:
+            fires = base.get(task["id"], [])
+            if not task.get("jitter") or task["frequency"] == "A cada X minutos":
+                for fire in fires:
+                    load[slot(fire)] += 1
+            elif fires:
+                flexible.append((int(task["jitter"]), str(task["id"]), fires))
+
+        offsets = {}
+        for jitter, task_id, fires in sorted(flexible):
+            step = max(bin_s, jitter // 60)
+            best = min(
+                range(0, jitter, step),
+                key=lambda shift: (sum(load[slot(fire, shift)] for fire in fires), shift),
+            )
+            for fire in fires:
+                load[slot(fire, best)] += 1
+            offsets[task_id] = best
+        return offsets
+
+    def load_profile(self, tasks: list, start: datetime | None = None, hours: int = 24,
+                     duration_s: int = 60) -> list[dict]:
+        """Carga projetada por minuto: disparos iniciados e execuções simultâneas.
+
+        A duração de cada execução vem de ``task["duration_s"]`` (ou
+        ``duration_s``); serve só para estimar a sobreposição.
+        """
+        start = (start or datetime.now()).replace(second=0, microsecond=0)
+        minutes = hours * 60
+        starts, delta = [0] * minutes, [0] * (minutes + 1)
+        durations = {t["id"]: t.get("duration_s") or duration_s for t in tasks}
+        for task_id, fires in self.calendar(tasks, start, hours / 24).items():
+            for fire in fires:
+                first = int((fire - start).total_seconds() // 60)
+                if not 0 <= first < minutes:
+                    continue
+                last = int(((fire - start).total_seconds() + durations[task_id] - 1) // 60)
+                starts[first] += 1
+                delta[first] += 1
+                delta[min(last + 1, minutes)] -= 1
+        profile, running = [], 0
+        for i in range(minutes):
+            running += delta[i]
+            profile.append({"minute": start + timedelta(minutes=i), "starts": starts[i], "running": running})
+        return profile
 
     def generate_cron_script(self, tasks: list) -> str:
         task_blocks = []
         for t in tasks:
+            options = ""
+            if t["frequency"] == "A cada X minutos":
+                options = f", interval={t.get('interval') or 30}"
+            elif t["frequency"] == "Semanal":
+                options = f", weekday={t.get('weekday') or 0}"
+            elif t["frequency"] == "Mensal":
+                options = f", day={t.get('day') or 1!r}"
+            elif t["frequency"] == "Cron":
+                options = f", cron={t.get('cron')!r}"
             task_blocks.append(
                 f'    schedule_task("{t["name"]}", "{t["frequency"]}", '
-                f'"{t["time"]}", task_function)'
+                f'"{t["time"]}", task_function{options})'
             )
 
         tasks_code = "\n".join(task_blocks) if task_blocks else '    print("Nenhuma tarefa configurada.")'
@@ -61,7 +190,7 @@ Dependência: pip install schedule
 import schedule
 import time
 import logging
-from datetime import datetime
+from datetime import datetime, timedelta
 
 logging.basicConfig(
     level=logging.INFO,
@@ -82,21 +211,34 @@ def task_function():
     # fops.copy_or_move("/origem", "/destino", ".xlsx", "copiar")
     logging.info("Tarefa concluída!")
 
-def schedule_task(name: str, frequency: str, run_time: str, func):
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+def is_month_day(day) -> bool:
+    today = datetime.now().date()
+    if day == "{LAST_DAY}":
+        return (today + timedelta(days=1)).month != today.month
+    return today.day == day
+
+def schedule_task(name: str, frequency: str, run_time: str, func,
+                  interval: int = 30, weekday: int = 0, day=1, cron: str = ""):
     """Agenda uma tarefa baseada na frequência."""
     hh_mm = run_time[:5]
 
     if frequency == "Diário":
         schedule.every().day.at(hh_mm).do(func)
     elif frequency == "A cada X minutos":
-        schedule.every(30).minutes.do(func)
+        schedule.every(interval).minutes.do(func)
     elif frequency == "Semanal":
-        schedule.every().monday.at(hh_mm).do(func)
+        getattr(schedule.every(), WEEKDAYS[weekday]).at(hh_mm).do(func)
     elif frequency == "Mensal":
         # schedule não suporta "mensal" nativamente; use APScheduler para isso
         schedule.every().day.at(hh_mm).do(
-            lambda: func() if datetime.now().day == 1 else None
+            lambda: func() if is_month_day(day) else None
         )
+    elif frequency == "Cron":
+        # schedule não entende cron; use a linha abaixo no crontab do sistema
+        logging.warning(f"Tarefa {{name}}: agende via crontab -> {{cron}} python este_script.py")
+        return
 
     logging.info(f"Tarefa agendada: {{name}} ({{frequency}} às {{hh_mm}})")
 
@@ -113,3 +255,24 @@ def main():
 if __name__ == "__main__":
     main()
 '''
+
+
+def _hour_minute(run_time) -> tuple[int, int]:
+    parts = str(run_time).split(":")
+    return int(parts[0]), int(parts[1])
+
+
+def fire_offset(task: dict) -> int:
+    """Deslocamento (s) dos disparos da tarefa dentro da tolerância ``task["jitter"]``.
+
+    Usa ``task["offset"]`` quando definido (ex.: por ``TaskScheduler.spread``);
+    senão deriva um valor estável do id, para que a tarefa caia sempre no
+    mesmo ponto da janela, em qualquer nó e após reinícios.
+    """
+    jitter = int(task.get("jitter") or 0)
+    if jitter <= 0 or task.get("frequency") == "A cada X minutos":
+        return 0
+    if task.get("offset") is not None:
+        return min(int(task["offset"]), jitter - 1)
+    digest = hashlib.sha1(str(task["id"]).encode("utf-8")).digest()
+    return int.from_bytes(digest[:4], "big") % jitter
@@ -0,0 +1,133 @@
+"""Agendador distribuído (vários processos/hosts) para o PyRPA."""
+
+import os
+import socket
+import time
+import uuid
+from datetime import datetime
+
+from modules.job_store import JobStore
+from modules.scheduler_daemon import SchedulerDaemon
+
+
+class ClusterSchedulerDaemon(SchedulerDaemon):
+    """``SchedulerDaemon`` para vários nós compartilhando um ``JobStore``.
+
+    O banco é a fonte da verdade: cada nó consulta os disparos vencidos e os
+    reserva com ``claim_due`` (lease de ``lease_s`` segundos), de modo que
+    cada disparo roda num único nó mesmo com N nós ativos. Enquanto a
+    execução dura, o nó renova seus leases a cada ``lease_s / 3``; ao
+    terminar, ``complete`` grava o próximo disparo e libera o lease. Se o
+    nó cair, o lease vence e outro nó assume o disparo (que então roda de
+    novo desde o início).
+
+    Sem uma tarefa reservada, o nó dorme até o próximo prazo do banco,
+    limitado a ``poll_s`` para enxergar tarefas incluídas por outros nós.
+    Tarefas incluídas neste nó acordam o loop na hora.
+    """
+
+    def __init__(self, dispatch, store: JobStore, node_id: str | None = None, workers: int = 4,
+                 lease_s: float = 30.0, poll_s: float = 1.0, logger=None, scheduler=None,
+                 misfire_grace: float = 60):
+        super().__init__(dispatch, workers, logger, scheduler, store, misfire_grace)
+        self.node_id = node_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:4]}"
+        self.workers = workers
+        self.lease_s = lease_s
+        self.poll_s = min(poll_s, lease_s / 3)
+        self._claimed: set = set()
+        self._started: set = set()
+        self._renewed_at = 0.0
+
+    def _restore(self):
+        # Nada a carregar: o estado fica no banco, compartilhado pelos nós
+        pass
+
+    def add_many(self, tasks: list[dict]) -> list[datetime | None]:
+        fires, saved = [], []
+        for task in tasks:
+            task = dict(task)
+            fire = self._next_fire(task) if task.get("active", True) else None
+            task["next_run"] = fire.strftime("%Y-%m-%d %H:%M") if fire else "N/A"
+            fires.append(fire)
+            saved.append((task, fire.timestamp() if fire else None))
+        self.store.save_many(saved)
+        with self._cond:
+            self._cond.notify()
+        return fires
+
+    def remove(self, task_id: str) -> bool:
+        try:
+            self.store.get(task_id)
+        except ValueError:
+            return False
+        self.store.remove(task_id)
+        return True
+
+    def set_active(self, task_id: str, active: bool) -> datetime | None:
+        task, _ = self.store.get(task_id)
+        task["active"] = active
+        return self.add(task)
+
+    def get(self, task_id: str) -> dict:
+        return self.store.get(task_id)[0]
+
+    def tasks(self) -> list[dict]:
+        return [task for task, _ in self.store.load()]
+
+    def upcoming(self, limit: int = 10) -> list[dict]:
+        jobs = sorted(((fire, task) for task, fire in self.store.load() if fire is not None), key=lambda j: j[0])
+        return [{**task, "fire_at": datetime.fromtimestamp(fire)} for fire, task in jobs[:limit]]
+
+    def __len__(self) -> int:
+        return self.store.count()
+
+    def stop(self, wait: bool = True):
+        super().stop(wait)
+        # Devolve as reservas que o pool cancelou sem rodar, para outro nó assumir já
+        with self._cond:
+            pending = list(self._claimed - self._started)
+        if pending:
+            self.store.release(self.node_id, pending)
+
+    def _loop(self):
+        with self._cond:
+            while not self._stopping:
+                now = time.time()
+                self._heartbeat(now)
+                free = self.workers - len(self._claimed)
+                if free > 0:
+                    for task, fire, version in self.store.claim_due(self.node_id, now, self.lease_s, free):
+                        self._claimed.add(task["id"])
+                        self._pool.submit(self._run_claimed, task, fire, version)
+                next_due = self.store.next_due()
+                delay = self.poll_s if next_due is None else min(self.poll_s, next_due - time.time())
+                # Sem vaga, espera uma execução terminar (notify) ou o próximo heartbeat
+                self._cond.wait(max(delay, 0.01) if free > 0 else self.poll_s)
+
+    def _heartbeat(self, now: float):
+        if self._claimed and now - self._renewed_at >= self.lease_s / 3:
+            self.store.renew(self.node_id, list(self._claimed), self.lease_s)
+            self._renewed_at = now
+
+    def _run_claimed(self, task: dict, fire: float, version: int):
+        scheduled = datetime.fromtimestamp(fire)
+        now = datetime.now()
+        with self._cond:
+            self._started.add(task["id"])
+            runs, next_fire = self._misfire(task, scheduled, now)
+        changes = {}
+        if runs:
+            changes["last_run"] = now.strftime("%Y-%m-%d %H:%M:%S")
+            self._run(task, runs)
+        if task["frequency"] == "Uma vez":
+            changes["active"] = False
+            next_fire = None
+        done = self.store.complete(
+            self.node_id, task["id"], version, next_fire.timestamp() if next_fire else None, **changes
+        )
+        if not done:
+            self._log(f"Lease da tarefa '{task['name']}' perdido — outro nó assumiu o disparo", "WARN")
+        with self._cond:
+            self._claimed.discard(task["id"])
+            self._started.discard(task["id"])
+            self._cond.notify()
@@ -0,0 +1,272 @@
+"""Serviço residente de agendamento de tarefas para o PyRPA."""
+
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from modules.job_store import JobStore
+from modules.scheduler import TaskScheduler, fire_offset
+
+
+class SchedulerDaemon:
+    """Dispara tarefas agendadas no horário, sem polling.
+
+    As tarefas ficam num min-heap ordenado pelo próximo disparo; a thread
+    do serviço dorme exatamente até o primeiro prazo (ou até uma tarefa
+    ser incluída/alterada), entrega as vencidas a ``dispatch`` num pool de
+    threads e recalcula o disparo seguinte. Incluir, alterar ou remover uma
+    tarefa custa O(log n): entradas antigas do heap são invalidadas e
+    descartadas quando chegam ao topo.
+
+    ``dispatch(task)`` recebe o dict da tarefa (formato da página
+    Agendador). Uma tarefa não roda em paralelo com ela mesma: se ainda
+    estiver em execução no próximo disparo, esse disparo é pulado.
+
+    Com ``store`` (um ``JobStore``), as tarefas e seus próximos disparos
+    sobrevivem a reinícios: são carregados na criação do serviço e
+    regravados a cada alteração ou disparo. Disparos atrasados mais que
+    ``misfire_grace`` segundos seguem ``task["misfire"]``: ``"coalesce"``
+    (padrão) roda uma vez só, ``"all"`` roda uma vez por disparo perdido
+    (até ``MAX_CATCHUP``) e ``"skip"`` apenas agenda o próximo.
+    """
+
+    MAX_CATCHUP = 100
+
+    def __init__(self, dispatch, workers: int = 4, logger=None, scheduler: TaskScheduler | None = None,
+                 store: JobStore | None = None, misfire_grace: float = 60):
+        self.dispatch = dispatch
+        self.logger = logger
+        self.scheduler = scheduler or TaskScheduler()
+        self.store = store
+        self.misfire_grace = misfire_grace
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pyrpa-sched")
+        self._heap: list = []  # (disparo, seq, task_id)
+        self._entries: dict[str, int] = {}  # task_id -> seq da entrada válida
+        self._tasks: dict[str, dict] = {}
+        self._running: set = set()
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread: threading.Thread | None = None
+        self._stopping = False
+        if store is not None:
+            self._restore()
+
+    def start(self):
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._loop, name="pyrpa-scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self, wait: bool = True):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        if self._thread is not None and wait:
+            self._thread.join()
+        self._thread = None
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def add(self, task: dict) -> datetime | None:
+        """Inclui ou substitui a tarefa ``task["id"]``. Devolve o próximo disparo."""
+        return self.add_many([task])[0]
+
+    def add_many(self, tasks: list[dict]) -> list[datetime | None]:
+        """Como ``add`` para várias tarefas, gravando tudo numa só transação."""
+        fires, saved = [], []
+        with self._cond:
+            for task in tasks:
+                task = dict(task)
+                self._tasks[task["id"]] = task
+                fire = self._next_fire(task) if task.get("active", True) else None
+                self._schedule(task, fire)
+                fires.append(fire)
+                saved.append((task, fire.timestamp() if fire else None))
+            if self.store is not None:
+                self.store.save_many(saved)
+        return fires
+
+    def remove(self, task_id: str) -> bool:
+        with self._cond:
+            self._entries.pop(task_id, None)
+            if self.store is not None:
+                self.store.remove(task_id)
+            return self._tasks.pop(task_id, None) is not None
+
+    def set_active(self, task_id: str, active: bool) -> datetime | None:
+        with self._cond:
+            if task_id not in self._tasks:
+                raise ValueError(f"Tarefa não encontrada: {task_id}")
+            task = self._tasks[task_id]
+            task["active"] = active
+            fire = self._next_fire(task) if active else None
+            self._schedule(task, fire)
+            self._persist(task, fire)
+            return fire
+
+    def get(self, task_id: str) -> dict:
+        with self._cond:
+            if task_id not in self._tasks:
+                raise ValueError(f"Tarefa não encontrada: {task_id}")
+            return dict(self._tasks[task_id])
+
+    def tasks(self) -> list[dict]:
+        with self._cond:
+            return [dict(t) for t in self._tasks.values()]
+
+    def upcoming(self, limit: int = 10) -> list[dict]:
+        """Próximos disparos em ordem, sem alterar o heap."""
+        with self._cond:
+            valid = [e for e in self._heap if self._entries.get(e[2]) == e[1]]
+            return [
+                {**self._tasks[task_id], "fire_at": datetime.fromtimestamp(fire)}
+                for fire, _, task_id in heapq.nsmallest(limit, valid)
+            ]
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def _schedule(self, task: dict, fire: datetime | None):
+        # Chamado com o lock: invalida a entrada anterior e empurra a nova
+        task["next_run"] = fire.strftime("%Y-%m-%d %H:%M") if fire else "N/A"
+        if fire is None:
+            self._entries.pop(task["id"], None)
+            return
+        seq = next(self._seq)
+        self._entries[task["id"]] = seq
+        heapq.heappush(self._heap, (fire.timestamp(), seq, task["id"]))
+        if self._heap[0][1] == seq:
+            self._cond.notify()  # novo primeiro prazo: acorda o loop para reprogramar a espera
+        self._compact()
+
+    def _persist(self, task: dict, fire: datetime | None):
+        if self.store is not None:
+            self.store.save(task, fire.timestamp() if fire else None)
+
+    def _restore(self):
+        # Uma leitura e um heapify: disparos vencidos durante a parada ficam no
+        # topo do heap e o loop os trata pela política de misfire
+        for task, fire in self.store.load():
+            self._tasks[task["id"]] = task
+            if fire is not None and task.get("active", True):
+                seq = next(self._seq)
+                self._entries[task["id"]] = seq
+                self._heap.append((fire, seq, task["id"]))
+        heapq.heapify(self._heap)
+
+    def _compact(self):
+        # Entradas invalidadas se acumulam com updates frequentes; reconstrói se forem maioria
+        if len(self._heap) > 64 and len(self._heap) > 2 * len(self._entries):
+            self._heap = [e for e in self._heap if self._entries.get(e[2]) == e[1]]
+            heapq.heapify(self._heap)
+
+    def _next_fire(self, task: dict, after: datetime | None = None) -> datetime | None:
+        return self.scheduler.next_fire(
+            task["frequency"], task.get("time", "00:00"), task.get("interval"), after,
+            weekday=task.get("weekday"), day=task.get("day"), cron=task.get("cron"),
+            offset=fire_offset(task),
+        )
+
+    def _loop(self):
+        fired: list = []
+        with self._cond:
+            while not self._stopping:
+                if not self._heap:
+                    self._flush(fired)
+                    self._cond.wait()
+                    continue
+                fire, seq, task_id = self._heap[0]
+                if self._entries.get(task_id) != seq:
+                    heapq.heappop(self._heap)
+                    continue
+                delay = fire - time.time()
+                if delay > 0:
+                    self._flush(fired)
+                    # Teto de 60s só para acompanhar ajustes no relógio do sistema
+                    self._cond.wait(min(delay, 60))
+                    continue
+                heapq.heappop(self._heap)
+                task = self._tasks[task_id]
+                fired.append((task, self._fire(task, fire)))
+            self._flush(fired)
+
+    def _flush(self, fired: list):
+        # Grava de uma vez os disparos de uma rodada (ex.: milhares vencidos após um reinício)
+        if fired and self.store is not None:
+            self.store.save_many([(task, fire.timestamp() if fire else None) for task, fire in fired])
+        fired.clear()
+
+    def _fire(self, task: dict, fire: float) -> datetime | None:
+        scheduled = datetime.fromtimestamp(fire)
+        now = datetime.now()
+        runs, next_fire = self._misfire(task, scheduled, now)
+        if runs and task["id"] in self._running:
+            self._log(f"Tarefa '{task['name']}' ainda em execução — disparo de {scheduled:%H:%M} pulado", "WARN")
+        elif runs:
+            self._running.add(task["id"])
+            task["last_run"] = now.strftime("%Y-%m-%d %H:%M:%S")
+            self._pool.submit(self._run, dict(task), runs)
+
+        if task["frequency"] == "Uma vez":
+            task["active"] = False
+            next_fire = None
+        self._schedule(task, next_fire)
+        return next_fire
+
+    def _misfire(self, task: dict, scheduled: datetime, now: datetime) -> tuple[int, datetime | None]:
+        """Quantas execuções fazer agora e o próximo disparo futuro.
+
+        O próximo disparo é calculado a partir do horário agendado (sem
+        deriva); os disparos que ficaram no passado contam como perdidos.
+        """
+        next_fire = self._next_fire(task, scheduled)
+        if (now - scheduled).total_seconds() <= self.misfire_grace:
+            if next_fire is not None and next_fire <= now:
+                next_fire = self._next_fire(task, now)
+            return 1, next_fire
+
+        missed = 1  # o próprio disparo agendado
+        while next_fire is not None and next_fire <= now and missed < self.MAX_CATCHUP:
+            missed += 1
+            next_fire = self._next_fire(task, next_fire)
+        if next_fire is not None and next_fire <= now:
+            next_fire = self._next_fire(task, now)
+
+        policy = task.get("misfire", "coalesce")
+        self._log(
+            f"Tarefa '{task['name']}' atrasada desde {scheduled:%Y-%m-%d %H:%M} "
+            f"({missed} disparo(s) perdido(s), política '{policy}')", "WARN",
+        )
+        if policy == "skip":
+            return 0, next_fire
+        if policy == "all":
+            return missed, next_fire
+        return 1, next_fire
+
+    def _run(self, task: dict, runs: int = 1):
+        start = time.time()
+        try:
+            for _ in range(runs):
+                self.dispatch(task)
+        except Exception as e:
+            self._log(f"Tarefa agendada '{task['name']}' falhou: {e}", "ERROR")
+        else:
+            self._log(f"Tarefa agendada '{task['name']}' executada em {time.time() - start:.1f}s", "INFO")
+        finally:
+            with self._cond:
+                self._running.discard(task["id"])
+
+    def _log(self, message: str, level: str):
+        if self.logger:
+            self.logger.log(message, level)
@@ -0,0 +1,282 @@
+"""Execução isolada de scripts Python customizados para o PyRPA."""
+
+import atexit
+import hashlib
+import importlib
+import os
+import pickle
+import queue
+import subprocess
+import sys
+import threading
+from collections import OrderedDict
+
+PRELOAD = ("pandas", "openpyxl", "requests", "bs4")
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_PRELOAD_ENV = "PYRPA_SCRIPT_PRELOAD"
+_CACHE_ENV = "PYRPA_SCRIPT_CACHE"
+
+
+class ScriptError(Exception):
+    """Erro levantado pelo script do usuário dentro do worker."""
+
+
+class ScriptWorkerPool:
+    """Pool de processos pré-aquecidos para as etapas "Script Python Custom".
+
+    Cada worker é um ``python -m modules.script_pool`` que importa
+    ``preload`` ao subir e guarda o código compilado de cada script pelo hash
+    SHA-256 do texto, então a execução seguinte do mesmo script não paga
+    parse nem compilação. Entradas e ``resultado`` trafegam em pickle pelo
+    stdin/stdout do worker. Se o prazo da etapa vence, o worker é morto e
+    substituído por outro em segundo plano.
+    """
+
+    def __init__(self, size: int | None = None, preload=PRELOAD, cache_size: int = 256):
+        self.size = size or min(4, os.cpu_count() or 1)
+        self.preload = tuple(preload)
+        self.cache_size = cache_size
+        self._idle: queue.SimpleQueue = queue.SimpleQueue()
+        self._workers: set = set()
+        self._spawning = 0
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def warm(self):
+        """Sobe os workers que faltam sem esperar o carregamento dos imports."""
+        with self._lock:
+            # Reserva as vagas sob o lock: chamadas simultâneas não sobem o pool em dobro
+            missing = max(0, self.size - len(self._workers) - self._spawning)
+            self._spawning += missing
+        for _ in range(missing):
+            self._idle.put(self._spawn())
+
+    def run(self, code: str, entrada=None, artifacts: dict | None = None, deadline=None) -> tuple[bool, object]:
+        """Executa ``code`` num worker. Devolve ``(definiu_resultado, resultado)``.
+
+        Levanta ``ScriptError`` se o script falhar e ``StepCancelled`` se o
+        prazo vencer antes do fim (o worker é encerrado à força) ou enquanto
+        a etapa espera um worker livre.
+        """
+        from modules.step_handlers import StepCancelled
+
+        if self._closed:
+            raise RuntimeError("Pool de scripts encerrado")
+        if not self._workers:
+            self.warm()
+        timeout = deadline.remaining() if deadline is not None else None
+        # Serializa antes de reservar um worker: entrada não serializável falha aqui sem ocupá-lo
+        payload = pickle.dumps((code, entrada, artifacts or {}, timeout), protocol=pickle.HIGHEST_PROTOCOL)
+        worker = self._acquire(deadline)
+        try:
+            worker.send_bytes(payload)
+            while True:
+                try:
+                    reply = worker.replies.get(timeout=_poll_interval(deadline))
+                    break
+                except queue.Empty:
+                    if _expired(deadline):
+                        raise StepCancelled("Etapa cancelada: tempo limite excedido")
+            if reply is None:
+                raise ScriptError(
+                    f"Worker de script encerrado inesperadamente (código {worker.process.poll()})"
+                )
+        except BaseException:
+            # Qualquer falha no meio da conversa deixa o worker em estado incerto: descarta e repõe
+            self._discard(worker)
+            raise
+        self._idle.put(worker)
+
+        if reply[0] == "erro":
+            raise ScriptError(reply[1])
+        return reply[1], reply[2]
+
+    def shutdown(self):
+        self._closed = True
+        with self._lock:
+            workers = list(self._workers)
+            self._workers.clear()
+        for worker in workers:
+            worker.stop()
+
+    def _acquire(self, deadline) -> "_Worker":
+        """Próximo worker livre; com todos ocupados, espera no máximo até o prazo da etapa."""
+        from modules.step_handlers import StepCancelled
+
+        while True:
+            try:
+                worker = self._idle.get(timeout=_poll_interval(deadline))
+            except queue.Empty:
+                if _expired(deadline):
+                    raise StepCancelled("Etapa cancelada: tempo limite excedido") from None
+                continue
+            if _expired(deadline):
+                # O prazo venceu enquanto esperava: devolve o worker sem rodar o script
+                self._idle.put(worker)
+                raise StepCancelled("Etapa cancelada: tempo limite excedido")
+            return worker
+
+    def _spawn(self) -> "_Worker":
+        """Sobe um worker numa vaga já reservada em ``_spawning``."""
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, [_ROOT, env.get("PYTHONPATH")]))
+        env[_PRELOAD_ENV] = ",".join(self.preload)
+        env[_CACHE_ENV] = str(self.cache_size)
+        try:
+            process = subprocess.Popen(
+                [sys.executable, "-m", "modules.script_pool"],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                env=env,
+            )
+        except BaseException:
+            with self._lock:
+                self._spawning -= 1
+            raise
+        worker = _Worker(process)
+        with self._lock:
+            self._spawning -= 1
+            self._workers.add(worker)
+        return worker
+
+    def _discard(self, worker: "_Worker"):
+        worker.kill()
+        with self._lock:
+            self._workers.discard(worker)
+            replace = not self._closed
+            if replace:
+                self._spawning += 1
+        if replace:
+            # Repõe o worker fora do caminho crítico da etapa
+            threading.Thread(target=lambda: self._idle.put(self._spawn()), daemon=True).start()
+
+
+class _Worker:
+    """Processo worker e a thread que lê suas respostas para ``replies``."""
+
+    def __init__(self, process: subprocess.Popen):
+        self.process = process
+        self.replies: queue.SimpleQueue = queue.SimpleQueue()
+        threading.Thread(target=self._read, daemon=True, name="pyrpa-script-reader").start()
+
+    def send(self, message):
+        self.send_bytes(pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def send_bytes(self, payload: bytes):
+        self.process.stdin.write(payload)
+        self.process.stdin.flush()
+
+    def stop(self):
+        try:
+            self.send(None)
+            self.process.wait(timeout=1)
+        except (OSError, subprocess.TimeoutExpired):
+            self.kill()
+
+    def kill(self):
+        self.process.kill()
+        self.process.wait()
+
+    def _read(self):
+        try:
+            while True:
+                self.replies.put(pickle.load(self.process.stdout))
+        except Exception:
+            # Canal encerrado ou resposta ilegível: ``run`` recebe a falha em vez de esperar para sempre
+            self.replies.put(None)
+
+
+_shared_pool: ScriptWorkerPool | None = None
+_shared_lock = threading.Lock()
+
+
+def shared_pool() -> ScriptWorkerPool:
+    """Pool único do processo, encerrado automaticamente na saída."""
+    global _shared_pool
+    with _shared_lock:
+        if _shared_pool is None:
+            _shared_pool = ScriptWorkerPool()
+            atexit.register(_shared_pool.shutdown)
+        return _shared_pool
+
+
+_compiled: OrderedDict = OrderedDict()
+_compiled_lock = threading.Lock()
+
+
+def script_digest(code: str) -> str:
+    return hashlib.sha256(code.encode("utf-8")).hexdigest()
+
+
+def compile_script(code: str, cache: OrderedDict | None = None, max_entries: int = 256):
+    """Compila ``code`` uma única vez por conteúdo (cache LRU pelo hash)."""
+    cache = _compiled if cache is None else cache
+    digest = script_digest(code)
+    with _compiled_lock:
+        compiled = cache.get(digest)
+        if compiled is not None:
+            cache.move_to_end(digest)
+            return compiled
+    compiled = compile(code, "<script>", "exec")
+    with _compiled_lock:
+        cache[digest] = compiled
+        while len(cache) > max_entries:
+            cache.popitem(last=False)
+    return compiled
+
+
+def _expired(deadline) -> bool:
+    return deadline is not None and (deadline.cancelled or deadline.remaining() == 0)
+
+
+def _poll_interval(deadline) -> float | None:
+    if deadline is None:
+        return None
+    remaining = deadline.remaining()
+    return 0.05 if remaining is None else min(0.05, remaining)
+
+
+def _worker_main():
+    # O canal de respostas fica num descritor próprio; prints do script vão para o stderr
+    channel = os.fdopen(os.dup(sys.stdout.fileno()), "wb")
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    requests = sys.stdin.buffer
+
+    for name in filter(None, os.environ.get(_PRELOAD_ENV, "").split(",")):
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            pass
+    from modules.step_handlers import Deadline
+
+    cache = OrderedDict()
+    cache_size = int(os.environ.get(_CACHE_ENV, "256"))
+    while True:
+        try:
+            message = pickle.load(requests)
+        except (EOFError, KeyboardInterrupt):
+            break
+        if message is None:
+            break
+        code, entrada, artifacts, timeout = message
+        exec_globals = {
+            "__name__": "__pyrpa_script__",
+            "artifacts": artifacts,
+            "entrada": entrada,
+            "deadline": Deadline(timeout),
+        }
+        try:
+            exec(compile_script(code, cache, cache_size), exec_globals)
+            reply = pickle.dumps(
+                ("ok", "resultado" in exec_globals, exec_globals.get("resultado")),
+                protocol=pickle.HIGHEST_PROTOCOL,
+            )
+        except Exception as e:
+            reply = pickle.dumps(("erro", f"{type(e).__name__}: {e}"))
+        channel.write(reply)
+        channel.flush()
+
+
+if __name__ == "__main__":
+    _worker_main()
@@ -0,0 +1,132 @@
+"""Cache de resultados de etapas de workflow para o PyRPA."""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from modules.scanner import FileScanner, scanner_for_step
+from modules.step_handlers import current_deadline
+
+try:
+    import requests
+    HAS_REQUESTS = True
+except ImportError:
+    HAS_REQUESTS = False
+
+
+class StepCache:
+    """Cache LRU com expiração (TTL) para resultados de etapas.
+
+    A chave combina tipo da etapa, parâmetros e uma impressão digital das
+    entradas (mtime/tamanho dos arquivos ou ETag da URL). Etapas sem
+    impressão digital conhecida nunca são cacheadas.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float | None = 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, object]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def key_for(self, step: dict, handler=None) -> str | None:
+        fingerprint = fingerprint_step(step, handler)
+        if fingerprint is None:
+            return None
+        payload = json.dumps(
+            [step.get("type", ""), step.get("params", {}), fingerprint],
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str):
+        """Retorna ``(True, valor)`` em caso de acerto ou ``(False, None)``."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            stored_at, value = entry
+            if self.ttl is not None and time.time() - stored_at > self.ttl:
+                del self._entries[key]
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, value
+
+    def put(self, key: str, value):
+        with self._lock:
+            self._entries[key] = (time.time(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def fingerprint_step(step: dict, handler=None):
+    """Impressão digital das entradas da etapa, ou ``None`` se não cacheável.
+
+    Com ``handler`` (o que executa a etapa), a consulta à URL reaproveita a
+    sessão HTTP dele.
+    """
+    step_type = step.get("type", "")
+    params = step.get("params", {})
+
+    if "Copiar" in step_type:
+        scanner = scanner_for_step(params)
+        return {
+            "origem": _folder_fingerprint(params.get("origem", ""), scanner),
+            "destino": _folder_fingerprint(params.get("destino", ""), scanner),
+        }
+
+    if "Web" in step_type:
+        return _url_fingerprint(params.get("url", ""), getattr(handler, "scraper", None))
+
+    return None
+
+
+def _folder_fingerprint(folder: str, scanner: FileScanner) -> str:
+    """Hash de ``(caminho, tamanho, mtime)`` dos arquivos, calculado durante a varredura."""
+    path = Path(folder)
+    if not folder or not path.is_dir():
+        return ""
+    digest = hashlib.sha256()
+    for entry in scanner.scan(folder, ordered=True):
+        st = entry.stat()
+        digest.update(f"{entry.rel}\0{st.st_size}\0{st.st_mtime_ns}\n".encode("utf-8", "surrogateescape"))
+    return digest.hexdigest()
+
+
+def _url_fingerprint(url: str, scraper=None):
+    if not HAS_REQUESTS or not url:
+        return None
+    # HEAD pela sessão keep-alive do handler, limitado ao prazo restante da etapa
+    remaining = current_deadline().remaining()
+    timeout = 10 if remaining is None else max(0.1, min(10, remaining))
+    try:
+        if scraper is not None:
+            resp = scraper.session.head(url, timeout=timeout, allow_redirects=True)
+        else:
+            resp = requests.head(
+                url, headers={"User-Agent": "PyRPA Bot/1.0"}, timeout=timeout, allow_redirects=True
+            )
+        resp.raise_for_status()
+    except Exception:
+        return None
+    etag = resp.headers.get("ETag")
+    last_modified = resp.headers.get("Last-Modified")
+    if not etag and not last_modified:
+        return None
+    return {"etag": etag, "last_modified": last_modified}
@@ -0,0 +1,623 @@
+"""Handlers das etapas de workflow para o PyRPA."""
+
+import asyncio
+import contextvars
+import io
+import mmap
+import threading
+import time
+from contextlib import contextmanager
+
+from modules.email_ops import EmailOperations
+from modules.excel_ops import ExcelOperations
+from modules.file_ops import FileOperations
+from modules.pdf_ops import PDFOperations
+from modules.scanner import scanner_for_step
+from modules.script_pool import compile_script, shared_pool
+from modules.streams import RecordStream, StreamClosed, batched
+from modules.web_scraper import WebScraperBot
+
+
+class StepCancelled(Exception):
+    """Levantada quando a etapa é cancelada ou estoura o tempo limite."""
+
+
+class Deadline:
+    """Prazo de uma tentativa de etapa, com cancelamento cooperativo.
+
+    O engine cancela o prazo quando a etapa estoura ``timeout``; handlers
+    de longa duração devem usar ``sleep``/``check`` ou limitar suas
+    chamadas de I/O por ``remaining()`` para encerrar logo em seguida.
+    """
+
+    def __init__(self, timeout: float | None = None):
+        self.timeout = timeout
+        self.expires_at = time.monotonic() + timeout if timeout else None
+        self._cancelled = threading.Event()
+
+    def remaining(self) -> float | None:
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def check(self):
+        if self.cancelled or self.remaining() == 0:
+            raise StepCancelled("Etapa cancelada: tempo limite excedido")
+
+    def sleep(self, seconds: float):
+        remaining = self.remaining()
+        if remaining is not None and remaining < seconds:
+            self._cancelled.wait(remaining)
+            raise StepCancelled("Etapa cancelada: tempo limite excedido")
+        if self._cancelled.wait(seconds):
+            raise StepCancelled("Etapa cancelada: tempo limite excedido")
+
+
+_current_deadline: contextvars.ContextVar[Deadline | None] = contextvars.ContextVar(
+    "pyrpa_step_deadline", default=None
+)
+
+
+def current_deadline() -> Deadline:
+    """Prazo da etapa em execução na thread/tarefa atual (sem limite se não houver)."""
+    return _current_deadline.get() or Deadline()
+
+
+@contextmanager
+def use_deadline(deadline: Deadline):
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+class StepHandler:
+    """Executa um tipo de etapa. Instanciado uma vez e reutilizado entre etapas.
+
+    ``run`` recebe a etapa e o ``ArtifactStore`` da execução (ou ``None``) e
+    devolve a mensagem de resultado. ``run_async`` roda ``run`` numa thread;
+    handlers com I/O nativo assíncrono podem sobrescrevê-lo.
+
+    Handlers que podem produzir registros aos poucos implementam ``stream``;
+    o engine chama ``produce`` para etapas com ``"stream": True``.
+    """
+
+    def run(self, step: dict, artifacts) -> str:
+        raise NotImplementedError
+
+    async def run_async(self, step: dict, artifacts) -> str:
+        return await asyncio.to_thread(self.run, step, artifacts)
+
+    def stream(self, step: dict, artifacts):
+        """Gera lotes de registros (listas de dicts ou DataFrames)."""
+        raise ValueError(f"Etapa '{step.get('type', '')}' não suporta streaming")
+
+    def produce(self, step: dict, artifacts) -> str:
+        """Publica os lotes de ``stream`` no ``RecordStream`` de saída da etapa."""
+        channel = artifacts.get(output_name(step))
+        try:
+            for batch in self.stream(step, artifacts):
+                if len(batch):
+                    channel.put(batch)
+        except StreamClosed:
+            channel.close()
+            raise
+        except BaseException as e:
+            channel.close(error=str(e) or type(e).__name__)
+            raise
+        channel.close()
+        return f"{channel.records_in} registro(s) em {channel.batches_in} lote(s) transmitidos"
+
+
+class SimulatedHandler(StepHandler):
+
+    def run(self, step: dict, artifacts) -> str:
+        current_deadline().sleep(0.3)
+        return f"Etapa '{step.get('type', '')}' executada (simulação)"
+
+    async def run_async(self, step: dict, artifacts) -> str:
+        await asyncio.sleep(0.3)
+        return f"Etapa '{step.get('type', '')}' executada (simulação)"
+
+
+class DelayHandler(StepHandler):
+
+    def run(self, step: dict, artifacts) -> str:
+        seconds = int(step.get("params", {}).get("segundos", 5))
+        current_deadline().sleep(min(seconds, 10))  # Limitar a 10s no app
+        return f"Aguardou {seconds}s"
+
+    async def run_async(self, step: dict, artifacts) -> str:
+        seconds = int(step.get("params", {}).get("segundos", 5))
+        await asyncio.sleep(min(seconds, 10))
+        return f"Aguardou {seconds}s"
+
+
+class FileTransferHandler(StepHandler):
+
+    def __init__(self, operation: str):
+        self.operation = operation
+        self.fops = FileOperations()
+
+    def run(self, step: dict, artifacts) -> str:
+        params = step.get("params", {})
+        if self.operation == "copiar" and params.get("sincronizar"):
+            result = self.fops.sync(
+                params.get("origem", ""),
+                params.get("destino", ""),
+                params.get("filtro") or None,
+                mirror_deletes=bool(params.get("espelhar")),
+                io_depth=int(params.get("paralelismo") or 8),
+                scanner=scanner_for_step(params),
+            )
+        else:
+            result = self.fops.copy_or_move(
+                params.get("origem", ""),
+                params.get("destino", ""),
+                params.get("filtro") or None,
+                self.operation,
+                io_depth=int(params.get("paralelismo") or 8),
+                scanner=scanner_for_step(params),
+            )
+        if result["status"] == "Erro":
+            raise RuntimeError(result["message"])
+        return result["message"]
+
+
+class RenameHandler(StepHandler):
+
+    def __init__(self):
+        self.fops = FileOperations()
+
+    def run(self, step: dict, artifacts) -> str:
+        params = step.get("params", {})
+        result = self.fops.batch_rename(
+            params.get("origem", ""),
+            params.get("prefixo", ""),
+            params.get("add_date", False),
+            params.get("add_seq", True),
+        )
+        if result["status"] == "Erro":
+            raise RuntimeError(result["message"])
+        return result["message"]
+
+
+class WebHandler(StepHandler):
+
+    def __init__(self):
+        self.scraper = WebScraperBot()
+
+    def run(self, step: dict, artifacts) -> str:
+        params = step.get("params", {})
+        if params.get("tabelas"):
+            result = self.scraper.extract_tables(params.get("url", ""), timeout=self._http_timeout())
+            if result["status"] == "Erro":
+                raise RuntimeError(result["message"])
+            tables = result["tables"]
+            if tables:
+                publish(step, artifacts, tables[0] if len(tables) == 1 else tables)
+            return f"Extraída(s) {len(tables)} tabela(s)"
+        result = self.scraper.extract_content(
+            params.get("url", ""),
+            params.get("seletor") or None,
+            timeout=self._http_timeout(),
+        )
+        return self._text_result(step, artifacts, result)
+
+    async def run_async(self, step: dict, artifacts) -> str:
+        params = step.get("params", {})
+        if params.get("tabelas"):
+            return await super().run_async(step, artifacts)
+        result = await self.scraper.extract_content_async(
+            params.get("url", ""),
+            params.get("seletor") or None,
+            timeout=self._http_timeout(),
+        )
+        return self._text_result(step, artifacts, result)
+
+    def stream(self, step: dict, artifacts):
+        params = step.get("params", {})
+        if not params.get("tabelas"):
+            raise ValueError("Streaming de etapas web requer 'Extrair tabelas'")
+        result = self.scraper.extract_tables(params.get("url", ""), timeout=self._http_timeout())
+        if result["status"] == "Erro":
+            raise RuntimeError(result["message"])
+        size = batch_size(step)
+        for table in result["tables"]:
+            for start in range(0, len(table), size):
+                yield table.iloc[start:start + size]
+
+    @staticmethod
+    def _http_timeout() -> float:
+        remaining = current_deadline().remaining()
+        return 30 if remaining is None else max(0.1, min(30, remaining))
+
+    @staticmethod
+    def _text_result(step: dict, artifacts, result: dict) -> str:
+        if result["status"] == "Erro":
+            raise RuntimeError(result["message"])
+        publish(step, artifacts, result["data"])
+        return f"Extraído {len(result['data'])} caracteres"
+
+
+class TableHandler(StepHandler):
+    """Etapas Excel/CSV: lê arquivos ou tabelas de entrada e aplica transformações."""
+
+    def __init__(self):
+        self.xlops = ExcelOperations()
+        self.simulated = SimulatedHandler()
+
+    def run(self, step: dict, artifacts) -> str:
+        params = step.get("params", {})
+        if not (params.get("arquivo") or step.get("input")):
+            return self.simulated.run(step, artifacts)
+        channel = stream_input(step, artifacts)
+        if channel is not None:
+            return self._write_stream(step, channel)
+        df = self._load_frames(step, artifacts)
+        transforms = params.get("transformacoes") or []
+        if transforms:
+            df = self.xlops.apply_transforms(df, transforms)
+        publish(step, artifacts, df)
+        return f"{df.shape[0]} linhas x {df.shape[1]} colunas"
+
+    async def run_async(self, step: dict, artifacts) -> str:
+        if not (step.get("params", {}).get("arquivo") or step.get("input")):
+            return await self.simulated.run_async(step, artifacts)
+        return await super().run_async(step, artifacts)
+
+    def stream(self, step: dict, artifacts):
+        import pandas as pd
+        from glob import glob
+
+        pattern = step.get("params", {}).get("arquivo")
+        if not pattern:
+            raise ValueError("Streaming de planilhas requer 'arquivo'")
+        size = batch_size(step)
+        for path in sorted(glob(pattern)) or [pattern]:
+            if path.lower().endswith(".csv"):
+                yield from pd.read_csv(path, chunksize=size)
+            else:
+                yield from self._excel_batches(path, size)
+
+    @staticmethod
+    def _excel_batches(path: str, size: int):
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = [str(h) for h in next(rows, ())]
+            yield from batched((dict(zip(header, row)) for row in rows), size)
+        finally:
+            workbook.close()
+
+    def _write_stream(self, step: dict, channel: RecordStream) -> str:
+        """Consome o canal lote a lote, gravando em ``saida`` (CSV ou XLSX) sem acumular."""
+        import pandas as pd
+
+        params = step.get("params", {})
+        target = params.get("saida")
+        if not target:
+            raise ValueError("Etapa consumindo stream precisa de 'saida' (arquivo .csv ou .xlsx)")
+        transforms = params.get("transformacoes") or []
+        rows = 0
+        if target.lower().endswith(".csv"):
+            with open(target, "w", newline="", encoding="utf-8") as f:
+                for batch in channel:
+                    df = batch if isinstance(batch, pd.DataFrame) else pd.DataFrame(batch)
+                    if transforms:
+                        df = self.xlops.apply_transforms(df, transforms)
+                    df.to_csv(f, index=False, header=rows == 0)
+                    rows += len(df)
+        else:
+            from openpyxl import Workbook
+
+            workbook = Workbook(write_only=True)
+            sheet = workbook.create_sheet()
+            for batch in channel:
+                df = batch if isinstance(batch, pd.DataFrame) else pd.DataFrame(batch)
+                if transforms:
+                    df = self.xlops.apply_transforms(df, transforms)
+                if rows == 0:
+                    sheet.append([str(c) for c in df.columns])
+                for row in df.itertuples(index=False):
+                    sheet.append(list(row))
+                rows += len(df)
+            workbook.save(target)
+        return f"{rows} linha(s) gravada(s) em {target}"
+
+    @staticmethod
+    def _load_frames(step: dict, artifacts):
+        import pandas as pd
+
+        frames = []
+        for value in inputs(step, artifacts):
+            if isinstance(value, pd.DataFrame):
+                frames.append(value)
+            elif isinstance(value, (list, tuple)):
+                frames.extend(value)
+            else:
+                raise TypeError(f"Artefato do tipo {type(value).__name__} não é uma tabela")
+
+        pattern = step.get("params", {}).get("arquivo")
+        if pattern:
+            from glob import glob
+            paths = sorted(glob(pattern)) or [pattern]
+            for path in paths:
+                if path.lower().endswith(".csv"):
+                    frames.append(pd.read_csv(path))
+                else:
+                    frames.append(pd.read_excel(path))
+
+        if len(frames) == 1:
+            return frames[0]
+        return pd.concat(frames, ignore_index=True)
+
+
+class EmailHandler(StepHandler):
+    """Envia e-mail quando há configuração SMTP nos parâmetros; senão simula."""
+
+    def __init__(self):
+        self.emops = EmailOperations()
+        self.simulated = SimulatedHandler()
+
+    def run(self, step: dict, artifacts) -> str:
+        params = step.get("params", {})
+        if not params.get("smtp_host"):
+            return self.simulated.run(step, artifacts)
+        channel = stream_input(step, artifacts)
+        if channel is not None:
+            return self._mail_merge(params, channel)
+        values = inputs(step, artifacts)
+        attachment = as_attachment(values[0], params.get("anexo_nome") or "dados") if values else None
+        result = self.emops.send_email(
+            params["smtp_host"],
+            int(params.get("smtp_port", 587)),
+            params.get("smtp_user", ""),
+            params.get("smtp_senha", ""),
+            [r.strip() for r in params.get("destinatario", "").split(",") if r.strip()],
+            params.get("assunto", ""),
+            params.get("corpo", ""),
+            attachment,
+            keep_alive=True,
+        )
+        if result["status"] == "Erro":
+            raise RuntimeError(result["message"])
+        return result["message"]
+
+    async def run_async(self, step: dict, artifacts) -> str:
+        if not step.get("params", {}).get("smtp_host"):
+            return await self.simulated.run_async(step, artifacts)
+        return await super().run_async(step, artifacts)
+
+    def _mail_merge(self, params: dict, channel: RecordStream) -> str:
+        """Um e-mail por registro; ``{campo}`` em assunto/corpo é preenchido com o registro."""
+        field = params.get("campo_email") or "email"
+        sent = 0
+        for record in channel.records():
+            values = _FormatDict(record)
+            result = self.emops.send_email(
+                params["smtp_host"],
+                int(params.get("smtp_port", 587)),
+                params.get("smtp_user", ""),
+                params.get("smtp_senha", ""),
+                [str(record[field])],
+                params.get("assunto", "").format_map(values),
+                params.get("corpo", "").format_map(values),
+                keep_alive=True,
+            )
+            if result["status"] == "Erro":
+                raise RuntimeError(f"Falha ao enviar para {record[field]}: {result['message']}")
+            sent += 1
+        return f"{sent} e-mail(s) enviado(s)"
+
+
+class ScriptHandler(StepHandler):
+    """Executa o código do usuário num worker pré-aquecido (``ScriptWorkerPool``).
+
+    No worker, ``artifacts`` é um dict com os artefatos de ``input``; use
+    ``"isolado": False`` nos parâmetros para rodar na thread do engine com
+    acesso ao ``ArtifactStore`` completo. Nos dois modos o código compilado
+    fica em cache pelo hash do texto.
+    """
+
+    def __init__(self, pool=None):
+        self._pool = pool
+
+    @property
+    def pool(self):
+        if self._pool is None:
+            self._pool = shared_pool()
+        return self._pool
+
+    def run(self, step: dict, artifacts) -> str:
+        params = step.get("params", {})
+        code = params.get("codigo", "")
+        if not code:
+            return "Script vazio"
+        values = inputs(step, artifacts)
+        entrada = values[0] if len(values) == 1 else values
+
+        # Canais não atravessam processos: scripts que consomem stream rodam na thread
+        if not params.get("isolado", True) or any(isinstance(v, RecordStream) for v in values):
+            exec_globals = {"artifacts": artifacts, "entrada": entrada, "deadline": current_deadline()}
+            exec(compile_script(code), exec_globals)
+            has_result, result = "resultado" in exec_globals, exec_globals.get("resultado")
+        else:
+            names = step.get("input") or []
+            if not isinstance(names, (list, tuple)):
+                names = [names]
+            detached = [detach(value) for value in values]
+            has_result, result = self.pool.run(
+                code,
+                detached[0] if len(detached) == 1 else detached,
+                {str(name): value for name, value in zip(names, detached)},
+                current_deadline(),
+            )
+        if has_result:
+            publish(step, artifacts, result)
+        return "Script executado"
+
+    def stream(self, step: dict, artifacts):
+        """O script atribui a ``resultado`` um iterável de registros (ex.: um gerador)."""
+        code = step.get("params", {}).get("codigo", "")
+        values = inputs(step, artifacts)
+        exec_globals = {
+            "artifacts": artifacts,
+            "entrada": values[0] if len(values) == 1 else values,
+            "deadline": current_deadline(),
+        }
+        exec(compile_script(code), exec_globals)
+        if "resultado" not in exec_globals:
+            raise ValueError("Script em streaming deve definir 'resultado' como um iterável de registros")
+        yield from batched(exec_globals["resultado"], batch_size(step))
+
+
+class PdfHandler(StepHandler):
+    """Extrai o texto de ``arquivo``; em streaming, gera um registro por página."""
+
+    def __init__(self):
+        self.pdfops = PDFOperations()
+        self.simulated = SimulatedHandler()
+
+    def run(self, step: dict, artifacts) -> str:
+        path = step.get("params", {}).get("arquivo")
+        if not path:
+            return self.simulated.run(step, artifacts)
+        result = self.pdfops.extract_text(path)
+        if result["status"] == "Erro":
+            raise RuntimeError(result["message"])
+        publish(step, artifacts, result["data"])
+        return f"Extraído {len(result['data'])} caracteres"
+
+    def stream(self, step: dict, artifacts):
+        from glob import glob
+
+        pattern = step.get("params", {}).get("arquivo")
+        if not pattern:
+            raise ValueError("Streaming de PDF requer 'arquivo'")
+        pages = (
+            {"arquivo": path, "pagina": number, "texto": text}
+            for path in sorted(glob(pattern)) or [pattern]
+            for number, text in self.pdfops.iter_pages(path)
+        )
+        yield from batched(pages, batch_size(step))
+
+
+class HandlerRegistry:
+    """Mapa tipo de etapa → handler, resolvido uma vez por tipo.
+
+    Tipos registrados com ``register`` casam pelo nome exato; com
+    ``register_keyword`` casam quando a palavra aparece no tipo (como o
+    despacho original por substring). O resultado de cada resolução fica
+    memorizado, então o custo por etapa é um acesso a dicionário.
+    """
+
+    def __init__(self, default: StepHandler | None = None):
+        self.default = default or SimulatedHandler()
+        self._exact: dict[str, StepHandler] = {}
+        self._keywords: list[tuple[str, StepHandler]] = []
+        self._resolved: dict[str, StepHandler] = {}
+
+    def register(self, step_type: str, handler: StepHandler):
+        self._exact[step_type] = handler
+        self._resolved.clear()
+
+    def register_keyword(self, keyword: str, handler: StepHandler):
+        self._keywords.append((keyword, handler))
+        self._resolved.clear()
+
+    def resolve(self, step_type: str) -> StepHandler:
+        handler = self._resolved.get(step_type)
+        if handler is None:
+            handler = self._exact.get(step_type)
+            if handler is None:
+                handler = next(
+                    (h for keyword, h in self._keywords if keyword in step_type),
+                    self.default,
+                )
+            self._resolved[step_type] = handler
+        return handler
+
+
+def default_registry() -> HandlerRegistry:
+    registry = HandlerRegistry()
+    registry.register_keyword("Aguardar", DelayHandler())
+    registry.register_keyword("Copiar", FileTransferHandler("copiar"))
+    registry.register_keyword("Mover", FileTransferHandler("mover"))
+    registry.register_keyword("Renomear", RenameHandler())
+    registry.register_keyword("Web", WebHandler())
+    table = TableHandler()
+    registry.register_keyword("Excel", table)
+    registry.register_keyword("CSV", table)
+    registry.register_keyword("E-mail", EmailHandler())
+    registry.register_keyword("Extrair Texto PDF", PdfHandler())
+    registry.register_keyword("Script", ScriptHandler())
+    return registry
+
+
+def output_name(step: dict) -> str:
+    return str(step.get("output") or step["id"])
+
+
+def publish(step: dict, artifacts, value):
+    if artifacts is not None:
+        artifacts.put(output_name(step), value)
+
+
+def inputs(step: dict, artifacts) -> list:
+    names = step.get("input")
+    if names is None or names == "":
+        return []
+    if artifacts is None:
+        raise RuntimeError(f"Etapa {step['id']} consome artefatos, mas não há store ativo")
+    if not isinstance(names, (list, tuple)):
+        names = [names]
+    return [artifacts.get(name) for name in names]
+
+
+def stream_input(step: dict, artifacts) -> RecordStream | None:
+    """O ``RecordStream`` consumido pela etapa, se sua entrada for um canal."""
+    values = inputs(step, artifacts)
+    if len(values) == 1 and isinstance(values[0], RecordStream):
+        return values[0]
+    if any(isinstance(v, RecordStream) for v in values):
+        raise ValueError(f"Etapa {step['id']} mistura canal de streaming com outras entradas")
+    return None
+
+
+def batch_size(step: dict) -> int:
+    return int(step.get("params", {}).get("lote") or 1000)
+
+
+class _FormatDict(dict):
+    def __missing__(self, key):
+        return "{" + key + "}"
+
+
+def detach(value):
+    """Copia para bytes artefatos mapeados em disco, que morrem com o store."""
+    if isinstance(value, mmap.mmap):
+        return bytes(value)
+    return value
+
+
+def as_attachment(value, name: str):
+    if hasattr(value, "to_csv"):
+        data, suffix = value.to_csv(index=False).encode("utf-8"), ".csv"
+    elif isinstance(value, str):
+        data, suffix = value.encode("utf-8"), ".txt"
+    else:
+        data, suffix = bytes(value), ".bin"
+    attachment = io.BytesIO(data)
+    attachment.name = name if "." in name else name + suffix
+    return attachment
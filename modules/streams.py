@@ -0,0 +1,116 @@
+"""Canais de registros entre etapas de workflow para o PyRPA."""
+
+import collections
+import threading
+
+try:
+    import pandas as pd
+    HAS_PANDAS = True
+except ImportError:
+    HAS_PANDAS = False
+
+
+class StreamClosed(Exception):
+    """Levantada ao publicar num canal cujas consumidoras desistiram."""
+
+
+class RecordStream:
+    """Fila limitada de lotes de registros entre uma etapa produtora e suas consumidoras.
+
+    ``put`` bloqueia quando há ``max_batches`` lotes pendentes, de modo que a
+    produtora anda no ritmo da consumidora e a memória fica limitada a
+    ``max_batches`` lotes. Um lote é uma lista de dicts ou um DataFrame.
+    Várias consumidoras no mesmo canal dividem os lotes entre si.
+
+    As esperas respeitam o prazo da etapa (``current_deadline``) para que
+    timeouts e cancelamentos não deixem threads presas no canal.
+    """
+
+    _END = object()
+
+    def __init__(self, name: str, max_batches: int = 8):
+        self.name = name
+        self.max_batches = max_batches
+        self.batches_in = 0
+        self.records_in = 0
+        self.max_depth = 0
+        self._items: collections.deque = collections.deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._cancelled = False
+        self._error: str | None = None
+
+    def put(self, batch):
+        """Publica um lote, esperando vaga se o canal estiver cheio."""
+        with self._cond:
+            self._wait(lambda: len(self._items) < self.max_batches or self._cancelled)
+            if self._cancelled:
+                raise StreamClosed(f"Canal '{self.name}' encerrado pela consumidora")
+            if self._closed:
+                raise StreamClosed(f"Canal '{self.name}' já foi fechado")
+            self._items.append(batch)
+            self.batches_in += 1
+            self.records_in += len(batch)
+            self.max_depth = max(self.max_depth, len(self._items))
+            self._cond.notify_all()
+
+    def close(self, error: str | None = None):
+        """Sinaliza fim dos dados (ou falha da produtora, com ``error``)."""
+        with self._cond:
+            if not self._closed:
+                self._closed = True
+                self._error = error
+                self._cond.notify_all()
+
+    def cancel(self):
+        """Chamado pela consumidora ao falhar: libera a produtora bloqueada em ``put``."""
+        with self._cond:
+            self._cancelled = True
+            self._items.clear()
+            self._cond.notify_all()
+
+    def __iter__(self):
+        """Lotes na ordem de chegada até a produtora fechar o canal."""
+        while True:
+            with self._cond:
+                self._wait(lambda: self._items or self._closed)
+                if self._items:
+                    batch = self._items.popleft()
+                    self._cond.notify_all()
+                elif self._error:
+                    raise RuntimeError(f"Produtora do canal '{self.name}' falhou: {self._error}")
+                else:
+                    return
+            yield batch
+
+    def records(self):
+        """Registros (dicts) um a um, desmontando os lotes."""
+        for batch in self:
+            yield from iter_records(batch)
+
+    def _wait(self, predicate):
+        from modules.step_handlers import current_deadline
+
+        deadline = current_deadline()
+        while not predicate():
+            deadline.check()
+            remaining = deadline.remaining()
+            self._cond.wait(0.1 if remaining is None else min(0.1, remaining))
+
+
+def iter_records(batch):
+    if HAS_PANDAS and isinstance(batch, pd.DataFrame):
+        return iter(batch.to_dict("records"))
+    return iter(batch)
+
+
+def batched(records, size: int):
+    """Agrupa um iterável de registros em listas de até ``size`` itens."""
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
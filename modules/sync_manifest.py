@@ -0,0 +1,221 @@
+"""Manifesto de sincronização incremental de pastas para o PyRPA."""
+
+import hashlib
+import os
+import sqlite3
+from datetime import datetime
+
+# Lote de linhas gravadas por transação durante uma sincronização
+_BATCH = 2000
+
+
+class SyncManifest:
+    """Tabela SQLite com o que já foi sincronizado de cada par origem → destino.
+
+    Cada arquivo transferido fica registrado com tamanho, mtime (ns) e,
+    opcionalmente, hash BLAKE2b do conteúdo. Na próxima sincronização só
+    são copiados os arquivos novos ou alterados; o par de pastas é uma
+    linha em ``pairs`` e os arquivos usam o id numérico do par (tabela
+    ``WITHOUT ROWID``), o que mantém o banco compacto mesmo com centenas de
+    milhares de arquivos.
+    """
+
+    def __init__(self, db_path: str = "pyrpa_sync.db"):
+        self.db_path = db_path
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS pairs (
+                    pair_id  INTEGER PRIMARY KEY,
+                    src      TEXT NOT NULL,
+                    dst      TEXT NOT NULL,
+                    last_run INTEGER NOT NULL DEFAULT 0,
+                    UNIQUE (src, dst)
+                );
+                CREATE TABLE IF NOT EXISTS files (
+                    pair_id   INTEGER NOT NULL,
+                    name      TEXT NOT NULL,
+                    size      INTEGER NOT NULL,
+                    mtime_ns  INTEGER NOT NULL,
+                    hash      TEXT,
+                    seen      INTEGER NOT NULL,
+                    synced_at TEXT NOT NULL,
+                    PRIMARY KEY (pair_id, name)
+                ) WITHOUT ROWID;
+                """
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def open(self, src: str, dst: str) -> "SyncRun":
+        """Inicia uma sincronização de ``src`` para ``dst`` (use com ``with``)."""
+        return SyncRun(self._connect(), os.path.abspath(src), os.path.abspath(dst))
+
+    def files(self, src: str, dst: str) -> list[dict]:
+        """Arquivos registrados para o par, em ordem de nome."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                """
+                SELECT f.name, f.size, f.mtime_ns, f.hash, f.synced_at FROM files f
+                JOIN pairs p ON p.pair_id = f.pair_id WHERE p.src = ? AND p.dst = ? ORDER BY f.name
+                """,
+                (os.path.abspath(src), os.path.abspath(dst)),
+            ).fetchall()
+        return [
+            {"name": name, "size": size, "mtime_ns": mtime_ns, "hash": digest, "synced_at": synced_at}
+            for name, size, mtime_ns, digest, synced_at in rows
+        ]
+
+    def forget(self, src: str, dst: str):
+        """Apaga o registro do par: a próxima sincronização copia tudo de novo."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT pair_id FROM pairs WHERE src = ? AND dst = ?", (os.path.abspath(src), os.path.abspath(dst))
+            ).fetchone()
+            if row:
+                conn.execute("DELETE FROM files WHERE pair_id = ?", row)
+                conn.execute("DELETE FROM pairs WHERE pair_id = ?", row)
+
+
+class SyncRun:
+    """Uma passada de sincronização de um par de pastas.
+
+    ``plan`` filtra as entradas da origem e devolve só o que precisa ser
+    copiado; ``record`` registra cada cópia concluída; ``stale`` lista o
+    que sumiu da origem desde a última passada. Todas as chamadas devem
+    vir da mesma thread (a do ``TransferEngine.run``).
+    """
+
+    def __init__(self, conn: sqlite3.Connection, src: str, dst: str):
+        self.conn = conn
+        self.src = src
+        self.dst = dst
+        conn.execute("INSERT OR IGNORE INTO pairs (src, dst) VALUES (?, ?)", (src, dst))
+        self.pair_id, last_run = conn.execute(
+            "SELECT pair_id, last_run FROM pairs WHERE src = ? AND dst = ?", (src, dst)
+        ).fetchone()
+        self.run = last_run + 1
+        conn.execute("UPDATE pairs SET last_run = ? WHERE pair_id = ?", (self.run, self.pair_id))
+        conn.commit()
+        self.skipped = 0
+        self._seen: list = []
+        self._done: list = []
+        self._pending: dict = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def plan(self, entries, verify_hash: bool = False):
+        """Gera ``(origem, destino, tamanho)`` dos arquivos novos ou alterados.
+
+        ``entries`` são ``ScanEntry`` da origem (``FileScanner.scan``); o
+        manifesto usa o caminho relativo e o stat delas é reaproveitado.
+        Um arquivo é considerado igual quando o manifesto tem o mesmo tamanho
+        e mtime e o destino ainda existe com esse tamanho. Com
+        ``verify_hash``, um arquivo de mesmo tamanho mas mtime diferente é
+        comparado pelo conteúdo antes de ser copiado de novo.
+        """
+        for entry in entries:
+            st = entry.stat()
+            dst = os.path.join(self.dst, entry.rel)
+            row = self.conn.execute(
+                "SELECT size, mtime_ns, hash FROM files WHERE pair_id = ? AND name = ?",
+                (self.pair_id, entry.rel),
+            ).fetchone()
+            self._mark_seen(entry.rel)
+            if row and row[0] == st.st_size and _dst_size(dst) == st.st_size:
+                if row[1] == st.st_mtime_ns:
+                    self.skipped += 1
+                    continue
+                if verify_hash and row[2]:
+                    digest = file_hash(entry.path)
+                    if digest == row[2]:
+                        # Só o mtime mudou (ex.: arquivo "tocado"): atualiza o registro sem copiar
+                        self._done.append((self.pair_id, entry.rel, st.st_size, st.st_mtime_ns,
+                                           digest, self.run, _now()))
+                        self.skipped += 1
+                        continue
+                    self._pending[entry.path] = (entry.rel, digest, st.st_mtime_ns)
+            if verify_hash and entry.path not in self._pending:
+                self._pending[entry.path] = (entry.rel, file_hash(entry.path), st.st_mtime_ns)
+            elif not verify_hash:
+                self._pending[entry.path] = (entry.rel, None, st.st_mtime_ns)
+            yield entry.path, dst, st.st_size
+
+    def record(self, src: str, dst: str, size: int):
+        """Registra uma cópia concluída (callback ``on_file`` do ``TransferEngine``)."""
+        rel, digest, mtime_ns = self._pending.pop(src)
+        self._done.append((self.pair_id, rel, size, mtime_ns, digest, self.run, _now()))
+        if len(self._done) >= _BATCH:
+            self._flush()
+
+    def stale(self, match=None) -> list[str]:
+        """Caminhos registrados que não apareceram nesta passada.
+
+        ``match(caminho_relativo)`` restringe aos que o filtro atual cobre
+        (ex.: ``FileScanner.matches_path``).
+        """
+        self._flush()
+        rows = self.conn.execute(
+            "SELECT name FROM files WHERE pair_id = ? AND seen < ?", (self.pair_id, self.run)
+        ).fetchall()
+        return [name for name, in rows if match is None or match(name)]
+
+    def drop(self, names: list[str]):
+        """Remove ``names`` do manifesto (ex.: apagados do destino ao espelhar)."""
+        self.conn.executemany(
+            "DELETE FROM files WHERE pair_id = ? AND name = ?", [(self.pair_id, name) for name in names]
+        )
+        self.conn.commit()
+
+    def close(self):
+        try:
+            self._flush()
+        finally:
+            self.conn.close()
+
+    def _mark_seen(self, name: str):
+        self._seen.append((self.run, self.pair_id, name))
+        if len(self._seen) >= _BATCH:
+            self._flush()
+
+    def _flush(self):
+        if self._seen:
+            self.conn.executemany("UPDATE files SET seen = ? WHERE pair_id = ? AND name = ?", self._seen)
+            self._seen = []
+        if self._done:
+            self.conn.executemany(
+                """
+                INSERT INTO files (pair_id, name, size, mtime_ns, hash, seen, synced_at) VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (pair_id, name) DO UPDATE SET size = excluded.size, mtime_ns = excluded.mtime_ns,
+                    hash = excluded.hash, seen = excluded.seen, synced_at = excluded.synced_at
+                """,
+                self._done,
+            )
+            self._done = []
+        self.conn.commit()
+
+
+def file_hash(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Hash BLAKE2b do conteúdo, lido em blocos."""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _dst_size(path: str) -> int | None:
+    try:
+        return os.stat(path).st_size
+    except OSError:
+        return None
+
+
+def _now() -> str:
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
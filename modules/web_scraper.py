@@ -1,6 +1,9 @@
 """Módulo de Web Scraping para o PyRPA."""
 
+import asyncio
 import io
+import threading
+import weakref
 
 try:
     import requests
@@ -15,35 +18,110 @@ try:
 except ImportError:
     HAS_PANDAS = False
 
+try:
+    import aiohttp
+    HAS_AIOHTTP = True
+except ImportError:
+    HAS_AIOHTTP = False
+
 
 class WebScraperBot:
 
-    def extract_content(self, url: str, selector: str | None = None) -> dict:
+    def __init__(self):
+        self._session = None
+        self._session_lock = threading.Lock()
+        self._async_sessions = weakref.WeakKeyDictionary()
+
+    @property
+    def session(self):
+        """Sessão HTTP com keep-alive, compartilhada entre as chamadas desta instância."""
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    session = requests.Session()
+                    adapter = requests.adapters.HTTPAdapter(pool_connections=16, pool_maxsize=32)
+                    session.mount("http://", adapter)
+                    session.mount("https://", adapter)
+                    session.headers["User-Agent"] = "PyRPA Bot/1.0"
+                    self._session = session
+        return self._session
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+    async def async_session(self):
+        """Sessão aiohttp do event loop atual, criada na primeira chamada e reaproveitada.
+
+        É fechada por ``aclose`` ou, no encerramento do loop, pelo
+        ``shutdown_asyncgens`` que ``asyncio.run`` executa.
+        """
+        loop = asyncio.get_running_loop()
+        entry = self._async_sessions.get(loop)
+        if entry is None:
+            connector = aiohttp.TCPConnector(limit=100, limit_per_host=32)
+            session = aiohttp.ClientSession(headers={"User-Agent": "PyRPA Bot/1.0"}, connector=connector)
+            entry = self._async_sessions[loop] = (session, _close_on_shutdown(session))
+            # O gerador fica suspenso até o loop ser encerrado e então fecha a sessão
+            await entry[1].asend(None)
+        return entry[0]
+
+    async def aclose(self):
+        """Fecha a sessão aiohttp do event loop atual."""
+        entry = self._async_sessions.pop(asyncio.get_running_loop(), None)
+        if entry is not None:
+            await entry[1].aclose()
+
+    def extract_content(self, url: str, selector: str | None = None, timeout: float = 30) -> dict:
         if not HAS_DEPS:
             return {"status": "Erro", "message": "Instale: pip install requests beautifulsoup4"}
         try:
-            headers = {"User-Agent": "PyRPA Bot/1.0"}
-            resp = requests.get(url, headers=headers, timeout=30)
+            resp = self.session.get(url, timeout=timeout)
             resp.raise_for_status()
-            soup = BeautifulSoup(resp.text, "html.parser")
+            return {"status": "Sucesso", "data": self._parse_text(resp.text, selector)}
+        except Exception as e:
+            return {"status": "Erro", "message": str(e)}
 
-            if selector:
-                elements = soup.select(selector)
-                text = "\n\n".join(el.get_text(strip=True) for el in elements)
-            else:
-                for tag in soup(["script", "style", "nav", "footer", "header"]):
-                    tag.decompose()
-                text = soup.get_text(separator="\n", strip=True)
+    async def extract_content_async(
+        self, url: str, selector: str | None = None, timeout: float = 30
+    ) -> dict:
+        """Versão assíncrona de ``extract_content``.
 
-            return {"status": "Sucesso", "data": text}
+        Usa aiohttp quando instalado; caso contrário executa a versão
+        síncrona numa thread para não bloquear o event loop.
+        """
+        if not HAS_AIOHTTP:
+            return await asyncio.to_thread(self.extract_content, url, selector, timeout)
+        if not HAS_DEPS:
+            return {"status": "Erro", "message": "Instale: pip install requests beautifulsoup4"}
+        try:
+            session = await self.async_session()
+            async with session.get(url, timeout=aiohttp.ClientTimeout(total=timeout)) as resp:
+                resp.raise_for_status()
+                html = await resp.text()
+            return {"status": "Sucesso", "data": self._parse_text(html, selector)}
         except Exception as e:
             return {"status": "Erro", "message": str(e)}
 
-    def extract_tables(self, url: str) -> dict:
+    @staticmethod
+    def _parse_text(html: str, selector: str | None) -> str:
+        soup = BeautifulSoup(html, "html.parser")
+        if selector:
+            elements = soup.select(selector)
+            return "\n\n".join(el.get_text(strip=True) for el in elements)
+        for tag in soup(["script", "style", "nav", "footer", "header"]):
+            tag.decompose()
+        return soup.get_text(separator="\n", strip=True)
+
+    def extract_tables(self, url: str, timeout: float = 30) -> dict:
         if not HAS_DEPS or not HAS_PANDAS:
             return {"status": "Erro", "message": "Instale: pip install requests beautifulsoup4 pandas lxml"}
         try:
-            tables = pd.read_html(url)
+            # Baixa pela sessão (keep-alive e timeout); read_html sozinho usaria urllib sem prazo
+            resp = self.session.get(url, timeout=timeout)
+            resp.raise_for_status()
+            tables = pd.read_html(io.StringIO(resp.text))
             return {"status": "Sucesso", "tables": tables}
         except ValueError:
             return {"status": "Sucesso", "tables": []}
@@ -177,3 +255,10 @@ if __name__ == "__main__":
         df.to_csv(f"tabela_{{i+1}}.csv", index=False)
         print(f"Tabela {{i+1}}: {{df.shape[0]}} linhas x {{df.shape[1]}} colunas")
 '''
+
+
+async def _close_on_shutdown(session):
+    try:
+        yield
+    finally:
+        await session.close()
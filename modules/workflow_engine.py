@@ -1,114 +1,778 @@
 """Motor de execução de workflows para o PyRPA."""
 
+import asyncio
+import heapq
+import itertools
+import os
+import queue
+import random
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 from datetime import datetime
 
+from modules.artifacts import ArtifactStore
+from modules.batch import WorkflowBatch
+from modules.profiling import StepProfiler
+from modules.streams import RecordStream
+from modules.step_handlers import (
+    Deadline,
+    DelayHandler,
+    EmailHandler,
+    FileTransferHandler,
+    HandlerRegistry,
+    RenameHandler,
+    ScriptHandler,
+    SimulatedHandler,
+    StepCancelled,
+    TableHandler,
+    WebHandler,
+    default_registry,
+    detach,
+    output_name,
+    use_deadline,
+)
+from modules.workflow_export import generate_workflow_script
+
 
 class WorkflowEngine:
 
-    def __init__(self, logger=None):
+    def __init__(
+        self,
+        logger=None,
+        max_workers: int = 4,
+        cache=None,
+        checkpoints=None,
+        handlers: HandlerRegistry | None = None,
+        default_timeout: float | None = None,
+        retry_backoff: float = 1.0,
+        max_backoff: float = 60.0,
+        profile: bool = False,
+        profile_dir: str | None = None,
+    ):
         self.logger = logger
+        self.max_workers = max_workers
+        self.cache = cache
+        self.checkpoints = checkpoints
+        self.handlers = handlers or default_registry()
+        self.default_timeout = default_timeout
+        self.retry_backoff = retry_backoff
+        self.max_backoff = max_backoff
+        self.profile = profile
+        self.profile_dir = profile_dir
 
-    def execute_workflow(self, workflow: dict) -> dict:
-        results = []
-        start = time.time()
+    def register_handler(self, step_type: str, handler):
+        """Registra um handler para um tipo de etapa customizado (nome exato)."""
+        self.handlers.register(step_type, handler)
+
+    def execute_workflow(
+        self,
+        workflow: dict,
+        force: bool = False,
+        run_id: str | None = None,
+        artifacts: ArtifactStore | None = None,
+        on_event=None,
+        profile: bool | None = None,
+    ) -> dict:
+        """Executa as etapas respeitando ``depends_on``.
+
+        Cada etapa pode declarar ``depends_on`` com a lista de ids das etapas
+        das quais depende; etapas sem a chave dependem da etapa anterior, o
+        que mantém o comportamento sequencial dos workflows existentes. Etapas
+        independentes rodam em paralelo num pool limitado a ``max_workers``.
+        Após o primeiro erro nenhuma etapa nova é iniciada.
+
+        Cada etapa pode definir ``timeout`` (segundos por tentativa) e
+        ``retry`` (novas tentativas, com backoff exponencial e jitter). Uma
+        etapa que estoura o prazo é cancelada e reportada como ``Timeout``
+        sem bloquear as demais.
+
+        Com ``cache`` configurado, etapas cujas entradas não mudaram são
+        puladas; ``force=True`` (ou ``"force"`` na etapa) ignora o cache.
+
+        Com ``checkpoints`` configurado, o progresso é gravado após cada
+        etapa e a execução pode ser retomada com ``resume(run_id)``.
+
+        Os dados produzidos pelas etapas ficam num ``ArtifactStore`` da
+        execução: cada etapa publica sob ``output`` (padrão: o próprio id) e
+        consome com ``input`` (nome ou lista de nomes). Passe ``artifacts``
+        para ler os resultados depois; caso contrário o store é descartado.
+
+        ``on_event`` recebe cada evento de ``iter_workflow`` à medida que
+        acontece (útil para barras de progresso e métricas).
+
+        Com ``profile`` (ou ``WorkflowEngine(profile=True)``), cada resultado
+        de etapa ganha ``profile`` com CPU, memória e E/S medidos por
+        ``StepProfiler``; se ``profile_dir`` estiver definido, o cProfile de
+        cada tentativa é gravado lá como ``<run_id>_<etapa>_<tentativa>.prof``.
+        """
+        events = self.iter_workflow(workflow, force, run_id, artifacts, profile)
+        return self._collect(workflow, events, {}, on_event)
+
+    def iter_workflow(
+        self,
+        workflow: dict,
+        force: bool = False,
+        run_id: str | None = None,
+        artifacts: ArtifactStore | None = None,
+        profile: bool | None = None,
+    ):
+        """Executa o workflow gerando eventos conforme as etapas avançam.
+
+        Cada evento é um dict com ``event`` e ``timestamp``:
+        ``workflow_started``, ``step_started``, ``step_finished``,
+        ``step_failed`` (com ``will_retry``) e ``workflow_finished``. Os
+        eventos de fim de etapa trazem ``duration_s`` e o ``result`` no
+        formato de ``steps_results``. Nada é acumulado entre eventos, então a
+        memória não cresce com o número de etapas.
+        """
+        deps = self._build_graph(workflow.get("steps", []))
+        run_id = self._start_run(workflow, run_id)
+        return self._events(workflow, deps, force, run_id, {}, artifacts, profile=profile)
 
+    def resume(self, run_id: str, force: bool = False, on_event=None) -> dict:
+        """Retoma uma execução gravada, pulando as etapas já concluídas."""
+        workflow, deps, completed, artifacts = self._prepare_resume(run_id)
+        events = self._events(workflow, deps, force, run_id, completed, artifacts, owns_artifacts=True)
+        return self._collect(workflow, events, completed, on_event)
+
+    def iter_resume(self, run_id: str, force: bool = False):
+        """Como ``resume``, mas gerando eventos como ``iter_workflow``."""
+        workflow, deps, completed, artifacts = self._prepare_resume(run_id)
+        return self._events(workflow, deps, force, run_id, completed, artifacts, owns_artifacts=True)
+
+    def _prepare_resume(self, run_id: str):
+        if self.checkpoints is None:
+            raise RuntimeError("Checkpoints não configurados no WorkflowEngine")
+        run = self.checkpoints.load_run(run_id)
+        workflow = run["workflow"]
+        deps = self._build_graph(workflow.get("steps", []))
+        completed = {
+            step_id: result
+            for step_id, result in run["steps"].items()
+            if result["status"] == "Sucesso" and step_id in deps
+        }
+        # Um canal não sobrevive à execução: a produtora roda de novo se a consumidora não terminou
+        for consumer, producer in self._stream_edges(workflow.get("steps", [])).items():
+            if consumer not in completed:
+                completed.pop(producer, None)
+        if self.logger:
+            self.logger.log(
+                f"Retomando execução {run_id}: {len(completed)} etapa(s) já concluída(s)", "INFO"
+            )
+        artifacts = ArtifactStore()
+        for name, value in self.checkpoints.load_artifacts(run_id).items():
+            artifacts.put(name, value)
+        return workflow, deps, completed, artifacts
+
+    def map_workflow(self, workflow: dict, inputs, workers: int = 8, placeholder: str = "item") -> WorkflowBatch:
+        """Executa o workflow uma vez por item de ``inputs``, ``workers`` itens por vez.
+
+        ``{item}`` nos parâmetros das etapas é substituído pelo item (e
+        ``{campo}`` pelos valores, se o item for dict). Itere o retorno para
+        receber os resultados conforme chegam; ``stats()`` traz a vazão.
+        """
+        return WorkflowBatch(self, workflow, inputs, workers, placeholder)
+
+    def generate_script(self, workflow: dict) -> str:
+        """Exporta o workflow como um script Python independente do Streamlit.
+
+        O script traz as dependências entre etapas, roda ramos independentes
+        em paralelo, importa apenas o que os tipos de etapa usados precisam e
+        reaproveita conexões HTTP/SMTP entre etapas. Etapas com handler
+        customizado (``register_handler``) não podem ser exportadas.
+        """
+        deps = self._build_graph(workflow.get("steps", []))
+        if self._stream_edges(workflow.get("steps", [])):
+            raise ValueError("Workflows com streaming entre etapas não podem ser exportados")
+        kinds = {}
         for step in workflow.get("steps", []):
-            step_start = time.time()
-            try:
-                result = self._execute_step(step)
-                step_duration = time.time() - step_start
-                results.append({
-                    "step_id": step["id"],
-                    "type": step["type"],
-                    "status": "Sucesso",
-                    "duration": f"{step_duration:.1f}s",
-                    "result": result,
-                })
+            handler = self.handlers.resolve(step.get("type", ""))
+            kind = _EXPORT_KINDS.get(type(handler))
+            if isinstance(handler, FileTransferHandler):
+                kind = "move" if handler.operation == "mover" else "copy"
+                if kind == "copy" and step.get("params", {}).get("sincronizar"):
+                    raise ValueError(
+                        f"Etapa {step['id']} ({step['type']}) usa sincronização incremental "
+                        "(manifesto e espelhamento), que não pode ser exportada"
+                    )
+            if kind is None:
+                raise ValueError(
+                    f"Etapa {step['id']} ({step['type']}) usa um handler sem suporte a exportação"
+                )
+            kinds[step["id"]] = kind
+        return generate_workflow_script(workflow, deps, kinds, self.max_workers)
+
+    def _collect(self, workflow: dict, events, completed: dict, on_event=None) -> dict:
+        results = dict(completed)
+        run_id = None
+        start = time.time()
+        for event in events:
+            if on_event is not None:
+                on_event(event)
+            kind = event["event"]
+            if kind in ("step_finished", "step_failed") and not event.get("will_retry"):
+                results[event["step_id"]] = event["result"]
+            elif kind == "workflow_finished":
+                run_id = event["run_id"]
+        summary = self._summarize(workflow, results, start)
+        if run_id is not None:
+            summary["run_id"] = run_id
+        return summary
+
+    def _events(
+        self,
+        workflow: dict,
+        deps: dict,
+        force: bool,
+        run_id,
+        completed: dict,
+        artifacts: ArtifactStore | None,
+        owns_artifacts: bool = False,
+        profile: bool | None = None,
+    ):
+        by_id = {step["id"]: step for step in workflow.get("steps", [])}
+        profile = self.profile if profile is None else profile
+        if artifacts is None:
+            artifacts, owns_artifacts = ArtifactStore(), True
+
+        streams = self._stream_edges(workflow.get("steps", []))
+        frontier = _Frontier(deps, set(completed), streams)
+        channels = {}
+        for producer in set(streams.values()) - set(completed):
+            step = by_id[producer]
+            channels[producer] = RecordStream(output_name(step), int(step.get("buffer") or 8))
+            artifacts.put(output_name(step), channels[producer])
+        failed = False
+        steps_done = len(completed)
+        start = time.time()
+
+        pool = ThreadPoolExecutor(max_workers=self.max_workers)
+        # Consumidoras de stream ficam fora do pool principal: se disputassem
+        # vaga com a produtora, um pool cheio travaria o canal
+        stream_pool = ThreadPoolExecutor(max_workers=len(streams), thread_name_prefix="pyrpa-stream") if streams else None
+        # Fila única de mensagens dos workers ("started"/"done"): mais barata
+        # que wait(FIRST_COMPLETED) por etapa
+        messages = queue.SimpleQueue()
+        running = {}  # chave -> [step_id, tentativa, prazo, início]
+        retries = []  # heap de (pronta_em, seq, step_id, tentativa)
+        seq = itertools.count()
+        abandoned = False
+
+        def submit(step_id, attempt):
+            key = next(seq)
+            step = by_id[step_id]
+            running[key] = [step_id, attempt, None, None]
+
+            def job():
+                # O prazo só começa a contar quando a etapa sai da fila do pool
+                deadline = Deadline(self._step_timeout(step))
+                messages.put(("started", key, deadline, time.time()))
+                profiler = self._profiler(run_id, step, attempt) if profile else None
+                return self._run_step(step, force, artifacts, deadline, profiler)
+
+            future = (stream_pool if step_id in streams else pool).submit(job)
+            future.add_done_callback(lambda f: messages.put(("done", key, f)))
+
+        def settle(step_id, attempt, started, result) -> dict:
+            nonlocal failed, steps_done
+            step = by_id[step_id]
+            ok = result["status"] == "Sucesso"
+            # Lotes já consumidos não voltam: etapas ligadas por stream não têm retry
+            streaming = step_id in channels or step_id in streams
+            will_retry = not ok and not streaming and attempt <= int(step.get("retry") or 0)
+            if not ok and step_id in channels:
+                channels[step_id].close(error=result.get("error", result["status"]))
+            if not ok and step_id in streams and streams[step_id] in channels:
+                channels[streams[step_id]].cancel()
+            if will_retry:
+                delay = self._backoff(step, attempt)
                 if self.logger:
                     self.logger.log(
-                        f"Etapa {step['id']} ({step['type']}) concluída em {step_duration:.1f}s",
-                        "INFO",
+                        f"Etapa {step_id}: tentativa {attempt} falhou, nova tentativa em {delay:.1f}s",
+                        "WARN",
                     )
-            except Exception as e:
-                step_duration = time.time() - step_start
-                results.append({
-                    "step_id": step["id"],
-                    "type": step["type"],
-                    "status": "Erro",
-                    "duration": f"{step_duration:.1f}s",
-                    "error": str(e),
-                })
-                if self.logger:
-                    self.logger.log(f"Erro na etapa {step['id']}: {e}", "ERROR")
+                heapq.heappush(retries, (time.monotonic() + delay, next(seq), step_id, attempt + 1))
+            else:
+                result["attempts"] = attempt
+                self._save_checkpoint(run_id, result, step, artifacts)
+                if ok:
+                    frontier.complete(step_id)
+                    steps_done += 1
+                else:
+                    failed = True
+            return {
+                "event": "step_finished" if ok else "step_failed",
+                "step_id": step_id,
+                "type": step["type"],
+                "attempt": attempt,
+                "status": result["status"],
+                "duration_s": time.time() - started,
+                "will_retry": will_retry,
+                "result": result,
+                "timestamp": time.time(),
+            }
+
+        try:
+            yield {
+                "event": "workflow_started",
+                "workflow": workflow.get("name", "Sem nome"),
+                "run_id": run_id,
+                "steps_total": len(deps),
+                "steps_done": steps_done,
+                "timestamp": start,
+            }
+            while True:
+                while not failed and retries and retries[0][0] <= time.monotonic():
+                    _, _, step_id, attempt = heapq.heappop(retries)
+                    submit(step_id, attempt)
+                while not failed and frontier.ready:
+                    submit(frontier.ready.popleft(), 1)
+                if not running and (failed or not retries):
+                    break
+
+                wake = [
+                    entry[2].expires_at
+                    for entry in running.values()
+                    if entry[2] is not None and entry[2].expires_at is not None
+                ]
+                if retries and not failed:
+                    wake.append(retries[0][0])
+                timeout = max(0.0, min(wake) - time.monotonic()) if wake else None
+                try:
+                    message = messages.get(timeout=timeout)
+                except queue.Empty:
+                    message = None
+
+                if message is not None and message[1] in running:
+                    kind, key = message[0], message[1]
+                    entry = running[key]
+                    if kind == "started":
+                        entry[2], entry[3] = message[2], message[3]
+                        frontier.start(entry[0])
+                        yield {
+                            "event": "step_started",
+                            "step_id": entry[0],
+                            "type": by_id[entry[0]]["type"],
+                            "attempt": entry[1],
+                            "timestamp": entry[3],
+                        }
+                    else:
+                        del running[key]
+                        yield settle(entry[0], entry[1], entry[3], message[2].result())
+                    continue
+
+                # Prazos vencidos: cancela e segue sem esperar a thread
+                now = time.monotonic()
+                for key, (step_id, attempt, deadline, started) in list(running.items()):
+                    if deadline is not None and deadline.expires_at is not None and deadline.expires_at <= now:
+                        deadline.cancel()
+                        del running[key]
+                        abandoned = True
+                        timed_out = self._step_timed_out(
+                            by_id[step_id], time.time() - started, deadline.timeout
+                        )
+                        yield settle(step_id, attempt, started, timed_out)
+        finally:
+            for channel in channels.values():
+                channel.cancel()
+            pool.shutdown(wait=not abandoned, cancel_futures=True)
+            if stream_pool is not None:
+                stream_pool.shutdown(wait=not abandoned, cancel_futures=True)
+            if owns_artifacts:
+                artifacts.close()
+
+        status = "Erro" if failed else "Sucesso"
+        if self.checkpoints is not None:
+            self.checkpoints.finish_run(run_id, status)
+        yield {
+            "event": "workflow_finished",
+            "workflow": workflow.get("name", "Sem nome"),
+            "run_id": run_id,
+            "status": status,
+            "steps_total": len(deps),
+            "steps_done": steps_done,
+            "duration_s": time.time() - start,
+            "timestamp": time.time(),
+        }
+
+    async def execute_workflow_async(
+        self,
+        workflow: dict,
+        force: bool = False,
+        run_id: str | None = None,
+        artifacts: ArtifactStore | None = None,
+    ) -> dict:
+        """Variante assíncrona de ``execute_workflow``.
+
+        Etapas com implementação nativa (delay, web) rodam no event loop; as
+        demais são despachadas para o executor padrão. Permite conduzir
+        muitos workflows concorrentes no mesmo processo.
+        """
+        steps = workflow.get("steps", [])
+        deps = self._build_graph(steps)
+        if self._stream_edges(steps):
+            raise ValueError("Streaming entre etapas é suportado apenas em execute_workflow")
+        by_id = {step["id"]: step for step in steps}
+        if self.checkpoints is not None:
+            run_id = await asyncio.to_thread(self._start_run, workflow, run_id)
+
+        owns_artifacts = artifacts is None
+        if owns_artifacts:
+            artifacts = ArtifactStore()
+
+        results = {}
+        start = time.time()
+        try:
+            await self._drive_async(deps, by_id, force, run_id, artifacts, results)
+        finally:
+            if owns_artifacts:
+                artifacts.close()
+
+        if self.checkpoints is not None:
+            return await asyncio.to_thread(self._finish_run, workflow, results, start, run_id)
+        return self._finish_run(workflow, results, start, run_id)
+
+    async def _drive_async(self, deps, by_id, force, run_id, artifacts, results):
+        frontier = _Frontier(deps, set())
+        failed = False
+        running = {}
+        while True:
+            while not failed and frontier.ready:
+                step_id = frontier.ready.popleft()
+                task = asyncio.create_task(self._run_step_async(by_id[step_id], force, artifacts))
+                running[task] = step_id
+            if not running:
                 break
 
+            finished, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in finished:
+                step_id = running.pop(task)
+                result = task.result()
+                results[step_id] = result
+                if self.checkpoints is not None:
+                    await asyncio.to_thread(
+                        self._save_checkpoint, run_id, result, by_id[step_id], artifacts
+                    )
+                if result["status"] == "Sucesso":
+                    frontier.complete(step_id)
+                else:
+                    failed = True
+
+    def _start_run(self, workflow: dict, run_id: str | None):
+        if self.checkpoints is None:
+            return run_id
+        return self.checkpoints.start_run(workflow, run_id)
+
+    def _save_checkpoint(self, run_id, step_result: dict, step: dict, artifacts: ArtifactStore):
+        if self.checkpoints is None:
+            return
+        self.checkpoints.save_step(run_id, step_result)
+        name = output_name(step)
+        if step_result["status"] == "Sucesso" and name in artifacts:
+            value = artifacts.get(name)
+            if not isinstance(value, RecordStream):
+                self.checkpoints.save_artifact(run_id, name, detach(value))
+
+    def _finish_run(self, workflow: dict, results: dict, start: float, run_id) -> dict:
+        summary = self._summarize(workflow, results, start)
+        if self.checkpoints is not None:
+            self.checkpoints.finish_run(run_id, summary["status"])
+        if run_id is not None:
+            summary["run_id"] = run_id
+        return summary
+
+    @staticmethod
+    def _summarize(workflow: dict, results: dict, start: float) -> dict:
+        order = {step["id"]: i for i, step in enumerate(workflow.get("steps", []))}
         total_duration = time.time() - start
-        all_ok = all(r["status"] == "Sucesso" for r in results)
+        steps_results = sorted(results.values(), key=lambda r: order[r["step_id"]])
+        all_ok = all(r["status"] == "Sucesso" for r in steps_results)
 
         return {
             "workflow": workflow.get("name", "Sem nome"),
             "status": "Sucesso" if all_ok else "Erro",
             "duration": f"{total_duration:.1f}s",
-            "steps_results": results,
+            "steps_results": steps_results,
             "executed_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
         }
 
-    def _execute_step(self, step: dict) -> str:
-        step_type = step.get("type", "")
-        params = step.get("params", {})
-
-        if "Aguardar" in step_type:
-            seconds = int(params.get("segundos", 5))
-            time.sleep(min(seconds, 10))  # Limitar a 10s no app
-            return f"Aguardou {seconds}s"
-
-        if "Copiar" in step_type or "Mover" in step_type:
-            from modules.file_ops import FileOperations
-            fops = FileOperations()
-            op = "copiar" if "Copiar" in step_type else "mover"
-            result = fops.copy_or_move(
-                params.get("origem", ""),
-                params.get("destino", ""),
-                params.get("filtro") or None,
-                op,
-            )
-            if result["status"] == "Erro":
-                raise RuntimeError(result["message"])
-            return result["message"]
-
-        if "Renomear" in step_type:
-            from modules.file_ops import FileOperations
-            fops = FileOperations()
-            result = fops.batch_rename(
-                params.get("origem", ""),
-                params.get("prefixo", ""),
-                params.get("add_date", False),
-                params.get("add_seq", True),
-            )
-            if result["status"] == "Erro":
-                raise RuntimeError(result["message"])
-            return result["message"]
-
-        if "Web" in step_type:
-            from modules.web_scraper import WebScraperBot
-            scraper = WebScraperBot()
-            result = scraper.extract_content(
-                params.get("url", ""),
-                params.get("seletor") or None,
+    @staticmethod
+    def _build_graph(steps: list) -> dict:
+        """Retorna ``{step_id: set(dependências)}`` validando ids e ciclos."""
+        deps = {}
+        previous = None
+        for step in steps:
+            if step["id"] in deps:
+                raise ValueError(f"Id de etapa duplicado: {step['id']}")
+            if "depends_on" in step:
+                deps[step["id"]] = set(step["depends_on"] or [])
+            else:
+                deps[step["id"]] = {previous} if previous is not None else set()
+            previous = step["id"]
+
+        for step_id, step_deps in deps.items():
+            unknown = [dep for dep in step_deps if dep not in deps]
+            if unknown:
+                raise ValueError(f"Etapa {step_id} depende de etapa inexistente: {sorted(unknown)}")
+
+        streams = WorkflowEngine._stream_edges(steps)
+        for consumer, producer in streams.items():
+            deps[consumer].add(producer)
+        idle = [s["id"] for s in steps if s.get("stream") and s["id"] not in streams.values()]
+        if idle:
+            raise ValueError(f"Etapa(s) em streaming sem consumidora: {idle}")
+
+        # Kahn: se sobrar etapa sem grau zero, há ciclo
+        frontier = _Frontier(deps, set())
+        while frontier.ready:
+            frontier.complete(frontier.ready.popleft())
+        cyclic = [step_id for step_id, n in frontier.waiting.items() if n]
+        if cyclic:
+            raise ValueError(f"Ciclo de dependências entre as etapas: {sorted(cyclic, key=str)}")
+
+        return deps
+
+    @staticmethod
+    def _stream_edges(steps: list) -> dict:
+        """``{consumidora: produtora}`` para entradas ligadas a etapas com ``"stream": True``.
+
+        A consumidora depende da produtora, mas é liberada assim que ela
+        começa a rodar, lendo os lotes do ``RecordStream`` conforme chegam.
+        """
+        producers = {output_name(step): step["id"] for step in steps if step.get("stream")}
+        if not producers:
+            return {}
+        edges = {}
+        for step in steps:
+            names = step.get("input")
+            if names is None or names == "":
+                continue
+            for name in names if isinstance(names, (list, tuple)) else [names]:
+                if str(name) in producers:
+                    edges[step["id"]] = producers[str(name)]
+        return edges
+
+    def _step_timeout(self, step: dict) -> float | None:
+        timeout = step.get("timeout") or self.default_timeout
+        return float(timeout) if timeout else None
+
+    def _backoff(self, step: dict, attempt: int) -> float:
+        """Backoff exponencial com jitter completo para a próxima tentativa."""
+        base = float(step.get("backoff", self.retry_backoff))
+        return random.uniform(0, min(self.max_backoff, base * 2 ** (attempt - 1)))
+
+    def _profiler(self, run_id, step: dict, attempt: int) -> StepProfiler:
+        dump_path = None
+        if self.profile_dir:
+            name = f"{run_id or 'run'}_{step['id']}_{attempt}.prof"
+            dump_path = os.path.join(self.profile_dir, name)
+        return StepProfiler(dump_path)
+
+    def _run_step(
+        self,
+        step: dict,
+        force: bool = False,
+        artifacts: ArtifactStore | None = None,
+        deadline: Deadline | None = None,
+        profiler: StepProfiler | None = None,
+    ) -> dict:
+        with profiler or nullcontext():
+            step_result = self._run_step_measured(step, force, artifacts, deadline)
+        if profiler is not None:
+            step_result["profile"] = profiler.stats
+        return step_result
+
+    def _run_step_measured(
+        self, step: dict, force: bool, artifacts: ArtifactStore | None, deadline: Deadline | None
+    ) -> dict:
+        step_start = time.time()
+        # A consulta ao cache (HEAD da URL, varredura de pastas) também conta no prazo da etapa
+        with use_deadline(deadline or Deadline()):
+            hit, cached = self._cache_lookup(step, force, artifacts)
+            if hit:
+                return self._step_cached(step, time.time() - step_start, cached)
+            try:
+                result = self._execute_step(step, artifacts)
+            except Exception as e:
+                return self._step_failed(step, time.time() - step_start, e)
+            self._cache_store(step, result, artifacts)
+        return self._step_succeeded(step, time.time() - step_start, result)
+
+    async def _run_step_async(
+        self, step: dict, force: bool = False, artifacts: ArtifactStore | None = None
+    ) -> dict:
+        retry = int(step.get("retry") or 0)
+        for attempt in range(1, retry + 2):
+            result = await self._attempt_step_async(step, force, artifacts)
+            if result["status"] == "Sucesso" or attempt > retry:
+                break
+            delay = self._backoff(step, attempt)
+            if self.logger:
+                self.logger.log(
+                    f"Etapa {step['id']}: tentativa {attempt} falhou, nova tentativa em {delay:.1f}s",
+                    "WARN",
+                )
+            await asyncio.sleep(delay)
+        result["attempts"] = attempt
+        return result
+
+    async def _attempt_step_async(self, step: dict, force: bool, artifacts: ArtifactStore | None) -> dict:
+        timeout = self._step_timeout(step)
+        deadline = Deadline(timeout)
+        step_start = time.time()
+        with use_deadline(deadline):
+            try:
+                return await asyncio.wait_for(
+                    self._run_step_once_async(step, force, artifacts), timeout
+                )
+            except (asyncio.TimeoutError, StepCancelled):
+                # O handler pode esgotar o prazo cooperativo antes do wait_for: também é Timeout
+                deadline.cancel()
+                return self._step_timed_out(step, time.time() - step_start, timeout)
+
+    async def _run_step_once_async(
+        self, step: dict, force: bool, artifacts: ArtifactStore | None
+    ) -> dict:
+        step_start = time.time()
+        if self.cache is not None:
+            hit, cached = await asyncio.to_thread(self._cache_lookup, step, force, artifacts)
+            if hit:
+                return self._step_cached(step, time.time() - step_start, cached)
+        try:
+            result = await self._execute_step_async(step, artifacts)
+        except StepCancelled:
+            raise
+        except Exception as e:
+            return self._step_failed(step, time.time() - step_start, e)
+        if self.cache is not None:
+            await asyncio.to_thread(self._cache_store, step, result, artifacts)
+        return self._step_succeeded(step, time.time() - step_start, result)
+
+    def _cache_lookup(self, step: dict, force: bool, artifacts: ArtifactStore | None):
+        if self.cache is None or force or step.get("force") or step.get("stream"):
+            return False, None
+        key = self.cache.key_for(step, self.handlers.resolve(step.get("type", "")))
+        if key is None:
+            return False, None
+        hit, entry = self.cache.get(key)
+        if not hit:
+            return False, None
+        if entry["artifact"] is not None and artifacts is not None:
+            artifacts.put(output_name(step), entry["artifact"])
+        return True, entry["result"]
+
+    def _cache_store(self, step: dict, result, artifacts: ArtifactStore | None):
+        # A chave é recalculada após a execução: o estado resultante (ex.:
+        # arquivos já copiados no destino) é o que uma nova execução verá.
+        if self.cache is None:
+            return
+        key = self.cache.key_for(step, self.handlers.resolve(step.get("type", "")))
+        if key is None:
+            return
+        name = output_name(step)
+        artifact = None
+        if artifacts is not None and name in artifacts:
+            artifact = detach(artifacts.get(name))
+        self.cache.put(key, {"result": result, "artifact": artifact})
+
+    def _step_cached(self, step: dict, step_duration: float, result) -> dict:
+        if self.logger:
+            self.logger.log(f"Etapa {step['id']} ({step['type']}) sem alterações — resultado em cache", "INFO")
+        step_result = self._step_succeeded(step, step_duration, result, log=False)
+        step_result["cached"] = True
+        return step_result
+
+    def _step_succeeded(self, step: dict, step_duration: float, result, log: bool = True) -> dict:
+        if self.logger and log:
+            self.logger.log(
+                f"Etapa {step['id']} ({step['type']}) concluída em {step_duration:.1f}s",
+                "INFO",
             )
-            if result["status"] == "Erro":
-                raise RuntimeError(result["message"])
-            return f"Extraído {len(result['data'])} caracteres"
-
-        if "Script" in step_type:
-            code = params.get("codigo", "")
-            if code:
-                exec_globals = {}
-                exec(code, exec_globals)
-                return "Script executado"
-            return "Script vazio"
-
-        # Simulação para outros tipos
-        time.sleep(0.3)
-        return f"Etapa '{step_type}' executada (simulação)"
+        return {
+            "step_id": step["id"],
+            "type": step["type"],
+            "status": "Sucesso",
+            "duration": f"{step_duration:.1f}s",
+            "result": result,
+        }
+
+    def _step_timed_out(self, step: dict, step_duration: float, timeout: float) -> dict:
+        if self.logger:
+            self.logger.log(f"Etapa {step['id']} excedeu o tempo limite de {timeout:g}s", "ERROR")
+        return {
+            "step_id": step["id"],
+            "type": step["type"],
+            "status": "Timeout",
+            "duration": f"{step_duration:.1f}s",
+            "error": f"Tempo limite de {timeout:g}s excedido",
+        }
+
+    def _step_failed(self, step: dict, step_duration: float, error: Exception) -> dict:
+        if self.logger:
+            self.logger.log(f"Erro na etapa {step['id']}: {error}", "ERROR")
+        return {
+            "step_id": step["id"],
+            "type": step["type"],
+            "status": "Erro",
+            "duration": f"{step_duration:.1f}s",
+            "error": str(error),
+        }
+
+    async def _execute_step_async(self, step: dict, artifacts: ArtifactStore | None = None) -> str:
+        handler = self.handlers.resolve(step.get("type", ""))
+        return await handler.run_async(step, artifacts)
+
+    def _execute_step(self, step: dict, artifacts: ArtifactStore | None = None) -> str:
+        handler = self.handlers.resolve(step.get("type", ""))
+        if step.get("stream"):
+            return handler.produce(step, artifacts)
+        return handler.run(step, artifacts)
+
+
+_EXPORT_KINDS = {
+    SimulatedHandler: "simulated",
+    DelayHandler: "delay",
+    RenameHandler: "rename",
+    WebHandler: "web",
+    TableHandler: "table",
+    EmailHandler: "email",
+    ScriptHandler: "script",
+}
+
+
+class _Frontier:
+    """Etapas prontas para rodar, atualizadas em O(dependentes) a cada conclusão."""
+
+    def __init__(self, deps: dict, done: set, streams: dict | None = None):
+        streams = streams or {}
+        self.waiting = {
+            step_id: len(step_deps - done)
+            for step_id, step_deps in deps.items()
+            if step_id not in done
+        }
+        self.dependents: dict = {step_id: [] for step_id in deps}
+        # Consumidoras de stream são liberadas quando a produtora começa (start)
+        self.stream_dependents: dict = {}
+        for step_id, step_deps in deps.items():
+            for dep in step_deps:
+                if streams.get(step_id) == dep:
+                    self.stream_dependents.setdefault(dep, []).append(step_id)
+                else:
+                    self.dependents[dep].append(step_id)
+        self.ready = deque(step_id for step_id, n in self.waiting.items() if n == 0)
+
+    def start(self, step_id):
+        for child in self.stream_dependents.pop(step_id, ()):
+            self._release(child)
+
+    def complete(self, step_id):
+        for child in self.dependents[step_id]:
+            self._release(child)
+
+    def _release(self, child):
+        if child in self.waiting:
+            self.waiting[child] -= 1
+            if self.waiting[child] == 0:
+                self.ready.append(child)
@@ -0,0 +1,438 @@
+"""Exportação de workflows como scripts Python independentes para o PyRPA."""
+
+import pprint
+from datetime import datetime
+
+# Por tipo de etapa: imports, dependências pip e a função que a executa no script
+KIND_IMPORTS = {
+    "delay": [],
+    "copy": ["import fnmatch", "import shutil", "from pathlib import Path"],
+    "move": ["import fnmatch", "import shutil", "from pathlib import Path"],
+    "rename": ["from datetime import datetime", "from pathlib import Path"],
+    "web": ["import io", "import requests", "from requests.adapters import HTTPAdapter", "from bs4 import BeautifulSoup"],
+    "table": ["from glob import glob", "import pandas as pd"],
+    "email": [
+        "import smtplib",
+        "from email import encoders",
+        "from email.mime.base import MIMEBase",
+        "from email.mime.multipart import MIMEMultipart",
+        "from email.mime.text import MIMEText",
+    ],
+    "script": [],
+    "simulated": [],
+}
+
+KIND_PACKAGES = {
+    "web": ["requests", "beautifulsoup4"],
+    "table": ["pandas", "openpyxl"],
+}
+
+KIND_CODE = {
+    "delay": '''
+def run_delay(step):
+    seconds = int(step["params"].get("segundos", 5))
+    time.sleep(seconds)
+    return f"Aguardou {seconds}s"
+''',
+    "copy": '''
+def run_copy(step, move=False):
+    params = step["params"]
+    src, dst = Path(params.get("origem", "")), Path(params.get("destino", ""))
+    if not src.exists():
+        raise RuntimeError(f"Pasta de origem não encontrada: {src}")
+    dst.mkdir(parents=True, exist_ok=True)
+    pattern = f"*{params.get('filtro') or ''}"
+    excluded = [p.strip() for p in (params.get("excluir") or "").split(",") if p.strip()]
+    jobs = []
+    for f in (src.rglob(pattern) if params.get("recursivo") else src.glob(pattern)):
+        rel = f.relative_to(src)
+        if not f.is_file() or dst in f.parents:
+            continue
+        if any(fnmatch.fnmatch(part, p) for part in rel.parts for p in excluded):
+            continue
+        jobs.append((f, dst / rel))
+
+    def transfer(job):
+        f, target = job
+        target.parent.mkdir(parents=True, exist_ok=True)
+        if move:
+            shutil.move(str(f), str(target))
+        else:
+            shutil.copy2(f, target)
+
+    # Até ``paralelismo`` arquivos ao mesmo tempo, como no PyRPA
+    with ThreadPoolExecutor(max_workers=int(params.get("paralelismo") or 8)) as pool:
+        count = sum(1 for _ in pool.map(transfer, jobs))
+    return f"{count} arquivo(s) {'movido(s)' if move else 'copiado(s)'} para {dst}"
+''',
+    "move": '''
+def run_move(step):
+    return run_copy(step, move=True)
+''',
+    "rename": '''
+def run_rename(step):
+    params = step["params"]
+    folder = Path(params.get("origem", ""))
+    if not folder.exists():
+        raise RuntimeError(f"Pasta não encontrada: {folder}")
+    files = sorted(f for f in folder.iterdir() if f.is_file())
+    for i, f in enumerate(files, 1):
+        new_name = params.get("prefixo", "")
+        if params.get("add_date", False):
+            new_name += datetime.now().strftime("%Y%m%d_")
+        if params.get("add_seq", True):
+            new_name += f"{i:03d}"
+        f.rename(folder / (new_name + f.suffix))
+    return f"{len(files)} arquivo(s) renomeado(s)."
+''',
+    "web": '''
+# Sessão HTTP única: conexões keep-alive reaproveitadas entre as etapas
+SESSION = requests.Session()
+SESSION.headers["User-Agent"] = "PyRPA Bot/1.0"
+SESSION.mount("http://", HTTPAdapter(pool_connections=16, pool_maxsize=MAX_WORKERS * 2))
+SESSION.mount("https://", HTTPAdapter(pool_connections=16, pool_maxsize=MAX_WORKERS * 2))
+
+
+def run_web(step):
+    params = step["params"]
+    resp = SESSION.get(params.get("url", ""), timeout=step.get("timeout") or 30)
+    resp.raise_for_status()
+    if params.get("tabelas"):
+        import pandas as pd
+        try:
+            tables = pd.read_html(io.StringIO(resp.text))
+        except ValueError:
+            tables = []
+        if tables:
+            publish(step, tables[0] if len(tables) == 1 else tables)
+        return f"Extraída(s) {len(tables)} tabela(s)"
+    soup = BeautifulSoup(resp.text, "html.parser")
+    if params.get("seletor"):
+        text = "\\n\\n".join(el.get_text(strip=True) for el in soup.select(params["seletor"]))
+    else:
+        for tag in soup(["script", "style", "nav", "footer", "header"]):
+            tag.decompose()
+        text = soup.get_text(separator="\\n", strip=True)
+    publish(step, text)
+    return f"Extraído {len(text)} caracteres"
+''',
+    "table": '''
+def apply_transforms(df, transforms):
+    if "Remover duplicatas" in transforms:
+        df = df.drop_duplicates()
+    if "Preencher vazios" in transforms:
+        for col in df.select_dtypes(include=["number"]).columns:
+            df[col] = df[col].fillna(0)
+        for col in df.select_dtypes(include=["object"]).columns:
+            df[col] = df[col].fillna("")
+    if "Converter tipos" in transforms:
+        for col in df.columns:
+            try:
+                df[col] = pd.to_numeric(df[col])
+            except (ValueError, TypeError):
+                pass
+    if "Filtrar linhas" in transforms:
+        df = df.dropna(how="all")
+    if "Remover colunas vazias" in transforms:
+        df = df.dropna(axis=1, how="all")
+    return df
+
+
+def run_table(step):
+    params = step["params"]
+    if not (params.get("arquivo") or step.get("input")):
+        return run_simulated(step)
+    frames = []
+    for value in inputs(step):
+        frames.extend(value if isinstance(value, (list, tuple)) else [value])
+    if params.get("arquivo"):
+        for path in sorted(glob(params["arquivo"])) or [params["arquivo"]]:
+            frames.append(pd.read_csv(path) if path.lower().endswith(".csv") else pd.read_excel(path))
+    df = frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+    if params.get("transformacoes"):
+        df = apply_transforms(df.copy(), params["transformacoes"])
+    publish(step, df)
+    return f"{df.shape[0]} linhas x {df.shape[1]} colunas"
+''',
+    "email": '''
+# Conexões SMTP autenticadas reaproveitadas entre as etapas de e-mail
+_smtp_idle = {}
+_smtp_lock = threading.Lock()
+
+
+def _smtp_send(host, port, user, password, recipients, message, timeout=30):
+    key = (host, port, user)
+    while True:
+        with _smtp_lock:
+            idle = _smtp_idle.get(key)
+            server = idle.pop() if idle else None
+        reused = server is not None
+        if not reused:
+            server = smtplib.SMTP(host, port, timeout=timeout)
+        try:
+            if reused:
+                server.sock.settimeout(timeout)
+            else:
+                server.starttls()
+                server.login(user, password)
+            server.sendmail(user, recipients, message)
+        except smtplib.SMTPServerDisconnected:
+            server.close()
+            if reused:
+                continue  # conexão ociosa encerrada pelo servidor: tenta a próxima ou uma nova
+            raise
+        except BaseException:
+            # Sessão em estado incerto: fecha em vez de devolver ao cache
+            server.close()
+            raise
+        with _smtp_lock:
+            _smtp_idle.setdefault(key, []).append(server)
+        return
+
+
+def close_smtp():
+    with _smtp_lock:
+        servers = [server for idle in _smtp_idle.values() for server in idle]
+        _smtp_idle.clear()
+    for server in servers:
+        try:
+            server.quit()
+        except (smtplib.SMTPException, OSError):
+            server.close()
+
+
+def run_email(step):
+    params = step["params"]
+    if not params.get("smtp_host"):
+        return run_simulated(step)
+    recipients = [r.strip() for r in params.get("destinatario", "").split(",") if r.strip()]
+    msg = MIMEMultipart()
+    msg["From"] = params.get("smtp_user", "")
+    msg["To"] = ", ".join(recipients)
+    msg["Subject"] = params.get("assunto", "")
+    msg.attach(MIMEText(params.get("corpo", ""), "plain", "utf-8"))
+    values = inputs(step)
+    if values:
+        value, name = values[0], params.get("anexo_nome") or "dados"
+        if hasattr(value, "to_csv"):
+            data, suffix = value.to_csv(index=False).encode("utf-8"), ".csv"
+        elif isinstance(value, str):
+            data, suffix = value.encode("utf-8"), ".txt"
+        else:
+            data, suffix = bytes(value), ".bin"
+        part = MIMEBase("application", "octet-stream")
+        part.set_payload(data)
+        encoders.encode_base64(part)
+        filename = name if "." in name else name + suffix
+        part.add_header("Content-Disposition", f"attachment; filename={filename}")
+        msg.attach(part)
+    _smtp_send(
+        params["smtp_host"], int(params.get("smtp_port", 587)), params.get("smtp_user", ""),
+        params.get("smtp_senha", ""), recipients, msg.as_string(), timeout=step.get("timeout") or 30,
+    )
+    return f"E-mail enviado para {', '.join(recipients)}"
+''',
+    "script": '''
+# Código das etapas de script compilado uma única vez, na carga do módulo
+COMPILED = {
+    step["id"]: compile(step["params"].get("codigo", ""), f"<etapa {step['id']}>", "exec")
+    for step in STEPS
+    if step["kind"] == "script"
+}
+
+
+def run_script(step):
+    values = inputs(step)
+    exec_globals = {"artifacts": ARTIFACTS, "entrada": values[0] if len(values) == 1 else values}
+    exec(COMPILED[step["id"]], exec_globals)
+    if "resultado" in exec_globals:
+        publish(step, exec_globals["resultado"])
+    return "Script executado"
+''',
+    "simulated": '''
+def run_simulated(step):
+    return f"Etapa '{step['type']}' executada (simulação)"
+''',
+}
+
+RUNTIME = '''
+ARTIFACTS = {}
+
+
+def publish(step, value):
+    ARTIFACTS[str(step.get("output") or step["id"])] = value
+
+
+def inputs(step):
+    names = step.get("input")
+    if names is None or names == "":
+        return []
+    if not isinstance(names, (list, tuple)):
+        names = [names]
+    return [ARTIFACTS[str(name)] for name in names]
+
+
+# Prazo (time.monotonic) da tentativa em andamento de cada etapa com timeout
+DEADLINES = {}
+
+
+def run_step(step):
+    """Executa a etapa com retry e backoff exponencial com jitter.
+
+    Como no engine, ``timeout`` vale para cada tentativa: o prazo é
+    renovado no início de cada uma e não corre durante o backoff.
+    """
+    retry = int(step.get("retry") or 0)
+    for attempt in range(1, retry + 2):
+        if step.get("timeout"):
+            DEADLINES[step["id"]] = time.monotonic() + step["timeout"]
+        try:
+            return RUNNERS[step["kind"]](step)
+        except Exception as e:
+            DEADLINES.pop(step["id"], None)
+            if attempt > retry:
+                raise
+            delay = random.uniform(0, min(60.0, float(step.get("backoff", 1.0)) * 2 ** (attempt - 1)))
+            print(f"[{step['id']}] tentativa {attempt} falhou ({e}); nova tentativa em {delay:.1f}s")
+            time.sleep(delay)
+
+
+def main() -> int:
+    by_id = {step["id"]: step for step in STEPS}
+    waiting = {step["id"]: len(step["depends_on"]) for step in STEPS}
+    dependents = {step["id"]: [] for step in STEPS}
+    for step in STEPS:
+        for dep in step["depends_on"]:
+            dependents[dep].append(step["id"])
+    ready = deque(step_id for step_id, count in waiting.items() if count == 0)
+
+    start = time.time()
+    failed = timed_out = False
+    pool = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+    running = {}  # future -> (step_id, início)
+    while ready or running:
+        while ready and not failed:
+            step = by_id[ready.popleft()]
+            running[pool.submit(run_step, step)] = (step["id"], time.monotonic())
+        if not running:
+            break
+        timed = [step_id for step_id, _ in running.values() if by_id[step_id].get("timeout")]
+        # Etapa com timeout ainda na fila ou em backoff: acorda logo para ver o prazo da próxima tentativa
+        waits = [max(0.0, DEADLINES[s] - time.monotonic()) if s in DEADLINES else 0.1 for s in timed]
+        done, _ = wait(running, timeout=min(waits) if waits else None, return_when=FIRST_COMPLETED)
+
+        for future in done:
+            step_id, started = running.pop(future)
+            step = by_id[step_id]
+            elapsed = time.monotonic() - started
+            try:
+                message = future.result()
+            except Exception as e:
+                failed = True
+                print(f"[{step_id}] {step['type']}: Erro → {e} ({elapsed:.1f}s)")
+                continue
+            print(f"[{step_id}] {step['type']}: Sucesso → {message} ({elapsed:.1f}s)")
+            for dependent in dependents[step_id]:
+                waiting[dependent] -= 1
+                if waiting[dependent] == 0:
+                    ready.append(dependent)
+
+        now = time.monotonic()
+        for future, (step_id, _) in list(running.items()):
+            deadline = DEADLINES.get(step_id)
+            if deadline is not None and deadline <= now:
+                del running[future]
+                failed = timed_out = True
+                print(f"[{step_id}] {by_id[step_id]['type']}: Timeout → tempo limite de {by_id[step_id]['timeout']:g}s excedido")
+
+    pool.shutdown(wait=not timed_out, cancel_futures=True)
+    # CLEANUP
+    status = "Erro" if failed else "Sucesso"
+    print(f"Workflow '{WORKFLOW}': {status} em {time.time() - start:.1f}s")
+    if timed_out:
+        # Etapas que estouraram o prazo ainda ocupam threads: encerra sem esperá-las
+        sys.stdout.flush()
+        os._exit(1)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
+'''
+
+
+def generate_workflow_script(workflow: dict, deps: dict, kinds: dict, max_workers: int = 4) -> str:
+    """Monta o script de um workflow já validado.
+
+    ``deps`` é o grafo de ``WorkflowEngine._build_graph`` e ``kinds`` mapeia
+    cada etapa para uma chave de ``KIND_CODE``. Só entram no script os
+    imports e funções dos tipos de etapa usados.
+    """
+    used = set(kinds.values())
+    if "move" in used:
+        used.add("copy")
+    if used & {"table", "email"}:
+        used.add("simulated")
+
+    steps = []
+    for step in workflow.get("steps", []):
+        exported = {
+            "id": step["id"],
+            "type": step["type"],
+            "kind": kinds[step["id"]],
+            "params": step.get("params", {}),
+            "depends_on": list(deps[step["id"]]),
+        }
+        for key in ("retry", "backoff", "timeout", "input", "output"):
+            if step.get(key) not in (None, "", [], 0):
+                exported[key] = step[key]
+        steps.append(exported)
+
+    imports = {"import os", "import random", "import sys", "import time"}
+    imports.update(
+        {"from collections import deque", "from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait"}
+    )
+    if "email" in used:
+        imports.add("import threading")
+    for kind in used:
+        imports.update(KIND_IMPORTS[kind])
+    plain = sorted(i for i in imports if i.startswith("import "))
+    froms = sorted(i for i in imports if i.startswith("from "))
+
+    packages = sorted({p for kind in used for p in KIND_PACKAGES.get(kind, [])})
+    name = workflow.get("name", "Sem nome")
+    header = [
+        '"""',
+        f'Workflow "{name}" exportado pelo PyRPA em {datetime.now().strftime("%Y-%m-%d %H:%M")}.',
+    ]
+    if packages:
+        header.append(f"Dependências: pip install {' '.join(packages)}")
+    header += ["Execução: python este_arquivo.py (código de saída 1 se alguma etapa falhar)", '"""']
+
+    order = ["simulated", "delay", "copy", "move", "rename", "web", "table", "email", "script"]
+    functions = "".join(KIND_CODE[kind] for kind in order if kind in used)
+    runners = ",\n".join(
+        f'    "{kind}": run_{kind}' for kind in order if kind in set(kinds.values())
+    )
+    runtime, main = RUNTIME.split("\n\ndef run_step")
+    main = "\ndef run_step" + main.replace(
+        "    # CLEANUP\n", "    close_smtp()\n" if "email" in used else ""
+    )
+
+    return "\n".join(
+        [
+            *header,
+            *plain,
+            *froms,
+            "",
+            f"WORKFLOW = {name!r}",
+            f"MAX_WORKERS = {max_workers}",
+            "",
+            f"STEPS = {pprint.pformat(steps, width=100, sort_dicts=False)}",
+            "",
+            runtime,
+            functions,
+            f"\nRUNNERS = {{\n{runners},\n}}\n",
+            main,
+        ]
+    )
@@ -0,0 +1,130 @@
+"""Testes das expressões cron (campos especiais L, W, # e casos de borda)."""
+
+from datetime import datetime
+
+import pytest
+
+from modules.cron import CronExpression, fire_calendar
+
+
+def fire(expr: str, after: datetime) -> datetime | None:
+    return CronExpression(expr).next_fire(after)
+
+
+# ── Último dia e dia útil ────────────────────────────────────
+
+
+@pytest.mark.parametrize("after, expected", [
+    (datetime(2024, 2, 10), datetime(2024, 2, 29)),  # bissexto
+    (datetime(2023, 2, 10), datetime(2023, 2, 28)),
+    (datetime(2024, 4, 30, 0, 0), datetime(2024, 5, 31)),  # o próprio disparo não conta
+])
+def test_last_day_of_month(after, expected):
+    assert fire("0 0 L * *", after) == expected
+
+
+def test_last_weekday_of_month_moves_back_from_weekend():
+    # 31/08/2024 é sábado
+    assert fire("0 0 LW * *", datetime(2024, 8, 1)) == datetime(2024, 8, 30)
+
+
+@pytest.mark.parametrize("expr, after, expected", [
+    ("0 0 15W * *", datetime(2024, 6, 1), datetime(2024, 6, 14)),  # sábado → sexta
+    ("0 0 15W * *", datetime(2024, 9, 1), datetime(2024, 9, 16)),  # domingo → segunda
+    ("0 0 1W * *", datetime(2024, 5, 31), datetime(2024, 6, 3)),  # sábado dia 1: não volta ao mês anterior
+    ("0 0 31W * *", datetime(2024, 3, 1), datetime(2024, 3, 29)),  # domingo dia 31: não avança de mês
+    ("0 0 31W * *", datetime(2024, 4, 1), datetime(2024, 5, 31)),  # abril não tem dia 31
+])
+def test_nearest_weekday(expr, after, expected):
+    assert fire(expr, after) == expected
+
+
+# ── Dia da semana: última ocorrência e n-ésima ───────────────
+
+
+def test_last_friday_of_month():
+    assert fire("0 0 * * 5L", datetime(2024, 2, 1)) == datetime(2024, 2, 23)
+    assert fire("0 0 * * FRIL", datetime(2024, 2, 1)) == datetime(2024, 2, 23)
+
+
+def test_nth_weekday():
+    assert fire("0 0 * * 1#2", datetime(2024, 1, 1)) == datetime(2024, 1, 8)
+    assert fire("0 0 * * MON#2", datetime(2024, 1, 1)) == datetime(2024, 1, 8)
+
+
+def test_fifth_weekday_skips_months_without_one():
+    assert fire("0 0 * * 1#5", datetime(2024, 1, 1)) == datetime(2024, 1, 29)
+    # Fevereiro e março de 2024 têm só 4 segundas-feiras
+    assert fire("0 0 * * 1#5", datetime(2024, 1, 30)) == datetime(2024, 4, 29)
+
+
+# ── Semântica dos campos ─────────────────────────────────────
+
+
+def test_day_of_month_or_day_of_week_when_both_restricted():
+    fires = CronExpression("0 0 13 * 5").next_fires(4, datetime(2024, 1, 1))
+    assert fires == [datetime(2024, 1, d) for d in (5, 12, 13, 19)]
+
+
+def test_sunday_is_zero_or_seven():
+    after = datetime(2024, 1, 1)
+    assert CronExpression("0 0 * * 7").next_fires(5, after) == CronExpression("0 0 * * 0").next_fires(5, after)
+
+
+def test_names_ranges_and_steps():
+    fires = CronExpression("0 9 * JAN MON-FRI").next_fires(3, datetime(2024, 1, 5, 10))
+    assert fires == [datetime(2024, 1, 8, 9), datetime(2024, 1, 9, 9), datetime(2024, 1, 10, 9)]
+    assert fire("*/20 8-18/2 * * *", datetime(2024, 1, 1, 9, 0)) == datetime(2024, 1, 1, 10, 0)
+
+
+def test_six_fields_include_seconds():
+    assert fire("*/15 * * * * *", datetime(2024, 1, 1, 10, 0, 7)) == datetime(2024, 1, 1, 10, 0, 15)
+
+
+def test_macros():
+    assert fire("@hourly", datetime(2024, 1, 1, 10, 30)) == datetime(2024, 1, 1, 11, 0)
+    assert fire("@monthly", datetime(2024, 1, 31, 12)) == datetime(2024, 2, 1)
+
+
+def test_next_fire_is_strictly_after():
+    assert fire("0 12 * * *", datetime(2024, 1, 1, 12, 0)) == datetime(2024, 1, 2, 12, 0)
+    assert fire("0 12 * * *", datetime(2024, 1, 1, 11, 59, 59, 999999)) == datetime(2024, 1, 1, 12, 0)
+
+
+def test_expression_that_never_fires_returns_none():
+    assert fire("0 0 30 2 *", datetime(2024, 1, 1)) is None
+    assert CronExpression("0 0 30 2 *").next_fires(3, datetime(2024, 1, 1)) == []
+
+
+@pytest.mark.parametrize("expr", ["61 * * * *", "* * *", "0 0 * * 1#6", "0 0 32W * *", "0 0 * FOO *", "0 0 1,,2 * *"])
+def test_invalid_expressions(expr):
+    with pytest.raises(ValueError):
+        CronExpression(expr)
+
+
+# ── Caminhos rápidos concordam com next_fire ─────────────────
+
+
+@pytest.mark.parametrize("expr", [
+    "*/7 3-5 * * *", "0 0 L * *", "30 6 LW * *", "0 12 15W * *", "0 9 * * 5L",
+    "0 9 * * 2#3", "0 0 13 * 5", "15 10 1,15 */2 *",
+])
+def test_iter_fires_matches_repeated_next_fire(expr):
+    cron = CronExpression(expr)
+    after = datetime(2024, 1, 1)
+    expected, current = [], after
+    for _ in range(40):
+        current = cron.next_fire(current)
+        expected.append(current)
+    assert cron.next_fires(40, after) == expected
+
+
+def test_fire_calendar_matches_iter_fires():
+    start, end = datetime(2024, 1, 1), datetime(2024, 3, 1)
+    jobs = {"a": "0 0 L * *", "b": "0 9 * * 1#2", "c": "0 0 L * *", "d": "*/30 8 * * MON"}
+    calendar_fires = fire_calendar(jobs, start, end)
+    for key, expr in jobs.items():
+        assert calendar_fires[key] == list(CronExpression(expr).iter_fires(start, end))
+    assert all(start < f < end for fires in calendar_fires.values() for f in fires)
+    assert calendar_fires["d"][0] == datetime(2024, 1, 1, 8, 0)
+    assert calendar_fires["a"][-1] == datetime(2024, 2, 29)
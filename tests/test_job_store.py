@@ -0,0 +1,227 @@
+"""Testes do JobStore (leases por compare-and-set, versão) e da política de misfire."""
+
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from modules.job_store import JobStore
+from modules.scheduler_cluster import ClusterSchedulerDaemon
+from modules.scheduler_daemon import SchedulerDaemon
+
+
+def make_task(task_id: str = "t1", **extra) -> dict:
+    return {"id": task_id, "name": task_id, "frequency": "A cada X minutos", "interval": 10, **extra}
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path / "jobs.db"))
+
+
+# ── claim_due / complete ─────────────────────────────────────
+
+
+def test_claim_is_exclusive_between_nodes(store):
+    store.save(make_task(), 100.0)
+
+    claimed = store.claim_due("a", now=200.0, lease_s=30)
+    assert [(task["id"], fire) for task, fire, _ in claimed] == [("t1", 100.0)]
+    assert store.claim_due("b", now=201.0, lease_s=30) == []
+
+
+def test_claim_ignores_jobs_not_due(store):
+    store.save(make_task(), 300.0)
+    assert store.claim_due("a", now=200.0, lease_s=30) == []
+
+
+def test_expired_lease_can_be_claimed_by_another_node(store):
+    store.save(make_task(), 100.0)
+    store.claim_due("a", now=200.0, lease_s=30)
+
+    claimed = store.claim_due("b", now=231.0, lease_s=30)
+    assert len(claimed) == 1
+    # O nó que caiu não consegue mais concluir
+    assert store.complete("a", "t1", claimed[0][2], 900.0) is False
+    assert store.complete("b", "t1", claimed[0][2], 900.0) is True
+    assert store.get("t1")[1] == 900.0
+
+
+def test_complete_writes_next_fire_and_changes(store):
+    store.save(make_task(), 100.0)
+    [(_, _, version)] = store.claim_due("a", now=200.0, lease_s=30)
+
+    assert store.complete("a", "t1", version, 800.0, last_run="2024-01-01 00:00:00") is True
+    task, fire = store.get("t1")
+    assert fire == 800.0
+    assert task["last_run"] == "2024-01-01 00:00:00"
+    assert task["next_run"] != "N/A"
+    # Lease liberado: o próximo disparo pode ser reservado por qualquer nó
+    assert len(store.claim_due("b", now=800.0, lease_s=30)) == 1
+
+
+def test_complete_of_inactive_task_clears_next_fire(store):
+    store.save(make_task(), 100.0)
+    [(_, _, version)] = store.claim_due("a", now=200.0, lease_s=30)
+
+    assert store.complete("a", "t1", version, 800.0, active=False) is True
+    task, fire = store.get("t1")
+    assert fire is None
+    assert task["next_run"] == "N/A"
+    assert store.claim_due("a", now=10_000.0, lease_s=30) == []
+
+
+def test_edit_during_run_wins_over_complete(store):
+    store.save(make_task(), 100.0)
+    [(_, _, version)] = store.claim_due("a", now=200.0, lease_s=30)
+
+    store.save(make_task(interval=60, note="editada"), 5000.0)
+    assert store.complete("a", "t1", version, 800.0, last_run="2024-01-01 00:00:00", active=False) is True
+
+    task, fire = store.get("t1")
+    assert fire == 5000.0
+    assert task["interval"] == 60 and task["note"] == "editada"
+    assert task.get("active", True) is True
+    assert task["last_run"] == "2024-01-01 00:00:00"
+    # O lease foi liberado mesmo com a versão diferente
+    assert len(store.claim_due("b", now=5000.0, lease_s=30)) == 1
+
+
+def test_stale_claim_does_not_match_rescheduled_job(store):
+    store.save(make_task(), 100.0)
+    store.save(make_task(), 900.0)
+    assert store.claim_due("a", now=200.0, lease_s=30) == []
+
+
+def test_complete_of_removed_job_returns_false(store):
+    store.save(make_task(), 100.0)
+    [(_, _, version)] = store.claim_due("a", now=200.0, lease_s=30)
+    store.remove("t1")
+    assert store.complete("a", "t1", version, 800.0) is False
+
+
+def test_release_and_renew(store):
+    store.save_many([(make_task("t1"), 100.0), (make_task("t2"), 100.0)])
+    store.claim_due("a", now=200.0, lease_s=30)
+
+    assert store.renew("b", ["t1", "t2"], 30) == 0
+    assert store.renew("a", ["t1", "t2"], 30) == 2
+    store.release("a", ["t1"])
+    assert [task["id"] for task, _, _ in store.claim_due("b", now=201.0, lease_s=30)] == ["t1"]
+
+
+def test_next_due_accounts_for_leases(store):
+    store.save_many([(make_task("t1"), 100.0), (make_task("t2"), 500.0)])
+    assert store.next_due() == 100.0
+    store.claim_due("a", now=200.0, lease_s=30)
+    assert store.next_due() == 230.0
+
+
+def test_migrates_database_without_lease_columns(tmp_path):
+    db_path = str(tmp_path / "antigo.db")
+    with sqlite3.connect(db_path) as conn:
+        conn.execute(
+            "CREATE TABLE jobs (job_id TEXT PRIMARY KEY, task TEXT NOT NULL, next_fire REAL, updated_at TEXT NOT NULL)"
+        )
+        conn.execute("INSERT INTO jobs VALUES ('t1', '{\"id\": \"t1\"}', 100.0, '2024-01-01')")
+
+    store = JobStore(db_path)
+    [(task, fire, version)] = store.claim_due("a", now=200.0, lease_s=30)
+    assert (task["id"], fire, version) == ("t1", 100.0, 0)
+    assert store.complete("a", "t1", version, 800.0) is True
+
+
+# ── Misfire ──────────────────────────────────────────────────
+
+
+@pytest.fixture
+def daemon():
+    daemon = SchedulerDaemon(dispatch=lambda task: None, misfire_grace=60)
+    yield daemon
+    daemon.stop()
+
+
+SCHEDULED = datetime(2024, 1, 1, 12, 0)
+
+
+def test_misfire_within_grace_runs_once(daemon):
+    runs, next_fire = daemon._misfire(make_task(), SCHEDULED, SCHEDULED + timedelta(seconds=30))
+    assert (runs, next_fire) == (1, SCHEDULED + timedelta(minutes=10))
+
+
+@pytest.mark.parametrize("policy, expected_runs", [("coalesce", 1), ("all", 4), ("skip", 0)])
+def test_misfire_policies_after_grace(daemon, policy, expected_runs):
+    # Disparos perdidos: 12:00, 12:10, 12:20 e 12:30
+    now = SCHEDULED + timedelta(minutes=35)
+    runs, next_fire = daemon._misfire(make_task(misfire=policy), SCHEDULED, now)
+    assert runs == expected_runs
+    assert next_fire == SCHEDULED + timedelta(minutes=40)
+
+
+def test_misfire_catchup_is_capped(daemon):
+    now = SCHEDULED + timedelta(days=30)
+    runs, next_fire = daemon._misfire(make_task(misfire="all"), SCHEDULED, now)
+    assert runs == SchedulerDaemon.MAX_CATCHUP
+    assert now < next_fire <= now + timedelta(minutes=10)
+
+
+# ── Vários nós no mesmo banco ────────────────────────────────
+
+
+def run_nodes(store, dispatch, nodes: int = 2):
+    daemons = [
+        ClusterSchedulerDaemon(dispatch, store, node_id=f"n{i}", lease_s=3, poll_s=0.05) for i in range(nodes)
+    ]
+    for daemon in daemons:
+        daemon.start()
+    return daemons
+
+
+def wait_for(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condição não atingida a tempo"
+        time.sleep(0.02)
+
+
+def test_cluster_runs_each_fire_on_a_single_node(store):
+    calls, lock = [], threading.Lock()
+
+    def dispatch(task):
+        with lock:
+            calls.append(task["id"])
+
+    store.save_many([(make_task(f"t{i}"), time.time() - 1) for i in range(5)])
+    daemons = run_nodes(store, dispatch, nodes=3)
+    try:
+        wait_for(lambda: all(fire > time.time() for _, fire in store.load()))
+        time.sleep(0.2)
+    finally:
+        for daemon in daemons:
+            daemon.stop()
+    assert sorted(calls) == [f"t{i}" for i in range(5)]
+
+
+def test_cluster_keeps_schedule_edited_mid_run(store):
+    edited_fire = time.time() + 86_400
+    finished = threading.Event()
+
+    def dispatch(task):
+        # Edição da tarefa enquanto o disparo ainda está rodando
+        store.save(make_task(interval=120, note="editada"), edited_fire)
+        finished.set()
+
+    store.save(make_task(), time.time() - 1)
+    daemons = run_nodes(store, dispatch)
+    try:
+        assert finished.wait(5)
+        wait_for(lambda: "last_run" in store.get("t1")[0])
+    finally:
+        for daemon in daemons:
+            daemon.stop()
+
+    task, fire = store.get("t1")
+    assert fire == edited_fire
+    assert task["interval"] == 120 and task["note"] == "editada"
@@ -0,0 +1,201 @@
+"""Testes do executor em DAG do WorkflowEngine (frontier, falhas e retry)."""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from modules.step_handlers import StepHandler, current_deadline
+from modules.workflow_engine import WorkflowEngine, _Frontier
+
+
+class RecordingHandler(StepHandler):
+    """Registra início/fim de cada etapa; ``params.falhas`` falha as N primeiras tentativas."""
+
+    def __init__(self):
+        self.events = []
+        self.attempts = {}
+        self._lock = threading.Lock()
+
+    def run(self, step: dict, artifacts) -> str:
+        params = step.get("params", {})
+        with self._lock:
+            self.events.append(("start", step["id"]))
+            attempt = self.attempts[step["id"]] = self.attempts.get(step["id"], 0) + 1
+        time.sleep(float(params.get("segundos", 0)))
+        with self._lock:
+            self.events.append(("end", step["id"]))
+        if attempt <= int(params.get("falhas", 0)):
+            raise RuntimeError(f"falha {step['id']}")
+        return step["id"]
+
+    def started(self) -> list:
+        return [step_id for kind, step_id in self.events if kind == "start"]
+
+    def position(self, kind: str, step_id: str) -> int:
+        return self.events.index((kind, step_id))
+
+
+def make_engine(**options):
+    handler = RecordingHandler()
+    engine = WorkflowEngine(retry_backoff=0.01, **options)
+    engine.register_handler("Teste", handler)
+    return engine, handler
+
+
+def step(step_id: str, depends_on=None, **params) -> dict:
+    result = {"id": step_id, "type": "Teste", "params": params}
+    if depends_on is not None:
+        result["depends_on"] = depends_on
+    return result
+
+
+def statuses(summary: dict) -> dict:
+    return {r["step_id"]: r["status"] for r in summary["steps_results"]}
+
+
+# ── _Frontier ────────────────────────────────────────────────
+
+
+def test_frontier_releases_step_only_after_all_dependencies():
+    deps = {"a": set(), "b": {"a"}, "c": {"a"}, "d": {"b", "c"}}
+    frontier = _Frontier(deps, set())
+    assert list(frontier.ready) == ["a"]
+
+    frontier.complete(frontier.ready.popleft())
+    assert sorted(frontier.ready) == ["b", "c"]
+
+    frontier.complete("b")
+    assert "d" not in frontier.ready
+    frontier.complete("c")
+    assert frontier.ready[-1] == "d"
+
+
+def test_frontier_skips_steps_already_done():
+    deps = {"a": set(), "b": {"a"}, "c": {"b"}}
+    frontier = _Frontier(deps, {"a"})
+    assert list(frontier.ready) == ["b"]
+    assert "a" not in frontier.waiting
+
+
+def test_frontier_releases_stream_consumer_on_start():
+    deps = {"prod": set(), "cons": {"prod"}, "depois": {"prod"}}
+    frontier = _Frontier(deps, set(), streams={"cons": "prod"})
+    frontier.ready.popleft()
+
+    frontier.start("prod")
+    assert list(frontier.ready) == ["cons"]
+    frontier.complete("prod")
+    assert list(frontier.ready) == ["cons", "depois"]
+
+
+def test_build_graph_rejects_cycles_and_unknown_dependencies():
+    with pytest.raises(ValueError, match="inexistente"):
+        WorkflowEngine._build_graph([step("a", ["x"])])
+    with pytest.raises(ValueError):
+        WorkflowEngine._build_graph([step("a", ["b"]), step("b", ["a"])])
+
+
+# ── Execução ─────────────────────────────────────────────────
+
+
+def test_steps_without_depends_on_run_sequentially():
+    engine, handler = make_engine()
+    summary = engine.execute_workflow({"steps": [step("a"), step("b"), step("c")]})
+
+    assert summary["status"] == "Sucesso"
+    assert handler.started() == ["a", "b", "c"]
+    assert handler.position("end", "a") < handler.position("start", "b")
+
+
+def test_dependents_start_only_after_their_dependencies_finish():
+    engine, handler = make_engine()
+    workflow = {"steps": [
+        step("a", [], segundos=0.05),
+        step("b", ["a"], segundos=0.05),
+        step("c", ["a"], segundos=0.05),
+        step("d", ["b", "c"]),
+    ]}
+    summary = engine.execute_workflow(workflow)
+
+    assert statuses(summary) == dict.fromkeys("abcd", "Sucesso")
+    for dep, child in (("a", "b"), ("a", "c"), ("b", "d"), ("c", "d")):
+        assert handler.position("end", dep) < handler.position("start", child)
+
+
+def test_independent_branches_run_in_parallel():
+    engine, handler = make_engine(max_workers=4)
+    workflow = {"steps": [step(s, [], segundos=0.2) for s in "abcd"]}
+    start = time.monotonic()
+    summary = engine.execute_workflow(workflow)
+
+    assert summary["status"] == "Sucesso"
+    assert time.monotonic() - start < 0.6
+
+
+def test_failure_stops_dependents_and_new_steps():
+    engine, handler = make_engine(max_workers=2)
+    workflow = {"steps": [
+        step("a", [], falhas=1),
+        step("b", ["a"]),
+        step("x", [], segundos=0.2),
+        step("c", ["x"]),
+    ]}
+    summary = engine.execute_workflow(workflow)
+
+    # "c" fica pronta só depois da falha de "a": não é mais iniciada
+    assert summary["status"] == "Erro"
+    assert statuses(summary) == {"a": "Erro", "x": "Sucesso"}
+    assert sorted(handler.started()) == ["a", "x"]
+
+
+def test_failure_lets_running_sibling_finish():
+    engine, handler = make_engine(max_workers=2)
+    workflow = {"steps": [
+        step("lenta", [], segundos=0.2),
+        step("falha", [], falhas=1),
+        step("depois", ["lenta"]),
+    ]}
+    summary = engine.execute_workflow(workflow)
+
+    assert statuses(summary) == {"lenta": "Sucesso", "falha": "Erro"}
+    assert "depois" not in handler.started()
+
+
+def test_retry_until_success_reports_attempts():
+    engine, handler = make_engine()
+    summary = engine.execute_workflow({"steps": [step("a", falhas=2) | {"retry": 2}]})
+
+    result = summary["steps_results"][0]
+    assert result["status"] == "Sucesso"
+    assert result["attempts"] == 3
+    assert handler.attempts["a"] == 3
+
+
+def test_retry_exhausted_fails_the_step():
+    engine, handler = make_engine()
+    summary = engine.execute_workflow({"steps": [step("a", falhas=5) | {"retry": 1}, step("b")]})
+
+    assert statuses(summary) == {"a": "Erro"}
+    assert summary["steps_results"][0]["attempts"] == 2
+    assert handler.attempts == {"a": 2}
+
+
+class DeadlineSleepHandler(StepHandler):
+    def run(self, step: dict, artifacts) -> str:
+        current_deadline().sleep(5)
+        return "fim"
+
+
+@pytest.mark.parametrize("mode", ["sync", "async"])
+def test_step_exceeding_deadline_is_reported_as_timeout(mode):
+    engine = WorkflowEngine()
+    engine.register_handler("Lenta", DeadlineSleepHandler())
+    workflow = {"steps": [{"id": "a", "type": "Lenta", "timeout": 0.2}]}
+    if mode == "sync":
+        summary = engine.execute_workflow(workflow)
+    else:
+        summary = asyncio.run(engine.execute_workflow_async(workflow))
+
+    assert statuses(summary) == {"a": "Timeout"}